@@ -0,0 +1,64 @@
+"""Measure AQL statement construction throughput.
+
+Compares building a new :class:`party.aql.Aql` per statement, reading the
+memoized statement of one query while paging, and binding parameters into a
+precompiled :class:`party.aql.AqlTemplate`.
+
+Usage::
+
+    python -m benchmarks.bench_aql [statements]
+
+"""
+import sys
+import time
+
+from party.aql import Aql, Param
+
+
+def criteria(repo, name):
+    """Criteria of a typical lookup by repository and name pattern."""
+    return {'$and': [{'repo': repo}, {'type': 'file'},
+                     {'name': {'$match': name}}]}
+
+
+def bench_new(count):
+    """A new query for every statement."""
+    for index in range(count):
+        Aql(criteria=criteria('repo%d' % index, '*.rpm'),
+            fields=['name', 'repo', 'path'],
+            order_and_fields={'$asc': ['name']}).aql
+
+
+def bench_paging(count):
+    """One query, only limit and offset change between statements."""
+    aql = Aql(criteria=criteria('repo', '*.rpm'),
+              fields=['name', 'repo', 'path'],
+              order_and_fields={'$asc': ['name']})
+    for index in range(count):
+        aql.num_records = 1000
+        aql.offset_records = index * 1000
+        aql.aql
+
+
+def bench_template(count):
+    """Parameters bound into a precompiled statement."""
+    template = Aql(criteria=criteria(Param('repo'), Param('name')),
+                   fields=['name', 'repo', 'path'],
+                   order_and_fields={'$asc': ['name']}).compile()
+    for index in range(count):
+        template.bind(repo='repo%d' % index, name='*.rpm')
+
+
+def main(count=100000):
+    """Print statements/sec for each way of building statements."""
+    for name, run in (('new', bench_new), ('paging', bench_paging),
+                      ('template', bench_template)):
+        start = time.time()
+        run(count)
+        elapsed = time.time() - start
+        print('%-9s %7d statements  %10.1f stmt/s' % (name, count,
+                                                       count / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,77 @@
+"""Compare the pattern and AQL engines of ``find_by_pattern``.
+
+The stub serves ``repos`` repositories holding one matching file each at
+depth 1, the pattern engine still searches every depth of every repository.
+
+Usage::
+
+    python -m benchmarks.bench_pattern [repos] [max_depth]
+
+"""
+import base64
+import json
+import sys
+import time
+
+from party import Party
+
+from .stub import StubHandler, StubServer
+
+
+class PatternHandler(StubHandler):
+    """Answer repository lists, pattern searches and AQL searches."""
+
+    repos = 20
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        self.server.request_count += 1
+        base = self.path.split('/api/', 1)[0]
+
+        if '/api/repositories' in self.path:
+            body = [{'key': 'repo%d' % i} for i in range(self.repos)]
+        elif '/api/search/pattern' in self.path:
+            repo, pattern = self.path.split('pattern=', 1)[1].split(':', 1)
+            files = [] if '*/' in pattern else ['file.rpm']
+            body = {'repoUri': 'http://%s:%d%s/%s' % (
+                self.server.server_address + (base, repo)), 'files': files}
+        else:
+            body = {'results': [{'repo': 'repo%d' % i, 'path': '.',
+                                 'name': 'file.rpm'}
+                                for i in range(self.repos)]}
+
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = respond
+
+
+def main(repos=20, max_depth=10):
+    """Print requests sent and elapsed time of both engines."""
+    PatternHandler.repos = repos
+    with StubServer(PatternHandler) as stub:
+        party = Party(config={
+            'artifactory_url': stub.url,
+            'username': 'user',
+            'password': base64.b64encode(b'pass').decode(),
+        })
+
+        for engine in ('pattern', 'aql'):
+            before = stub.request_count
+            start = time.time()
+            party.find_by_pattern('file', max_depth=max_depth, engine=engine)
+            elapsed = time.time() - start
+            print('%-8s %3d files %5d requests %8.3fs' % (
+                engine, len(party.files), stub.request_count - before,
+                elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,51 @@
+"""Compare per-call requests against the pooled session.
+
+Usage::
+
+    python -m benchmarks.bench_session [requests]
+
+"""
+import base64
+import sys
+import time
+
+import requests
+
+from party import Party
+
+from .stub import StubServer
+
+
+def bench_unpooled(url, count):
+    """Module level ``requests.get`` as used before pooling."""
+    for _ in range(count):
+        requests.get(url, auth=('user', 'pass')).json()
+
+
+def bench_pooled(party, url, count):
+    """:meth:`party.Party.query_artifactory` over its pooled session."""
+    for _ in range(count):
+        party.query_artifactory(url).json()
+
+
+def main(count=2000):
+    """Print requests/sec for both request paths."""
+    with StubServer() as stub:
+        url = '%s/storage/repo/file.rpm' % stub.url
+        party = Party(config={
+            'artifactory_url': stub.url,
+            'username': 'user',
+            'password': base64.b64encode(b'pass').decode(),
+        })
+
+        for name, run in (('unpooled', lambda: bench_unpooled(url, count)),
+                          ('pooled', lambda: bench_pooled(party, url, count))):
+            start = time.time()
+            run()
+            elapsed = time.time() - start
+            print('%-9s %6d requests  %8.1f req/s' % (name, count,
+                                                       count / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
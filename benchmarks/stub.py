@@ -0,0 +1,61 @@
+"""Minimal local Artifactory stand-in for benchmarks."""
+import json
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every request with a small JSON body over HTTP/1.1."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        self.server.request_count += 1
+        body = json.dumps({'results': [], 'path': self.path}).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = do_DELETE = respond
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """Threaded stub server bound to a random local port."""
+
+    daemon_threads = True
+
+    def __init__(self, handler=StubHandler):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.request_count = 0
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        """str: API base URL of the stub."""
+        return 'http://%s:%d/artifactory/api' % self.server_address
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,424 @@
+"""Benchmark every Party request path against a synthetic Artifactory.
+
+The stub serves ``items`` synthetic artifacts spread over one repository
+per 10,000 items (at most 100) from a separate process. Every operation is
+measured ``--repeat`` times, each time in a fresh process, so the reported
+peak RSS is that of the client alone. The suite reports the median latency
+percentiles, throughput, requests sent per call and peak RSS of the runs,
+and writes them as a JSON report. Reports of two versions can be compared
+to catch regressions::
+
+    python -m benchmarks.suite --items 1000 100000 --output new.json
+    python -m benchmarks.suite --items 1000 100000 --compare old.json
+
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import platform
+import re
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:
+    from urlparse import parse_qs, urlsplit
+
+from party import Party
+from party.fanout import fan_out
+
+from .stub import StubHandler, StubServer
+
+# Spawned children start from a bare interpreter, so their peak RSS does
+# not include the parent's memory.
+CONTEXT = multiprocessing.get_context('spawn') \
+    if hasattr(multiprocessing, 'get_context') else multiprocessing
+PROPERTY_VALUES = 1000
+ITEMS_PER_REPO = 10000
+NAME = re.compile(r'artifact-(\d+)\.rpm')
+
+
+class Model(object):
+    """Synthetic repositories holding ``items`` artifacts.
+
+    Artifact ``i`` is ``repo<i % repos>/dir<i // repos % 100>/artifact-<i>.rpm``
+    with the property ``build.number=<i % 1000>``.
+
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.repos = min(max(items // ITEMS_PER_REPO, 1), 100)
+
+    def path(self, index):
+        """Return ``repo/path/name`` of artifact ``index``."""
+        return 'repo%d/dir%03d/artifact-%07d.rpm' % (
+            index % self.repos, index // self.repos % 100, index)
+
+    def aql_result(self, index):
+        """Return artifact ``index`` as an AQL result."""
+        repo, folder, name = self.path(index).split('/')
+        return {'repo': repo, 'path': folder, 'name': name, 'size': 1024,
+                'modified': '2024-01-01T00:00:00.000Z'}
+
+
+class SyntheticHandler(StubHandler):
+    """Answer the endpoints Party uses from the server's :class:`Model`.
+
+    AQL searches with a ``name`` condition match ten artifacts, others every
+    artifact, paged with ``.limit()`` and ``.offset()``. Pattern searches
+    find one file at depth two of every repository.
+
+    """
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+        server = self.server
+        with server.counter.get_lock():
+            server.counter.value += 1
+
+        model = server.model
+        root = 'http://%s:%d/artifactory' % server.server_address
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        status = 200
+
+        if self.command in ('PUT', 'DELETE'):
+            status, content = 204, None
+        elif url.path.endswith('/api/repositories'):
+            content = [{'key': 'repo%d' % i, 'type': 'LOCAL'}
+                       for i in range(model.repos)]
+        elif url.path.endswith('/api/search/artifact'):
+            match = NAME.match(query.get('name', [''])[0])
+            found = [int(match.group(1))] if match else []
+            content = {'results': [
+                {'uri': '%s/api/storage/%s' % (root, model.path(index))}
+                for index in found if index < model.items]}
+        elif url.path.endswith('/api/search/prop'):
+            value = int(query.get('build.number', ['0'])[0])
+            content = {'results': [
+                {'uri': '%s/api/storage/%s' % (root, model.path(index))}
+                for index in range(value, model.items, PROPERTY_VALUES)]}
+        elif url.path.endswith('/api/search/pattern'):
+            repo, pattern = query['pattern'][0].split(':', 1)
+            files = ['dir000/artifact-0000000.rpm'] \
+                if pattern.count('/') == 1 else []
+            content = {'repoUri': '%s/%s' % (root, repo), 'files': files}
+        elif url.path.endswith('/api/search/aql'):
+            total = min(model.items, 10) if '"name"' in body else model.items
+            offset = re.search(r'\.offset\((\d+)\)', body)
+            offset = int(offset.group(1)) if offset else 0
+            limit = re.search(r'\.limit\((\d+)\)', body)
+            end = min(total, offset + int(limit.group(1))) if limit else total
+            content = {'results': [model.aql_result(index)
+                                   for index in range(offset, end)]}
+        else:
+            status, content = 404, {'errors': [{'status': 404}]}
+
+        data = b'' if content is None else json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_PUT = do_POST = do_DELETE = respond
+
+
+class SyntheticServer(StubServer):
+    """Stub server of a :class:`Model` with ``items`` artifacts.
+
+    Requests are counted in ``counter``, a :func:`multiprocessing.Value`
+    shared with the measuring processes.
+
+    """
+
+    def __init__(self, items, counter):
+        StubServer.__init__(self, SyntheticHandler)
+        self.model = Model(items)
+        self.counter = counter
+
+
+def serve(items, counter, addresses):
+    """Run a :class:`SyntheticServer`, putting its address on ``addresses``."""
+    server = SyntheticServer(items, counter)
+    addresses.put(server.server_address)
+    server.serve_forever()
+
+
+class SyntheticStub(object):
+    """:class:`SyntheticServer` running in a separate process.
+
+    Use as a context manager, the server stops on exit.
+
+    """
+
+    def __init__(self, items):
+        self.model = Model(items)
+        self.counter = CONTEXT.Value('l', 0)
+        self.process = None
+        self.address = None
+
+    @property
+    def request_count(self):
+        """int: Requests served so far."""
+        return self.counter.value
+
+    @property
+    def url(self):
+        """str: API base URL of the stub."""
+        return 'http://%s:%d/artifactory/api' % self.address
+
+    def __enter__(self):
+        addresses = CONTEXT.Queue()
+        self.process = CONTEXT.Process(
+            target=serve, args=(self.model.items, self.counter, addresses))
+        self.process.daemon = True
+        self.process.start()
+        self.address = tuple(addresses.get(timeout=60))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.join()
+
+
+def operations(party, model):
+    """Return ``(name, call)`` pairs, ``call`` takes the iteration number."""
+    def path(index):
+        return model.path(index % model.items)
+
+    return [
+        ('find', lambda i: party.find('artifact-%07d.rpm'
+                                      % (i % model.items))),
+        ('find_by_properties', lambda i: party.find_by_properties(
+            {'build.number': i % PROPERTY_VALUES})),
+        ('find_by_pattern', lambda i: party.find_by_pattern(
+            'artifact-*.rpm', max_depth=3, engine='pattern')),
+        ('find_by_pattern[aql]', lambda i: party.find_by_pattern(
+            'artifact-*.rpm', max_depth=3, engine='aql')),
+        ('find_by_aql', lambda i: party.find_by_aql(
+            criteria={'repo': 'repo0'}, num_records=100)),
+        ('iter_aql', lambda i: sum(1 for _ in party.iter_aql(
+            page_size=10000, criteria={'repo': 'repo0'}))),
+        ('get_repositories', lambda i: party.get_repositories()),
+        ('set_properties', lambda i: party.set_properties(
+            party.storage_url(path(i)), {'qa': 'passed'})),
+        ('delete_item', lambda i: party.delete_item(path(i))),
+    ]
+
+
+def client(url, concurrency):
+    """Return a client of the stub at ``url``."""
+    return Party(config={
+        'artifactory_url': url,
+        'username': 'user',
+        'password': base64.b64encode(b'pass').decode(),
+        'pool_maxsize': max(concurrency, 10),
+    })
+
+
+def peak_rss():
+    """Return the peak resident set size of the process in KiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def percentile(ordered, fraction):
+    """Return the ``fraction`` percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def median(values):
+    """Return the median of ``values``, ``None`` if any value is missing."""
+    if not values or None in values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def measure(call, calls, concurrency, counter):
+    """Run ``call`` and return its statistics.
+
+    Args:
+        counter: :func:`multiprocessing.Value` counting the stub's requests.
+
+    """
+    latencies = []
+
+    def timed(index):
+        start = time.time()
+        call(index)
+        latencies.append(time.time() - start)
+
+    requests_before = counter.value
+    start = time.time()
+    fan_out(timed, range(calls), max_workers=concurrency)
+    elapsed = time.time() - start
+
+    latencies.sort()
+    return {
+        'calls': calls,
+        'requests_per_call': (counter.value - requests_before) /
+                             float(calls),
+        'throughput': calls / elapsed if elapsed else 0.0,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * percentile(latencies, 0.50),
+        'p90_ms': 1000 * percentile(latencies, 0.90),
+        'p99_ms': 1000 * percentile(latencies, 0.99),
+        'max_ms': 1000 * latencies[-1],
+        'peak_rss_kib': peak_rss(),
+    }
+
+
+def measure_operation(url, items, name, calls, concurrency, counter,
+                      results):
+    """Measure operation ``name`` with a new client, put the statistics on
+    ``results``.
+
+    Runs in its own process, so peak RSS covers only this operation.
+
+    """
+    call = dict(operations(client(url, concurrency), Model(items)))[name]
+    call(0)  # warm up connections
+    results.put(measure(call, calls, concurrency, counter))
+
+
+def summarize(runs):
+    """Return the median of every statistic over repeated ``runs``."""
+    stats = dict((key, median([run[key] for run in runs])) for key in runs[0])
+    stats['runs'] = len(runs)
+    stats['p50_ms_runs'] = [run['p50_ms'] for run in runs]
+    return stats
+
+
+def run(sizes, calls, concurrency, only=None, repeat=3):
+    """Benchmark every operation at every size.
+
+    Each operation runs ``repeat`` times, each run in a fresh process.
+
+    Returns:
+        dict: ``{size: {operation: statistics}}``, sizes as strings, each
+        statistic the median over the runs.
+
+    """
+    results = {}
+    for items in sizes:
+        with SyntheticStub(items) as stub:
+            results[str(items)] = sized = {}
+            for name, _ in operations(None, stub.model):
+                if only and name not in only:
+                    continue
+                # iter_aql lists every item, keep it to a few calls.
+                count = min(calls, 3) if name == 'iter_aql' else calls
+                runs = []
+                for _ in range(repeat):
+                    queue = CONTEXT.Queue()
+                    process = CONTEXT.Process(
+                        target=measure_operation,
+                        args=(stub.url, items, name, count, concurrency,
+                              stub.counter, queue))
+                    process.start()
+                    runs.append(queue.get())
+                    process.join()
+                sized[name] = stats = summarize(runs)
+                print('%8d %-22s %9.1f calls/s  p50 %8.2fms  p99 %8.2fms  '
+                      '%6.1f req/call' % (items, name, stats['throughput'],
+                                          stats['p50_ms'], stats['p99_ms'],
+                                          stats['requests_per_call']))
+    return results
+
+
+def compare(report, baseline, threshold, min_delta):
+    """Print changes against ``baseline`` and return the regressions.
+
+    An operation regressed when its median p50 grew by more than
+    ``threshold`` relative and ``min_delta`` milliseconds absolute, or when
+    it sends at least one more request per call.
+
+    """
+    regressions = []
+    for size, by_name in sorted(report['results'].items()):
+        for name, stats in sorted(by_name.items()):
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before or not before['p50_ms']:
+                continue
+            delta = stats['p50_ms'] - before['p50_ms']
+            change = delta / before['p50_ms']
+            slower = change > threshold and delta > min_delta
+            more_requests = (stats['requests_per_call'] -
+                             before['requests_per_call']) >= 1
+            print('%8s %-22s p50 %+7.1f%% %+8.2fms  requests/call '
+                  '%.1f -> %.1f' % (size, name, 100 * change, delta,
+                                    before['requests_per_call'],
+                                    stats['requests_per_call']))
+            if slower or more_requests:
+                regressions.append((size, name))
+    return regressions
+
+
+def main(argv=None):
+    """Run the suite, write the report and compare it with a baseline."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--items', type=int, nargs='+',
+                        default=[1000, 10000, 100000, 1000000],
+                        help='synthetic artifacts per run')
+    parser.add_argument('--calls', type=int, default=200,
+                        help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per operation, medians are reported')
+    parser.add_argument('--only', nargs='+', help='operations to run')
+    parser.add_argument('--label', default='', help='version being measured')
+    parser.add_argument('--output', help='JSON report to write')
+    parser.add_argument('--compare', help='baseline JSON report')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='relative p50 slowdown counted as regression')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='p50 slowdown in ms a regression must exceed')
+    args = parser.parse_args(argv)
+
+    report = {
+        'label': args.label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'calls': args.calls,
+        'concurrency': args.concurrency,
+        'repeat': args.repeat,
+        'results': run(args.items, args.calls, args.concurrency, args.only,
+                       args.repeat),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(report, json.load(handle), args.threshold,
+                                  args.min_delta)
+        if regressions:
+            print('Regressions: %s' % ', '.join(
+                '%s@%s' % (name, size) for size, name in regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
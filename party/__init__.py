@@ -1,4 +1,17 @@
 __title__ = "party"
 __author__ = "Ted Sheibar"
 
-from .party import Party
+import sys
+
+__all__ = ['Party']
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # Import the client, and requests with it, on first use so tools
+        # such as the command line start quickly.
+        if name == 'Party':
+            from .party import Party
+            return Party
+        raise AttributeError("module 'party' has no attribute %r" % name)
+else:
+    from .party import Party
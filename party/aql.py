@@ -2,12 +2,162 @@
 import json
 import logging
 
+LOG = logging.getLogger(__name__)
 
-class Aql:
+# Placeholder written into compiled statements in place of a Param, the name
+# is appended so templates can be split back into literal parts.
+PLACEHOLDER = '\x1aparam:'
+
+
+def and_(*clauses):
+    """Combine criteria so all of them have to match.
+
+    Empty clauses are dropped and nested ``$and`` clauses are flattened.
+
+    Examples:
+        >>> and_({'repo': 'myrepo'}, {'name': {'$match': '*.rpm'}})
+        {'$and': [{'repo': 'myrepo'}, {'name': {'$match': '*.rpm'}}]}
+
+    Returns:
+        dict: Criteria for :attr:`Aql.criteria`.
+
+    """
+    return _combine('$and', clauses)
+
+
+def or_(*clauses):
+    """Combine criteria so any of them has to match.
+
+    Returns:
+        dict: Criteria for :attr:`Aql.criteria`, see :func:`and_`.
+
+    """
+    return _combine('$or', clauses)
+
+
+def match(field, pattern):
+    """Match ``field`` against a wildcard ``pattern``.
+
+    Returns:
+        dict: ``{field: {"$match": pattern}}``.
+
+    """
+    return {field: {'$match': pattern}}
+
+
+def _combine(operator, clauses):
+    flat = []
+    for clause in clauses:
+        if not clause:
+            continue
+        if list(clause) == [operator]:
+            flat.extend(clause[operator])
+        else:
+            flat.append(clause)
+
+    if not flat:
+        return {}
+    if len(flat) == 1:
+        return flat[0]
+    return {operator: flat}
+
+
+class Param(object):
+    """Named placeholder for a value bound by :meth:`AqlTemplate.bind`.
+
+    Args:
+        name (str): Keyword used to bind the value.
+
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return 'Param(%r)' % self.name
+
+
+def _encode_param(value):
+    if isinstance(value, Param):
+        return PLACEHOLDER + value.name
+    raise TypeError('%r is not JSON serializable' % value)
+
+
+_dumps = json.JSONEncoder(default=_encode_param).encode
+
+
+class AqlTemplate(object):
+    """Precompiled AQL statement with :class:`Param` placeholders.
+
+    The statement is serialized once, binding only encodes the parameter
+    values and joins them with the literal parts in between.
+
+    Examples:
+        >>> template = Aql(criteria={'repo': Param('repo')}).compile()
+        >>> template.bind(repo='myrepo')
+        'items.find({"repo": "myrepo"})'
+
+    Attributes:
+        parts (list): Literal statement text around the placeholders.
+        names (list): Parameter name of each placeholder.
+
+    """
+
+    __slots__ = ('parts', 'names')
+
+    def __init__(self, statement):
+        quoted = json.dumps(PLACEHOLDER)[:-1]
+        pieces = statement.split(quoted)
+        self.parts = [pieces[0]]
+        self.names = []
+        for piece in pieces[1:]:
+            name, text = piece.split('"', 1)
+            self.names.append(name)
+            self.parts.append(text)
+
+    def __repr__(self):
+        return 'AqlTemplate(%r)' % self.bind(
+            **dict((name, Param(name)) for name in self.names))
+
+    def bind(self, **values):
+        """Return the statement with each parameter replaced by its value.
+
+        Args:
+            **values: JSON serializable value for every parameter name.
+
+        Returns:
+            str: AQL statement.
+
+        Raises:
+            ValueError: A parameter has no value.
+
+        """
+        statement = [self.parts[0]]
+        for name, text in zip(self.names, self.parts[1:]):
+            try:
+                value = values[name]
+            except KeyError:
+                raise ValueError('No value for AQL parameter %r' % name)
+            statement.append(_dumps(value))
+            statement.append(text)
+        return ''.join(statement)
+
+
+class Aql(object):
     """Artifactory Query Language.
 
     See `AQL User Guide`_ for full specification.
 
+    The statement is serialized on first access and kept while the attributes
+    below stay the same, whether they are assigned or changed in place, so
+    repeated access and paging through :attr:`num_records` and
+    :attr:`offset_records` do not serialize the criteria again. The builder
+    methods return the query itself::
+
+        Aql().where(repo='myrepo').match('name', '*.rpm').include('name')
+
     .. _AQL User Guide: https://www.jfrog.com/confluence/display/RTF/Artifactory+Query+Language
 
     Attributes:
@@ -26,23 +176,29 @@ class Aql:
 
     """
 
-    def __init__(  # pylint: disable=R0913,W0102
+    def __init__(  # pylint: disable=R0913
             self,
-            criteria={},
+            criteria=None,
             domain_query='items',
-            fields=[],
+            fields=None,
             num_records=0,
             offset_records=0,
-            order_and_fields={}):
-        self.log = logging.getLogger(__name__)
+            order_and_fields=None):
+        self.log = LOG
+        self._query = (None, None)
+        self._statement = (None, None)
 
         self.domain_query = domain_query
-        self.criteria = criteria
+        self.criteria = {} if criteria is None else criteria
 
-        self.fields = fields
+        self.fields = [] if fields is None else fields
         self.num_records = num_records
         self.offset_records = offset_records
-        self.order_and_fields = order_and_fields
+        self.order_and_fields = {} if order_and_fields is None else \
+            order_and_fields
+
+    def __repr__(self):
+        return 'Aql(%r)' % self.aql
 
     @property
     def aql(self):
@@ -62,17 +218,110 @@ class Aql:
             str: AQL statement, e.g. ``items.find({"repo": "myrepo"})``.
 
         """
-        criteria = json.dumps(self.criteria)
-        aql_statement = '{domain_query}.find({criteria})'.format(
-            domain_query=self.domain_query, criteria=criteria)
+        # repr() is much cheaper than serializing and also catches changes
+        # made in place, e.g. to a key of the criteria.
+        fingerprint = repr((self.domain_query, self.criteria, self.fields,
+                            self.order_and_fields))
+        memo, query = self._query
+        if memo != fingerprint:
+            query = '{domain_query}.find({criteria}){include}{sort}'.format(
+                domain_query=self.domain_query,
+                criteria=_dumps(self.criteria),
+                include=self.format_include(),
+                sort=self.format_sort())
+            self._query = (fingerprint, query)
+
+        fingerprint = (query, self.num_records, self.offset_records)
+        memo, statement = self._statement
+        if memo != fingerprint:
+            statement = query + self.format_limit() + self.format_offset()
+            self._statement = (fingerprint, statement)
+            self.log.debug('Full AQL statement: %s', statement)
+        return statement
+
+    def compile(self):
+        """Precompile the statement for binding :class:`Param` values.
+
+        Returns:
+            AqlTemplate: Template of the current statement.
+
+        """
+        return AqlTemplate(self.aql)
+
+    def where(self, *clauses, **fields):
+        """Require ``clauses`` and ``field=value`` pairs to match as well.
+
+        Returns:
+            Aql: This query.
+
+        """
+        clauses += tuple({key: fields[key]} for key in sorted(fields))
+        self.criteria = and_(self.criteria, *clauses)
+        return self
+
+    def any_of(self, *clauses):
+        """Require one of ``clauses`` to match as well.
+
+        Returns:
+            Aql: This query.
+
+        """
+        return self.where(or_(*clauses))
+
+    def match(self, field, pattern):
+        """Require ``field`` to match a wildcard ``pattern`` as well.
+
+        Returns:
+            Aql: This query.
+
+        """
+        return self.where(match(field, pattern))
+
+    def include(self, *fields):
+        """Add ``fields`` to the ``.include()`` list.
+
+        Returns:
+            Aql: This query.
+
+        """
+        self.fields = list(self.fields) + list(fields)
+        return self
+
+    def sort(self, asc=None, desc=None):
+        """Sort results ascending by ``asc`` or descending by ``desc`` fields.
+
+        Returns:
+            Aql: This query.
+
+        Raises:
+            ValueError: Not exactly one of ``asc`` and ``desc`` has fields.
+
+        """
+        if bool(asc) == bool(desc):
+            raise ValueError('Sort by either asc or desc fields')
+        order = '$asc' if asc else '$desc'
+        self.order_and_fields = {order: list(asc or desc)}
+        return self
+
+    def limit(self, num_records):
+        """Return at most ``num_records`` results.
+
+        Returns:
+            Aql: This query.
+
+        """
+        self.num_records = num_records
+        return self
 
-        aql_statement += self.format_include()
-        aql_statement += self.format_sort()
-        aql_statement += self.format_limit()
-        aql_statement += self.format_offset()
+    def offset(self, offset_records):
+        """Skip the first ``offset_records`` results.
 
-        self.log.debug('Full AQL statement: %s', aql_statement)
-        return aql_statement
+        Returns:
+            Aql: This query.
+
+        """
+        self.offset_records = offset_records
+        return self
 
     def format_include(self):
         """Format ``.include()`` from :attr:`fields` for AQL.
@@ -90,16 +339,9 @@ class Aql:
             str: ``.include()`` statement for AQL.
 
         """
-        statement = ''
-
-        if self.fields:
-            fields = json.dumps(self.fields)
-            fields = fields.lstrip('[').rstrip(']')
-
-            statement = '.include({0})'.format(fields)
-
-        self.log.debug('Include statement: %s', statement)
-        return statement
+        if not self.fields:
+            return ''
+        return '.include({0})'.format(_dumps(list(self.fields))[1:-1])
 
     def format_limit(self):
         """Format ``.limit()`` from :attr:`num_records` for AQL.
@@ -115,13 +357,9 @@ class Aql:
             str: ``.limit()`` statement for AQL.
 
         """
-        statement = ''
-
-        if self.num_records:
-            statement = '.limit({0:d})'.format(self.num_records)
-
-        self.log.debug('Limit statement: %s', statement)
-        return statement
+        if not self.num_records:
+            return ''
+        return '.limit({0:d})'.format(self.num_records)
 
     def format_offset(self):
         """Format ``.offset()`` from :attr:`offset_records` for AQL.
@@ -137,13 +375,9 @@ class Aql:
             str: ``.offset()`` statement for AQL.
 
         """
-        statement = ''
-
-        if self.offset_records:
-            statement = '.offset({0:d})'.format(self.offset_records)
-
-        self.log.debug('Offset statement: %s', statement)
-        return statement
+        if not self.offset_records:
+            return ''
+        return '.offset({0:d})'.format(self.offset_records)
 
     def format_sort(self):
         """Format ``.sort()`` from :attr:`order_and_fields` for AQL.
@@ -157,11 +391,6 @@ class Aql:
             str: ``.sort()`` statement for AQL.
 
         """
-        statement = ''
-
-        if self.order_and_fields:
-            order_and_fields = json.dumps(self.order_and_fields)
-            statement = '.sort({0})'.format(order_and_fields)
-
-        self.log.debug('Sort statement: %s', statement)
-        return statement
+        if not self.order_and_fields:
+            return ''
+        return '.sort({0})'.format(_dumps(self.order_and_fields))
@@ -0,0 +1,517 @@
+"""Asyncio interface for Artifactory.
+
+Requires the ``async`` extra (``pip install party[async]``), which installs
+aiohttp.
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import ssl
+
+try:
+    from urllib import urlencode
+except ImportError:
+    from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .exceptions import PartyError, UnknownQueryType
+from .aql import Aql
+from .party_config import Mapping, PartyConfig, party_config
+
+QUERY_TYPES = ('get', 'put', 'delete', 'post')
+
+
+class AsyncResponse(object):
+    """Fully read Artifactory response.
+
+    Mirrors the parts of :class:`requests.models.Response` used by
+    :class:`party.Party` so results can be handled the same way.
+
+    Attributes:
+        content (bytes): Response body.
+        headers (dict): Response headers.
+        status_code (int): HTTP status code.
+        url (str): Requested URL.
+
+    """
+
+    def __init__(self, status_code, content=b'', headers=None, url=''):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+
+    @property
+    def ok(self):
+        """bool: Status code is below 400."""
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        """str: Decoded response body."""
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """Decode the response body as JSON."""
+        return json.loads(self.text)
+
+
+class AsyncPartyRequest(object):
+    """Asyncio request interface for Artifactory.
+
+    One :class:`aiohttp.ClientSession` is opened on first use and shared by
+    every request, the number of requests in flight is bounded by a
+    semaphore. Close the client with :meth:`close` or use it as an async
+    context manager.
+
+    Args:
+        artifactory_url (str): Artifactory Instance API URL, e.g.
+            http://instance.jfrog.io/instance/api.
+        headers (dict): Custom request headers.
+        password (str): Authentication password base64 encoded.
+        username (str): Authentication username.
+        session (aiohttp.ClientSession, optional): Session to share with
+            other clients, it is not closed by :meth:`close`.
+        max_workers (int, optional): Maximum number of concurrent requests,
+            defaults to ``pool_maxsize``.
+
+    """
+
+    def __init__(self,
+                 artifactory_url='',
+                 headers=None,
+                 password='',
+                 username='',
+                 session=None,
+                 max_workers=None):
+        if aiohttp is None:
+            raise PartyError('aiohttp is required, install party[async]')
+
+        self.log = logging.getLogger(__name__)
+
+        self.artifactory_url = artifactory_url
+        self.password = password
+        self.username = username
+
+        self.headers = headers
+        self.max_workers = max_workers
+
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+        self._auth = (None, None)
+        self._ssl = (None, None)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        """aiohttp.ClientSession: Pooled session used for every request."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=getattr(self, 'pool_maxsize',
+                              party_config['pool_maxsize']),
+                force_close=not getattr(self, 'keep_alive',
+                                        party_config['keep_alive']))
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @property
+    def semaphore(self):
+        """asyncio.Semaphore: Bounds the number of requests in flight."""
+        if self._semaphore is None:
+            limit = self.max_workers or getattr(
+                self, 'pool_maxsize', party_config['pool_maxsize'])
+            self._semaphore = asyncio.Semaphore(max(limit, 1))
+        return self._semaphore
+
+    @property
+    def auth(self):
+        """aiohttp.BasicAuth: Username and decoded password.
+
+        Built once and rebuilt only when the credentials change.
+
+        """
+        credentials = (self.username, self.password)
+        if self._auth[0] != credentials:
+            self._auth = (credentials, aiohttp.BasicAuth(
+                self.username, base64.b64decode(self.password).decode()))
+        return self._auth[1]
+
+    @property
+    def ssl_context(self):
+        """ssl.SSLContext: Context trusting ``certbundle``, ``None`` without
+        one.
+
+        Loading the bundle is slow, the context is created once and rebuilt
+        only when ``certbundle`` changes.
+
+        """
+        certbundle = getattr(self, 'certbundle', '')
+        if not certbundle:
+            return None
+        if self._ssl[0] != certbundle:
+            self._ssl = (certbundle,
+                         ssl.create_default_context(cafile=certbundle))
+        return self._ssl[1]
+
+    async def close(self):
+        """Close the session unless it was passed in."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def send(self, method, url, **kwargs):
+        """Send a request and read the whole response.
+
+        Args:
+            method (str): HTTP method to use.
+            url (str): Full URL to request.
+            **kwargs: Extra keyword arguments for
+                :meth:`aiohttp.ClientSession.request`.
+
+        Returns:
+            AsyncResponse: Artifactory response.
+
+        """
+        kwargs.setdefault('headers', self.headers)
+        context = self.ssl_context
+        if context is not None:
+            kwargs.setdefault('ssl', context)
+
+        async with self.semaphore:
+            async with self.session.request(method.upper(), url,
+                                            auth=self.auth,
+                                            **kwargs) as raw_response:
+                content = await raw_response.read()
+
+        response = AsyncResponse(raw_response.status, content,
+                                 dict(raw_response.headers), url)
+        self.log.debug('Artifactory response: [%d] %s', response.status_code,
+                       url)
+        return response
+
+    async def request(self, endpoint, method='get', **kwargs):
+        """Send request to Artifactory API.
+
+        Args:
+            endpoint (str): API endpoint to use, usually everything after
+                ``api/``.
+            method (str): HTTP method to use, e.g. delete, get, head, options,
+                patch, post.
+
+        Returns:
+            AsyncResponse: Artifactory response.
+
+        Raises:
+            aiohttp.ClientResponseError: Artifactory did not respond with a
+                good status.
+
+        """
+        url = '/'.join([self.artifactory_url, endpoint])
+        response = await self.send(method, url, **kwargs)
+
+        if not response.ok:
+            raise aiohttp.ClientResponseError(
+                None, (), status=response.status_code,
+                message='Artifactory request failed: %s' % url)
+
+        return response
+
+    async def delete(self, endpoint, **kwargs):
+        """DELETE request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='delete', **kwargs)
+
+    async def get(self, endpoint, **kwargs):
+        """GET request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='get', **kwargs)
+
+    async def head(self, endpoint, **kwargs):
+        """HEAD request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='head', **kwargs)
+
+    async def options(self, endpoint, **kwargs):
+        """OPTIONS request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='options', **kwargs)
+
+    async def patch(self, endpoint, **kwargs):
+        """PATCH request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='patch', **kwargs)
+
+    async def post(self, endpoint, **kwargs):
+        """POST request to Artifactory API endpoint."""
+        return await self.request(endpoint, method='post', **kwargs)
+
+
+class AsyncParty(AsyncPartyRequest):
+    """Asyncio Artifactory API interface.
+
+    Awaitable counterpart of :class:`party.Party`: methods take the same
+    arguments, return the same values and set the same attributes.
+
+    Concurrency defaults to ``pool_maxsize`` unless ``max_workers`` is given
+    in ``config``.
+
+    """
+
+    def __init__(self, config=None, *args, **kwargs):
+        super(AsyncParty, self).__init__(*args, **kwargs)
+
+        self.files = []
+
+        # The serial default of Party's fan-out does not apply here, requests
+        # are bounded by pool_maxsize unless max_workers is configured.
+        serial_default = not config or 'max_workers' not in config
+        if not isinstance(config, PartyConfig):
+            config = PartyConfig(config)
+        self.config = config
+
+        for k, v in config.items():
+            if k == 'max_workers' and serial_default:
+                continue
+            existing_attribute = getattr(self, k, None)
+            if not existing_attribute:
+                if isinstance(v, Mapping):
+                    v = dict(v)
+                setattr(self, '%s' % (k,), v)
+
+    async def query_artifactory(self, query, query_type='get', dry=False,
+                                **kwargs):
+        """Send request to Artifactory API endpoint.
+
+        Args:
+            query (str): The URL (including endpoint) to send to the
+                Artifactory API.
+            query_type (str): CRUD method, get, put, delete or post.
+            dry (bool): Test run request.
+            **kwargs: Extra keyword arguments for
+                :meth:`aiohttp.ClientSession.request`.
+
+        Returns:
+            AsyncResponse: Artifactory response, ``None`` on a bad status.
+
+        """
+        query_type = query_type.lower()
+        if query_type not in QUERY_TYPES:
+            raise UnknownQueryType('Unsupported query type: %s' % query_type)
+
+        if dry:
+            self.log.info('Would send "%s" request to: %s', query_type, query)
+            content = json.dumps({
+                'message': 'Dry mode enabled.',
+                'query': query,
+                'query_type': query_type
+            })
+            return AsyncResponse(200, content.encode(), url=query)
+
+        if query_type == 'put':
+            kwargs['data'] = query.split('?', 1)[1]
+
+        response = await self.send(query_type, query, **kwargs)
+        if not response.ok:
+            return None
+
+        return response
+
+    async def query_file_info(self, filename):
+        """Get file details for ``filename`` from the storage API."""
+        query = "%s/storage/%s" % (self.artifactory_url, filename)
+
+        raw_response = await self.query_artifactory(query)
+        if raw_response is None:
+            return raw_response
+
+        return json.loads(raw_response.text)
+
+    async def find_by_properties(self, properties):
+        """Look up artifacts by properties, see :meth:`party.Party.find_by_properties`."""
+        query = "%s/%s?%s" % (self.artifactory_url,
+                              self.search_prop, urlencode(properties))
+        raw_response = await self.query_artifactory(query)
+        if raw_response is None:
+            return raw_response
+
+        response = json.loads(raw_response.text)
+
+        for item in response['results']:
+            for k, v in item.items():
+                setattr(self, '%s' % (k,), v)
+
+        if not response['results']:
+            return None
+
+        artifact_list = [os.path.basename(u['uri'])
+                         for u in response['results']]
+
+        self.files = artifact_list
+        setattr(self, 'count', len(artifact_list))
+
+        return "OK"
+
+    async def find(self, filename):
+        """Look up artifacts by filename, see :meth:`party.Party.find`."""
+        query = "%s/%s?name=%s" % (self.artifactory_url,
+                                   self.search_name, filename)
+        raw_response = await self.query_artifactory(query)
+        if raw_response is None:
+            return raw_response
+
+        response = json.loads(raw_response.text)
+        if len(response['results']) < 1:
+            return None
+
+        setattr(self, 'name', filename)
+        setattr(self, 'url', json.dumps(response))
+
+        return "OK"
+
+    async def get_properties(self, filename, properties=None):
+        """Get artifact properties, see :meth:`party.Party.get_properties`."""
+        if properties:
+            query = "%s?properties=%s" % (filename, ",".join(properties))
+        else:
+            query = "%s?properties" % filename
+
+        raw_response = await self.query_artifactory(query)
+        if raw_response is None:
+            return raw_response
+
+        response = json.loads(raw_response.text)
+        for key, value in response.items():
+            setattr(self, '%s' % (key,), value)
+
+        return "OK"
+
+    async def get_file_info(self, filename):
+        """Get artifact file info, see :meth:`party.Party.get_file_info`."""
+        response = await self.query_file_info(filename)
+        if response is None:
+            return response
+
+        setattr(self, 'file_info', response)
+        return "OK"
+
+    async def delete_item(self, item_path):
+        """Delete a file or folder, see :meth:`party.Party.delete_item`."""
+        query = "%s/%s" % (self.artifactory_url.replace('/api', ''), item_path)
+        response = await self.query_artifactory(query, "delete")
+        if response is None:
+            return "OK nothing to delete"
+        if response.status_code == 204:
+            return "OK"
+        return response
+
+    async def set_properties(self, file_url, properties):
+        """Set artifact properties, see :meth:`party.Party.set_properties`."""
+        query = "%s?properties=%s" % (
+            file_url, urlencode(properties).replace('&', '|'))
+        response = await self.query_artifactory(query, "put")
+        if response is None:
+            return response
+
+        return "OK"
+
+    async def get_repositories(self, repo_type=None):
+        """Get repository names, see :meth:`party.Party.get_repositories`."""
+        if repo_type is None:
+            query = "%s/%s" % (self.artifactory_url, self.search_repos)
+        else:
+            query = "%s/%s?type=%s" % (self.artifactory_url,
+                                       self.search_repos, repo_type)
+
+        raw_response = await self.query_artifactory(query)
+        if raw_response is None:
+            return raw_response
+
+        repositories = [line["key"] for line in json.loads(raw_response.text)]
+        if repositories:
+            return repositories
+
+        return None
+
+    async def find_by_pattern(self, filename, specific_repo=None,
+                              repo_type=None, max_depth=10,
+                              ignore_errors=False):
+        """Look up artifacts by partial filename.
+
+        See :meth:`party.Party.find_by_pattern`, every repo and depth is
+        searched concurrently within the client's ``max_workers`` bound.
+
+        """
+        if not filename:
+            raise ValueError("No filename specified.")
+
+        if repo_type not in ("local", "virtual", "remote", None):
+            raise ValueError(
+                "Invalid repo_type '%s' specified (valid types: 'local', "
+                "'virtual', 'remote', 'None'.)" % repo_type)
+
+        if filename[-1] != "*":
+            filename = "%s*" % filename
+        if filename[0] != "*":
+            filename = "*%s" % filename
+
+        patterns = ["*/" * p for p in range(0, max_depth)]
+
+        if specific_repo is not None:
+            repos = [specific_repo]
+        else:
+            repos = await self.get_repositories(repo_type)
+            if repos is None:
+                return None
+
+        queries = ["%s/search/pattern?pattern=%s:%s%s" % (
+            self.artifactory_url, repo, pattern, filename)
+                   for repo in repos for pattern in patterns]
+        searches = [asyncio.ensure_future(self.query_artifactory(query))
+                    for query in queries]
+
+        results = []
+        try:
+            for search in searches:
+                raw_response = await search
+                if raw_response is None:
+                    if ignore_errors:
+                        continue
+                    return None
+
+                response = json.loads(raw_response.text)
+                for i in response.get('files') or []:
+                    results.append("%s/%s" % (response['repoUri'], i))
+        finally:
+            for search in searches:
+                search.cancel()
+
+        if not results:
+            return None
+
+        self.files = results
+        return "OK"
+
+    async def find_by_aql(self, aql=None, **kwargs):
+        """Find artifacts using AQL, see :func:`party.party_aql.find_by_aql`."""
+        if aql is None:
+            aql = Aql(**kwargs)
+        statement = getattr(aql, 'aql', aql)
+
+        url = '/'.join([self.artifactory_url, 'search/aql'])
+        headers = dict(self.headers)
+        headers['Content-type'] = 'text/plain'
+
+        results = await self.query_artifactory(url, data=statement,
+                                               headers=headers,
+                                               query_type='post')
+        if results is None:
+            return results
+
+        return results.json()
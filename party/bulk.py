@@ -0,0 +1,128 @@
+"""Batch operations over many artifacts."""
+import collections
+import io
+import logging
+import os
+import threading
+
+from .fanout import iter_fan_out
+from .ratelimit import TokenBucket
+
+LOG = logging.getLogger(__name__)
+
+OK = 'ok'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+ItemResult = collections.namedtuple('ItemResult', 'path status detail')
+ItemResult.__doc__ = """Outcome of a batch operation on one artifact.
+
+Attributes:
+    path (str): ``repo/path`` of the artifact.
+    status (str): ``ok``, ``not_found`` or ``error``.
+    detail (str): HTTP status or error message.
+
+"""
+
+
+def item_path(item):
+    """Return ``repo/path/name`` of a path string or AQL result.
+
+    Args:
+        item (str or dict): Path, e.g. ``/repo/dir/a.rpm``, or an AQL result
+            with ``repo``, ``path`` and ``name``.
+
+    Returns:
+        str: Path without leading or trailing slashes.
+
+    """
+    if isinstance(item, dict):
+        parts = [item['repo'], item.get('path', '.'), item.get('name', '')]
+        return '/'.join(part for part in parts if part and part != '.')
+    return item.strip('/')
+
+
+def classify(path, response):
+    """Turn a response into an :class:`ItemResult`."""
+    if response.ok:
+        return ItemResult(path, OK, str(response.status_code))
+    if response.status_code == 404:
+        return ItemResult(path, NOT_FOUND, str(response.status_code))
+    return ItemResult(path, ERROR, 'HTTP %d' % response.status_code)
+
+
+class Checkpoint(object):
+    """Append-only record of finished items for resuming a batch.
+
+    Each line of the file holds one path that finished as ``ok`` or
+    ``not_found``. Failed items are not recorded and are tried again when the
+    batch is resumed.
+
+    Args:
+        path (str): Checkpoint file, created if missing.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.finished = set()
+
+        if os.path.exists(path):
+            with io.open(path, encoding='utf-8') as handle:
+                self.finished.update(line.rstrip('\n') for line in handle)
+            self.finished.discard('')
+
+    def __contains__(self, path):
+        return path in self.finished
+
+    def record(self, path):
+        """Mark ``path`` as finished."""
+        with self.lock:
+            if path in self.finished:
+                return
+            with io.open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(u'%s\n' % path)
+            self.finished.add(path)
+
+
+def run_batch(operation, items, max_workers=1, rate=0, checkpoint=None):
+    """Run ``operation`` on each item concurrently.
+
+    Args:
+        operation (callable): Called with each ``repo/path``, returns an
+            :class:`ItemResult`.
+        items (iterable): Paths or AQL results, see :func:`item_path`.
+        max_workers (int): Maximum number of concurrent operations.
+        rate (float): Maximum operations started per second, ``0`` for no
+            limit.
+        checkpoint (str, optional): Checkpoint file, items it already lists
+            are skipped.
+
+    Yields:
+        ItemResult: Outcome of each item, in order of completion.
+
+    """
+    bucket = TokenBucket(rate)
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint)
+
+    def paths():
+        for item in items:
+            path = item_path(item)
+            if checkpoint is not None and path in checkpoint:
+                LOG.debug('Skipping finished item %s', path)
+                continue
+            yield path
+
+    def limited(path):
+        bucket.acquire()
+        return operation(path)
+
+    for path, result, error in iter_fan_out(limited, paths(), max_workers):
+        if error is not None:
+            LOG.warning('Batch operation failed for %s: %s', path, error)
+            result = ItemResult(path, ERROR, str(error))
+        elif checkpoint is not None and result.status != ERROR:
+            checkpoint.record(path)
+        yield result
@@ -0,0 +1,233 @@
+"""Response cache for read-only Artifactory lookups."""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+
+
+def auth_scope(username, password):
+    """Hash credentials into a cache key prefix, see :func:`cache_key`.
+
+    Args:
+        username (str): Artifactory user.
+        password (str): Password as configured.
+
+    Returns:
+        str: Hex digest, the same for the same credentials.
+
+    """
+    credentials = u'%s:%s' % (username, password)
+    return hashlib.sha256(credentials.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(query, data=None, scope=None):
+    """Build a cache key from a request URL and body.
+
+    Scheme and host are lowercased and query parameters sorted so equivalent
+    URLs share an entry. The body, e.g. an AQL statement, is appended with
+    surrounding whitespace removed.
+
+    Args:
+        query (str): Request URL.
+        data (str, optional): Request body.
+        scope (str, optional): Credentials the request is sent with, see
+            :func:`auth_scope`. Responses cached for one user are never
+            served to another, whose permissions may differ.
+
+    Returns:
+        str: Normalized key.
+
+    """
+    url, _, params = query.partition('?')
+    scheme, sep, rest = url.partition('://')
+    if sep:
+        host, slash, path = rest.partition('/')
+        url = '%s://%s%s%s' % (scheme.lower(), host.lower(), slash, path)
+    if params:
+        url = '%s?%s' % (url, '&'.join(sorted(params.split('&'))))
+
+    if scope:
+        url = '%s %s' % (scope, url)
+
+    if data is None:
+        return url
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return '%s\n%s' % (url, data.strip())
+
+
+class CacheEntry(object):
+    """Cached response and its validators.
+
+    Attributes:
+        response (requests.models.Response): Fully read response.
+        expires (float): Time after which the entry must be revalidated.
+        etag (str): ``ETag`` header of the response, if any.
+        last_modified (str): ``Last-Modified`` header of the response, if any.
+
+    """
+
+    __slots__ = ('response', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, response, expires):
+        self.response = response
+        self.expires = expires
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+
+    @property
+    def fresh(self):
+        """bool: Entry can be used without asking Artifactory."""
+        return time.time() < self.expires
+
+    def validators(self):
+        """Conditional request headers to revalidate this entry.
+
+        Returns:
+            dict: ``If-None-Match`` and/or ``If-Modified-Since`` headers.
+
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """Thread safe LRU cache with per-endpoint time to live.
+
+    Args:
+        max_entries (int): Maximum number of cached responses, the least
+            recently used one is evicted first.
+        ttl (dict): Seconds to cache responses of each endpoint, see
+            :func:`party.endpoints.endpoint_name`. ``default`` applies to
+            endpoints not listed, ``0`` disables caching.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to query Artifactory.
+        revalidations (int): Expired entries confirmed unchanged by
+            Artifactory.
+        evictions (int): Entries dropped to stay below ``max_entries``.
+        invalidations (int): Entries dropped because their item changed.
+
+    """
+
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = dict(ttl or {})
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def ttl_for(self, endpoint):
+        """Seconds to cache responses of ``endpoint``."""
+        return self.ttl.get(endpoint, self.ttl.get('default', 0))
+
+    def get(self, key):
+        """Find the entry for ``key`` and mark it recently used.
+
+        Fresh entries count as a hit, anything else as a miss.
+
+        Returns:
+            CacheEntry: Cached entry, possibly expired, or ``None``.
+
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries[key] = entry
+            if entry.fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def set(self, key, response, endpoint):
+        """Cache ``response`` when ``endpoint`` has a time to live."""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = CacheEntry(response, time.time() + ttl)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def revalidated(self, key, endpoint):
+        """Extend an entry Artifactory answered ``304 Not Modified`` for.
+
+        Returns:
+            requests.models.Response: Cached response, ``None`` if the entry
+            has been dropped meanwhile.
+
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = time.time() + self.ttl_for(endpoint)
+            self.revalidations += 1
+            return entry.response
+
+    def invalidate(self, path):
+        """Drop every entry whose key contains ``path``.
+
+        Args:
+            path (str): Repository path of a changed item, its children are
+                dropped as well.
+
+        """
+        path = path.strip('/')
+        if not path:
+            return
+
+        with self.lock:
+            stale = [key for key in self.entries if path in key]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+
+        LOG.debug('Invalidated %d cached responses for %s', len(stale), path)
+
+    def clear(self):
+        """Drop every entry."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Return cache counters.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``revalidations``, ``evictions``,
+            ``invalidations`` and current ``size``.
+
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self.entries),
+        }
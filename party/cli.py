@@ -0,0 +1,289 @@
+"""Command line interface to Artifactory.
+
+Every command runs one operation and prints its outcome as a JSON line.
+``party batch`` reads operations as JSON lines from a file or stdin, runs
+them concurrently over one pooled client and prints each outcome as soon as
+it completes::
+
+    $ party find foo-1.2.0.rpm
+    $ echo '{"op": "props-get", "path": "repo/foo-1.2.0.rpm", "id": 1}' | \\
+        party batch --workers 8
+
+The client is configured with ``--config`` (JSON file of ``party_config``
+overrides), ``--url`` and ``--username``; the base64 encoded password is
+read from ``PARTY_PASSWORD``. Heavy modules are imported once an operation
+runs, so ``--help`` and argument errors return immediately.
+"""
+import argparse
+import json
+import os
+import sys
+
+from .fanout import iter_fan_out
+
+OPERATIONS = {}
+
+
+def operation(name):
+    """Register a function running operation ``name`` of a batch."""
+    def register(func):
+        OPERATIONS[name] = func
+        return func
+    return register
+
+
+def jsonable(value):
+    """Turn result objects into JSON serializable values."""
+    if hasattr(value, '_asdict'):
+        return dict((key, jsonable(item))
+                    for key, item in value._asdict().items())
+    if isinstance(value, dict):
+        return dict((key, jsonable(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+@operation('find')
+def find(client, name):
+    """Artifacts named ``name``."""
+    return client.fetch_by_name(name)
+
+
+@operation('find-by-props')
+def find_by_props(client, properties):
+    """Artifacts having every property of ``properties``."""
+    return client.fetch_by_properties(properties)
+
+
+@operation('pattern')
+def find_pattern(client, pattern, repo=None, repo_type=None, max_depth=10):
+    """Artifacts whose name matches a glob, as one AQL search."""
+    urls = client.search_pattern_aql(pattern, repo, repo_type, max_depth)
+    if urls is None:
+        raise RuntimeError('Pattern search failed')
+    return urls
+
+
+@operation('aql')
+def aql(client, criteria, fields=None, sort=None, limit=0):
+    """Results of an AQL search of items."""
+    return list(client.iter_aql(criteria=criteria, fields=fields,
+                                order_and_fields=sort, num_records=limit))
+
+
+@operation('props-get')
+def props_get(client, path, names=None):
+    """Properties of an artifact."""
+    return client.fetch_properties(path, names)
+
+
+@operation('props-set')
+def props_set(client, path, properties):
+    """Set properties on an artifact."""
+    if client.set_properties(client.storage_url(path), properties) is None:
+        raise RuntimeError('Setting properties failed: %s' % path)
+    return 'OK'
+
+
+@operation('delete')
+def delete(client, path, dry=False):
+    """Delete a file or folder."""
+    result = next(iter(client.delete_items([path], max_workers=1, dry=dry)))
+    if result.status == 'error':
+        raise RuntimeError('Delete failed: %s %s' % (path, result.detail))
+    return result
+
+
+@operation('download')
+def download(client, path, dest='.', verify=True):
+    """Download an artifact to a local file or directory."""
+    return client.download(path, dest, verify=verify)
+
+
+def run_one(client, entry):
+    """Run one batch entry and return its outcome record.
+
+    Args:
+        client (party.Party): Client running the operation.
+        entry (tuple): ``(line number, operation dict or JSON line)``.
+
+    Returns:
+        dict: ``id``, ``op`` and either ``result`` or ``error``, with ``ok``.
+
+    """
+    number, spec = entry
+    record = {'id': number, 'ok': False}
+    try:
+        if not isinstance(spec, dict):
+            spec = json.loads(spec)
+        spec = dict(spec)
+        record['id'] = spec.pop('id', number)
+        record['op'] = name = spec.pop('op', None)
+        func = OPERATIONS.get(name)
+        if func is None:
+            raise ValueError('Unknown operation: %r' % name)
+        record['result'] = jsonable(func(client, **spec))
+        record['ok'] = True
+    except Exception as error:  # pylint: disable=W0703
+        record['error'] = '%s: %s' % (type(error).__name__, error)
+    return record
+
+
+def read_batch(handle):
+    """Yield ``(line number, line)`` for every non-blank line."""
+    for number, line in enumerate(handle, 1):
+        if line.strip():
+            yield number, line
+
+
+def run(client, entries, workers, output):
+    """Run ``entries`` concurrently, writing each outcome as it completes.
+
+    Returns:
+        int: Number of failed operations.
+
+    """
+    failed = 0
+    for _, record, _ in iter_fan_out(lambda entry: run_one(client, entry),
+                                     entries, max_workers=workers):
+        failed += not record['ok']
+        output.write(json.dumps(record, sort_keys=True) + '\n')
+        output.flush()
+    return failed
+
+
+def make_client(args):
+    """Create the client described by the command line."""
+    from .party import Party
+
+    config = {}
+    if args.config:
+        with open(args.config) as handle:
+            config.update(json.load(handle))
+    if args.url:
+        config['artifactory_url'] = args.url
+    if args.username:
+        config['username'] = args.username
+    if os.environ.get('PARTY_PASSWORD'):
+        config['password'] = os.environ['PARTY_PASSWORD']
+    config['pool_maxsize'] = max(args.workers, config.get('pool_maxsize', 10))
+    return Party(config=config)
+
+
+def properties_arg(text):
+    """Parse ``key=value`` command line arguments."""
+    key, separator, value = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected key=value: %r' % text)
+    return key, value
+
+
+def build_parser():
+    """Return the argument parser of the ``party`` command."""
+    parser = argparse.ArgumentParser(
+        prog='party', description='Query and manage Artifactory.')
+    parser.add_argument('--config', help='JSON file of configuration values')
+    parser.add_argument('--url', help='Artifactory API URL')
+    parser.add_argument('--username', help='user name, the base64 encoded '
+                        'password is read from PARTY_PASSWORD')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='concurrent operations in batch mode')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    command = commands.add_parser('find', help='find artifacts by name')
+    command.add_argument('name')
+    command.set_defaults(op='find')
+
+    command = commands.add_parser('find-by-props',
+                                  help='find artifacts by properties')
+    command.add_argument('properties', nargs='+', type=properties_arg,
+                         metavar='key=value')
+    command.set_defaults(op='find-by-props')
+
+    command = commands.add_parser('pattern',
+                                  help='find artifacts by name glob')
+    command.add_argument('pattern')
+    command.add_argument('--repo')
+    command.add_argument('--repo-type', choices=('local', 'remote', 'virtual'))
+    command.add_argument('--max-depth', type=int, default=10)
+    command.set_defaults(op='pattern')
+
+    command = commands.add_parser('aql', help='search items with AQL')
+    command.add_argument('criteria', type=json.loads,
+                         help='criteria as JSON, e.g. \'{"repo": "libs"}\'')
+    command.add_argument('--fields', nargs='+')
+    command.add_argument('--sort', type=json.loads,
+                         help='sort as JSON, e.g. \'{"$asc": ["name"]}\'')
+    command.add_argument('--limit', type=int, default=0)
+    command.set_defaults(op='aql')
+
+    command = commands.add_parser('props', help='get or set properties')
+    props = command.add_subparsers(dest='action', metavar='action')
+    props.required = True
+    action = props.add_parser('get', help='get properties of an artifact')
+    action.add_argument('path')
+    action.add_argument('names', nargs='*')
+    action.set_defaults(op='props-get')
+    action = props.add_parser('set', help='set properties on an artifact')
+    action.add_argument('path')
+    action.add_argument('properties', nargs='+', type=properties_arg,
+                        metavar='key=value')
+    action.set_defaults(op='props-set')
+
+    command = commands.add_parser('delete', help='delete a file or folder')
+    command.add_argument('path')
+    command.add_argument('--dry', action='store_true')
+    command.set_defaults(op='delete')
+
+    command = commands.add_parser('download', help='download an artifact')
+    command.add_argument('path')
+    command.add_argument('dest', nargs='?', default='.')
+    command.add_argument('--no-verify', dest='verify', action='store_false')
+    command.set_defaults(op='download')
+
+    command = commands.add_parser(
+        'batch', help='run JSON line operations concurrently')
+    command.add_argument('file', nargs='?', default='-',
+                         help='file of operations, - for stdin (default)')
+
+    return parser
+
+
+def operation_spec(args):
+    """Return the batch entry equivalent to a single command."""
+    options = ('config', 'url', 'username', 'workers', 'command', 'action')
+    spec = dict((key, value) for key, value in vars(args).items()
+                if key not in options and value is not None)
+    if 'properties' in spec:
+        spec['properties'] = dict(spec['properties'])
+    if 'names' in spec and not spec['names']:
+        del spec['names']
+    return spec
+
+
+def main(argv=None):
+    """Entry point of the ``party`` command.
+
+    Returns:
+        int: Exit status, ``1`` when any operation failed.
+
+    """
+    args = build_parser().parse_args(argv)
+    client = make_client(args)
+
+    if args.command != 'batch':
+        failed = run(client, [(1, operation_spec(args))], 1, sys.stdout)
+    elif args.file == '-':
+        failed = run(client, read_batch(sys.stdin), args.workers, sys.stdout)
+    else:
+        with open(args.file) as handle:
+            failed = run(client, read_batch(handle), args.workers,
+                         sys.stdout)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
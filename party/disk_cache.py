@@ -0,0 +1,243 @@
+"""Persistent response cache shared between processes."""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .cache import CacheEntry
+
+LOG = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    content BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+'''
+
+
+class SqliteCache(object):
+    """SQLite backed response cache.
+
+    Drop-in backend for :class:`party.cache.ResponseCache` that keeps
+    responses in ``responses.sqlite`` inside ``directory``, so every process
+    on a host pointing at the same directory shares warm entries. The
+    database runs in WAL mode, readers never block each other and writers
+    wait for the lock instead of failing.
+
+    The directory is created with mode ``0700`` and the database with mode
+    ``0600``, SQLite gives its WAL files the same mode.
+
+    Args:
+        directory (str): Directory holding the database, created if missing.
+        max_entries (int): Maximum number of cached responses.
+        ttl (dict): Seconds to cache responses of each endpoint, see
+            :class:`party.cache.ResponseCache`.
+        max_bytes (int): Maximum total size of cached bodies, ``0`` for no
+            limit. Least recently used entries are evicted first.
+        timeout (float): Seconds to wait for another process holding the
+            write lock.
+
+    """
+
+    def __init__(self, directory, max_entries=1024, ttl=None, max_bytes=0,
+                 timeout=30):
+        self.path = os.path.join(directory, 'responses.sqlite')
+        self.max_entries = max_entries
+        self.ttl = dict(ttl or {})
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        # Cached responses carry whatever the configured user may read, keep
+        # them private to the owner.
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if not os.path.exists(self.path):
+            os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+
+        with self.connection as connection:
+            connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @property
+    def connection(self):
+        """sqlite3.Connection: Connection owned by the calling thread."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def count(self, counter, amount=1):
+        """Increment one of the counters."""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def ttl_for(self, endpoint):
+        """Seconds to cache responses of ``endpoint``."""
+        return self.ttl.get(endpoint, self.ttl.get('default', 0))
+
+    def get(self, key):
+        """Find the entry for ``key`` and mark it recently used.
+
+        Returns:
+            party.cache.CacheEntry: Cached entry, possibly expired, or
+            ``None``.
+
+        """
+        row = self.connection.execute(
+            'SELECT url, status, headers, content, expires, accessed '
+            'FROM responses WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            self.count('misses')
+            return None
+
+        url, status, headers, content, expires, accessed = row
+
+        # Recency only needs to be roughly right, skip taking the write lock
+        # for entries touched within the last second.
+        now = time.time()
+        if now - accessed > 1:
+            with self.connection as connection:
+                connection.execute(
+                    'UPDATE responses SET accessed = ? WHERE key = ?',
+                    (now, key))
+
+        entry = CacheEntry(load_response(url, status, headers, content),
+                           expires)
+        self.count('hits' if entry.fresh else 'misses')
+        return entry
+
+    def set(self, key, response, endpoint):
+        """Cache ``response`` when ``endpoint`` has a time to live."""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        now = time.time()
+        content = response.content
+        with self.connection as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.url or '', response.status_code,
+                 json.dumps(dict(response.headers)), sqlite3.Binary(content),
+                 len(content), now + ttl, now))
+            self.evict(connection)
+
+    def evict(self, connection):
+        """Drop least recently used entries beyond the size limits."""
+        evicted = connection.execute(
+            'DELETE FROM responses WHERE key IN ('
+            'SELECT key FROM responses ORDER BY accessed DESC '
+            'LIMIT -1 OFFSET ?)', (self.max_entries,)).rowcount
+
+        if self.max_bytes:
+            total = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            rows = connection.execute(
+                'SELECT key, size FROM responses ORDER BY accessed')
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            connection.executemany('DELETE FROM responses WHERE key = ?',
+                                   stale)
+            evicted += len(stale)
+
+        if evicted:
+            self.count('evictions', evicted)
+
+    def revalidated(self, key, endpoint):
+        """Extend an entry Artifactory answered ``304 Not Modified`` for.
+
+        Returns:
+            requests.models.Response: Cached response, ``None`` if the entry
+            has been dropped meanwhile.
+
+        """
+        now = time.time()
+        with self.connection as connection:
+            updated = connection.execute(
+                'UPDATE responses SET expires = ?, accessed = ? WHERE key = ?',
+                (now + self.ttl_for(endpoint), now, key)).rowcount
+            row = connection.execute(
+                'SELECT url, status, headers, content FROM responses '
+                'WHERE key = ?', (key,)).fetchone()
+
+        if not updated or row is None:
+            return None
+
+        self.count('revalidations')
+        return load_response(*row)
+
+    def invalidate(self, path):
+        """Drop every entry whose key contains ``path``."""
+        path = path.strip('/')
+        if not path:
+            return
+
+        with self.connection as connection:
+            dropped = connection.execute(
+                'DELETE FROM responses WHERE instr(key, ?) > 0',
+                (path,)).rowcount
+
+        self.count('invalidations', dropped)
+        LOG.debug('Invalidated %d cached responses for %s', dropped, path)
+
+    def clear(self):
+        """Drop every entry."""
+        with self.connection as connection:
+            connection.execute('DELETE FROM responses')
+
+    def stats(self):
+        """Return cache counters, see :meth:`party.cache.ResponseCache.stats`."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self),
+        }
+
+
+def load_response(url, status, headers, content):
+    """Rebuild a :class:`requests.models.Response` from a cached row."""
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(json.loads(headers))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = bytes(content)
+    response._content_consumed = True
+    return response
@@ -0,0 +1,85 @@
+"""Classify Artifactory URLs by endpoint."""
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+
+def endpoint_name(url, base_url):
+    """Name the API endpoint a URL belongs to.
+
+    Examples:
+        >>> endpoint_name('http://host/api/storage/repo/a.rpm', 'http://host/api')
+        'storage'
+        >>> endpoint_name('http://host/api/search/prop?a=b', 'http://host/api')
+        'search/prop'
+        >>> endpoint_name('http://host/api/storage/repo/a.rpm?properties', 'http://host/api')
+        'properties'
+
+    Args:
+        url (str): Full request URL.
+        base_url (str): Artifactory API URL, see ``artifactory_url``.
+
+    Returns:
+        str: Endpoint name, ``item`` for repository content outside the API
+        and ``''`` when the URL does not belong to ``base_url``.
+
+    """
+    path, _, query = url.partition('?')
+    if query.split('&', 1)[0].split('=', 1)[0] == 'properties':
+        return 'properties'
+
+    base_url = base_url.rstrip('/')
+    if path.startswith(base_url + '/'):
+        segments = path[len(base_url) + 1:].split('/')
+        if segments[0] == 'search' and len(segments) > 1:
+            return 'search/%s' % segments[1]
+        return segments[0]
+
+    if path.startswith(base_url.replace('/api', '') + '/'):
+        return 'item'
+
+    return ''
+
+
+def repo_path(url, base_url):
+    """Return the ``repo/path`` part of a storage, item or API URL.
+
+    Args:
+        url (str): Storage API URL, item URL or bare ``repo/path``.
+        base_url (str): Artifactory API URL, see ``artifactory_url``.
+
+    Returns:
+        str: Repository key and path without leading or trailing slashes.
+
+    """
+    path = url.partition('?')[0]
+    base_url = base_url.rstrip('/')
+
+    for prefix in (base_url + '/storage/', base_url.replace('/api', '') + '/'):
+        if path.startswith(prefix):
+            return path[len(prefix):].strip('/')
+
+    if '://' in path:
+        path = urlsplit(path).path
+    return path.strip('/')
+
+
+def item_url(path, base_url):
+    """Return the download URL of an item.
+
+    Examples:
+        >>> item_url('repo/dir/a.rpm', 'http://host/artifactory/api')
+        'http://host/artifactory/repo/dir/a.rpm'
+
+    Args:
+        path (str): Storage API URL, item URL or bare ``repo/path``, see
+            :func:`repo_path`.
+        base_url (str): Artifactory API URL, see ``artifactory_url``.
+
+    Returns:
+        str: Item URL outside the API.
+
+    """
+    return '%s/%s' % (base_url.rstrip('/').replace('/api', ''),
+                      repo_path(path, base_url))
@@ -2,9 +2,9 @@
 # Sample usage of Party
 # Extracting artifact properties
 #
-import os
 import sys
-from party import *
+
+from party import Party
 
 artifact = Party()
 
@@ -13,18 +13,19 @@ myProps = {
     "build.number": 189,  # ${bamboo.buildNumber}
 }
 
-res = artifact.find_by_properties(myProps)
-if res is None:
-    print "No artifact found."
+artifacts = artifact.fetch_by_properties(myProps)
+if not artifacts:
+    print("No artifact found.")
     sys.exit(1)
 
-res = artifact.get_properties(artifact.uri)
-
-for k in artifact.properties:
-    for v in artifact.properties[k]:
-        print "%s: %s" % (k, v)
+for ref in artifacts:
+    print(ref.path)
 
-for a in artifact.list:
-    print a
+    props = artifact.fetch_properties(ref.path)
+    if props is None:
+        continue
+    for k in props.properties:
+        for v in props.values(k):
+            print("%s: %s" % (k, v))
 
-print artifact.count
+print(len(artifacts))
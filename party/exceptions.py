@@ -7,3 +7,15 @@ class PartyError(Exception):
 
 class UnknownQueryType(PartyError):
     """Query type is not supported."""
+
+
+class RequestFailed(PartyError):
+    """Artifactory did not respond with a good status."""
+
+
+class CircuitOpen(PartyError):
+    """Artifactory is failing, requests are not sent until it recovers."""
+
+
+class ChecksumMismatch(PartyError):
+    """Transferred content does not match the checksum Artifactory reports."""
@@ -0,0 +1,116 @@
+"""Bounded concurrent execution of request fan-outs."""
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+LOG = logging.getLogger(__name__)
+
+
+def fan_out(func, items, max_workers=1, stop_on_error=True):
+    """Call ``func`` for every item using a bounded thread pool.
+
+    Results are returned in the order of ``items`` regardless of the order in
+    which the calls complete, so merging them is deterministic.
+
+    Args:
+        func (callable): Called with each item.
+        items (iterable): Arguments for ``func``.
+        max_workers (int): Maximum number of concurrent calls, ``1`` or less
+            runs every call serially in the calling thread.
+        stop_on_error (bool): Re-raise the first exception and cancel every
+            call that has not started yet. Otherwise failed calls are logged
+            and their result is ``None``.
+
+    Returns:
+        list: Return value of ``func`` for each item.
+
+    """
+    items = list(items)
+    results = [None] * len(items)
+
+    if max_workers is None or max_workers <= 1:
+        for index, item in enumerate(items):
+            results[index] = _call(func, item, stop_on_error)
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = dict((executor.submit(func, item), index)
+                       for index, item in enumerate(items))
+
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception:  # pylint: disable=W0703
+                if stop_on_error:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                LOG.warning('Call failed for %r', items[index], exc_info=True)
+    finally:
+        executor.shutdown(wait=True)
+
+    return results
+
+
+def iter_fan_out(func, items, max_workers=1):
+    """Call ``func`` for every item and yield outcomes as calls complete.
+
+    Items are consumed lazily, at most twice ``max_workers`` calls are
+    submitted at once, so arbitrarily long iterables run in bounded memory.
+
+    Args:
+        func (callable): Called with each item.
+        items (iterable): Arguments for ``func``.
+        max_workers (int): Maximum number of concurrent calls, ``1`` or less
+            runs every call serially in the calling thread.
+
+    Yields:
+        tuple: ``(item, result, error)`` where ``error`` is the exception
+        raised by the call, or ``None``.
+
+    """
+    if max_workers is None or max_workers <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as error:  # pylint: disable=W0703
+                yield item, None, error
+        return
+
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    try:
+        while True:
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                if len(pending) >= 2 * max_workers:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, error
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _call(func, item, stop_on_error):
+    """Serial counterpart of a single pooled call."""
+    try:
+        return func(item)
+    except Exception:  # pylint: disable=W0703
+        if stop_on_error:
+            raise
+        LOG.warning('Call failed for %r', item, exc_info=True)
+    return None
@@ -0,0 +1,356 @@
+"""Local snapshot of repository contents for fast lookups."""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .bulk import item_path
+from .endpoints import repo_path
+from .results import ArtifactRef, FileInfo, PropertySet
+
+LOG = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+    path TEXT PRIMARY KEY,
+    repo TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    created TEXT,
+    modified TEXT,
+    sha256 TEXT,
+    sha1 TEXT,
+    md5 TEXT
+);
+CREATE INDEX IF NOT EXISTS items_name ON items (name);
+CREATE INDEX IF NOT EXISTS items_sha256 ON items (sha256);
+CREATE INDEX IF NOT EXISTS items_sha1 ON items (sha1);
+CREATE INDEX IF NOT EXISTS items_md5 ON items (md5);
+CREATE TABLE IF NOT EXISTS properties (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS properties_key ON properties (key, value);
+CREATE INDEX IF NOT EXISTS properties_path ON properties (path);
+CREATE TABLE IF NOT EXISTS repos (
+    repo TEXT PRIMARY KEY,
+    high_water TEXT,
+    refreshed REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+INDEX_FIELDS = ['repo', 'path', 'name', 'size', 'created', 'modified',
+                'sha256', 'actual_sha1', 'actual_md5', 'property.*']
+
+
+def property_pairs(properties):
+    """Return ``(key, value)`` pairs of a dict or list of pairs."""
+    if hasattr(properties, 'items'):
+        properties = properties.items()
+    return [(key, str(value)) for key, value in properties]
+
+
+class RepoIndex(object):
+    """SQLite snapshot of the files and properties of repositories.
+
+    Built from streamed AQL by :meth:`refresh`, then answers name, glob,
+    property and checksum lookups locally with the result objects of the
+    ``fetch_*`` methods of :class:`party.Party`. Lookups are only as recent
+    as the last refresh. Each thread uses its own connection.
+
+    Examples:
+        >>> index = artifact.build_index('repos.sqlite', ['rpm-local'])
+        >>> index.find('foo-1.2*.rpm')
+        [ArtifactRef(path='rpm-local/foo/foo-1.2.0.rpm', uri='...')]
+        >>> index.find_by_properties({'build.number': '189'})
+
+    Args:
+        path (str): Database file, created if missing.
+        timeout (float): Seconds to wait for another process writing.
+
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        with self.connection as connection:
+            connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM items').fetchone()[0]
+
+    @property
+    def connection(self):
+        """sqlite3.Connection: Connection owned by the calling thread."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    @property
+    def base_url(self):
+        """str: API URL of the Artifactory instance indexed."""
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'base_url'").fetchone()
+        return row[0] if row else ''
+
+    @property
+    def repos(self):
+        """dict: High-water mark of each indexed repository."""
+        return dict(self.connection.execute(
+            'SELECT repo, high_water FROM repos'))
+
+    def refresh(self, client, repos=None, full=False, page_size=1000):
+        """Update the snapshot from Artifactory.
+
+        Only files modified since the previous refresh of a repository are
+        listed. Files deleted remotely stay in the snapshot until a ``full``
+        refresh, which lists and replaces the whole repository.
+
+        Args:
+            client (party.Party): Client sending the AQL searches.
+            repos (iterable, optional): Repository keys, defaults to every
+                repository indexed so far.
+            full (bool): Rebuild the repositories from scratch.
+            page_size (int): AQL records requested per page.
+
+        Returns:
+            int: Files added or updated.
+
+        Raises:
+            party.exceptions.RequestFailed: Listing a repository failed.
+
+        """
+        known = self.repos
+        repos = sorted(known) if repos is None else list(repos)
+        updated = 0
+
+        with self.lock:
+            for repo in repos:
+                since = None if full else known.get(repo)
+                updated += self.refresh_repo(client, repo, since, page_size)
+        return updated
+
+    def refresh_repo(self, client, repo, since, page_size):
+        """List one repository, replacing it entirely unless ``since``."""
+        start = time.time()
+        criteria = {'repo': repo, 'type': 'file'}
+        if since is not None:
+            criteria['modified'] = {'$gte': since}
+
+        items = client.iter_aql(page_size=page_size, criteria=criteria,
+                                fields=INDEX_FIELDS,
+                                order_and_fields={'$asc': ['path', 'name']})
+
+        count = 0
+        high_water = since
+        batch = []
+        # One transaction per repository, lookups keep seeing the previous
+        # snapshot until it is complete.
+        with self.connection as connection:
+            connection.execute("INSERT OR REPLACE INTO meta VALUES "
+                               "('base_url', ?)", (client.artifactory_url,))
+            if since is None:
+                connection.execute(
+                    'DELETE FROM properties WHERE path IN '
+                    '(SELECT path FROM items WHERE repo = ?)', (repo,))
+                connection.execute('DELETE FROM items WHERE repo = ?',
+                                   (repo,))
+
+            for item in items:
+                batch.append(item)
+                modified = item.get('modified')
+                if modified and (high_water is None or modified > high_water):
+                    high_water = modified
+                if len(batch) >= page_size:
+                    count += self.store(connection, batch)
+                    batch = []
+            count += self.store(connection, batch)
+
+            connection.execute('INSERT OR REPLACE INTO repos VALUES (?, ?, ?)',
+                               (repo, high_water, time.time()))
+
+        LOG.info('Indexed %d files of %s in %.2fs', count, repo,
+                 time.time() - start)
+        return count
+
+    @staticmethod
+    def store(connection, items):
+        """Insert or replace AQL results and their properties."""
+        rows = []
+        properties = []
+        for item in items:
+            path = item_path(item)
+            rows.append((path, item['repo'], item['name'], item.get('size'),
+                         item.get('created'), item.get('modified'),
+                         item.get('sha256'), item.get('actual_sha1'),
+                         item.get('actual_md5')))
+            properties.extend((path, prop['key'], prop.get('value', ''))
+                              for prop in item.get('properties') or ())
+
+        connection.executemany(
+            'DELETE FROM properties WHERE path = ?', [row[:1] for row in rows])
+        connection.executemany(
+            'INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows)
+        connection.executemany('INSERT INTO properties VALUES (?, ?, ?)',
+                               properties)
+        return len(rows)
+
+    def refs(self, paths):
+        """Turn ``repo/path`` strings into :class:`ArtifactRef` objects."""
+        storage = self.base_url + '/storage/'
+        return [ArtifactRef(path, storage + path) for path in paths]
+
+    def find(self, pattern, repos=None):
+        """Find files by name or wildcard pattern (``*``, ``?``).
+
+        Args:
+            pattern (str): File name or glob, e.g. ``foo-1.2*.rpm``.
+            repos (iterable, optional): Only search these repositories.
+
+        Returns:
+            list: :class:`party.results.ArtifactRef` of each file, the shape
+            of :meth:`party.Party.fetch_by_name`.
+
+        """
+        operator = 'GLOB' if set('*?[') & set(pattern) else '='
+        query = 'SELECT path FROM items WHERE name %s ?' % operator
+        params = [pattern]
+        if repos is not None:
+            repos = list(repos)
+            query += ' AND repo IN (%s)' % ', '.join('?' * len(repos))
+            params.extend(repos)
+        rows = self.connection.execute(query + ' ORDER BY path', params)
+        return self.refs(row[0] for row in rows)
+
+    def find_by_properties(self, properties):
+        """Find files having every given property value.
+
+        Args:
+            properties (dict or list): ``{key: value}`` or ``(key, value)``
+                pairs.
+
+        Returns:
+            list: :class:`party.results.ArtifactRef` of each file, the shape
+            of :meth:`party.Party.fetch_by_properties`.
+
+        """
+        pairs = property_pairs(properties)
+        if not pairs:
+            return []
+        query = ' INTERSECT '.join(
+            ['SELECT path FROM properties WHERE key = ? AND value = ?'] *
+            len(pairs))
+        params = [part for pair in pairs for part in pair]
+        rows = self.connection.execute(query + ' ORDER BY path', params)
+        return self.refs(row[0] for row in rows)
+
+    def find_by_checksum(self, checksum):
+        """Find files by SHA-256, SHA-1 or MD5 hex digest.
+
+        Returns:
+            list: :class:`party.results.ArtifactRef` of each file.
+
+        """
+        checksum = checksum.lower()
+        column = {64: 'sha256', 40: 'sha1', 32: 'md5'}.get(len(checksum))
+        if column is None:
+            raise ValueError('Not a SHA-256, SHA-1 or MD5 digest: %r'
+                             % checksum)
+        rows = self.connection.execute(
+            'SELECT path FROM items WHERE %s = ? ORDER BY path' % column,
+            (checksum,))
+        return self.refs(row[0] for row in rows)
+
+    def properties(self, path):
+        """Return the properties of a file.
+
+        Args:
+            path (str): ``repo/path`` of the file, or its storage or item URL.
+
+        Returns:
+            party.results.PropertySet: Properties, ``None`` for files without
+            any, like :meth:`party.Party.fetch_properties`.
+
+        """
+        path = repo_path(path, self.base_url)
+        values = {}
+        for key, value in self.connection.execute(
+                'SELECT key, value FROM properties WHERE path = ? '
+                'ORDER BY rowid', (path,)):
+            values.setdefault(key, []).append(value)
+        if not values:
+            return None
+        return PropertySet(path, values)
+
+    def file_info(self, path):
+        """Return the details of a file.
+
+        Args:
+            path (str): ``repo/path`` of the file, or its storage or item URL.
+
+        Returns:
+            party.results.FileInfo: Details, ``None`` for unknown files, like
+            :meth:`party.Party.fetch_file_info`. ``mime_type`` is empty.
+
+        """
+        path = repo_path(path, self.base_url)
+        row = self.connection.execute(
+            'SELECT size, created, modified, sha256, sha1, md5 FROM items '
+            'WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return None
+        size, created, modified, sha256, sha1, md5 = row
+        checksums = dict((algorithm, digest) for algorithm, digest in
+                         (('sha256', sha256), ('sha1', sha1), ('md5', md5))
+                         if digest)
+        base = self.base_url
+        return FileInfo(
+            path=path,
+            uri='%s/storage/%s' % (base, path),
+            download_uri='%s/%s' % (base.replace('/api', ''), path),
+            size=int(size or 0),
+            mime_type='',
+            created=created or '',
+            last_modified=modified or '',
+            checksums=checksums)
+
+
+def build_index(self, path, repos=None, full=False, page_size=1000):
+    """Open a local snapshot of repositories and bring it up to date.
+
+    See :class:`party.index.RepoIndex`. The first call for a repository
+    lists all of its files, later calls only files modified since.
+
+    Args:
+        path (str): Database file, created if missing.
+        repos (iterable, optional): Repository keys, defaults to every
+            repository the snapshot already holds.
+        full (bool): Rebuild the repositories from scratch, dropping files
+            deleted remotely.
+        page_size (int): AQL records requested per page.
+
+    Returns:
+        party.index.RepoIndex: The refreshed snapshot.
+
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    index = RepoIndex(path)
+    index.refresh(self, repos, full=full, page_size=page_size)
+    return index
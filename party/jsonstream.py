@@ -0,0 +1,165 @@
+"""Incremental parsing of JSON arrays from streamed responses."""
+import codecs
+import json
+
+DECODER = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+NUMBER = frozenset('0123456789.eE+-')
+
+
+class JsonStream(object):
+    """Text buffer over an iterable of byte chunks.
+
+    Only the part of the body that has not been parsed yet is kept, values are
+    decoded with :meth:`json.JSONDecoder.raw_decode` as soon as they are
+    complete.
+
+    Args:
+        chunks (iterable): Byte chunks, e.g. from
+            :meth:`requests.models.Response.iter_content`.
+        encoding (str): Body encoding.
+
+    """
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size=0):
+        """Read chunks until at least ``min_size`` characters are buffered.
+
+        Returns:
+            bool: More text was buffered, ``False`` at the end of the body.
+
+        """
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        size = len(self.text)
+
+        for chunk in self.chunks:
+            if chunk:
+                self.text += self.decoder.decode(chunk)
+            if len(self.text) > size and len(self.text) >= min_size:
+                return True
+
+        if not self.eof:
+            self.text += self.decoder.decode(b'', True)
+            self.eof = True
+        return len(self.text) > size
+
+    def peek(self):
+        """Skip whitespace and return the next character, ``''`` at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters):
+        """Consume the next character, which must be one of ``characters``."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of %r at %r' % (
+                characters, self.text[self.pos:self.pos + 20]))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.text, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self.fill(2 * (len(self.text) - self.pos))
+                continue
+
+            # A number or literal ending the buffer may continue in the next
+            # chunk, e.g. '12' of '123' or '1500' followed by '.' of '1500.0'.
+            if not self.eof and (end == len(self.text) or (
+                    isinstance(value, (int, float)) and
+                    not isinstance(value, bool) and
+                    NUMBER.issuperset(self.text[end:]))):
+                self.fill(len(self.text) - self.pos + 1)
+                continue
+
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield each element of the array starting at the next character."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_items(chunks, key=None, encoding='utf-8'):
+    """Yield the elements of a JSON array as they are received.
+
+    Args:
+        chunks (iterable): Byte chunks of the JSON body.
+        key (str, optional): Top level member holding the array, e.g.
+            ``results``. ``None`` when the body itself is an array.
+        encoding (str): Body encoding.
+
+    Yields:
+        object: Decoded array elements.
+
+    Raises:
+        ValueError: Body is not valid JSON.
+
+    """
+    stream = JsonStream(chunks, encoding)
+
+    if key is None:
+        for item in stream.items():
+            yield item
+        return
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+
+    while True:
+        name = stream.value()
+        stream.expect(':')
+
+        if name == key and stream.peek() == '[':
+            for item in stream.items():
+                yield item
+            return
+
+        stream.value()
+        if stream.expect(',}') == '}':
+            return
+
+
+def iter_response(response, key=None, chunk_size=65536):
+    """Yield array elements from a streamed response and close it afterwards.
+
+    Args:
+        response (requests.models.Response): Response requested with
+            ``stream=True``.
+        key (str, optional): See :func:`iter_items`.
+        chunk_size (int): Bytes read from the connection at a time.
+
+    """
+    try:
+        for item in iter_items(response.iter_content(chunk_size), key,
+                               response.encoding or 'utf-8'):
+            yield item
+    finally:
+        response.close()
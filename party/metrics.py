@@ -0,0 +1,207 @@
+"""Request instrumentation and metrics collection."""
+import bisect
+import collections
+import threading
+
+RequestEvent = collections.namedtuple('RequestEvent', [
+    'method',
+    'endpoint',
+    'status',
+    'elapsed',
+    'connect',
+    'ttfb',
+    'download',
+    'bytes',
+    'retries',
+])
+RequestEvent.__doc__ = """Timing and size of one request, passed to request hooks.
+
+Attributes:
+    method (str): HTTP method, lower case.
+    endpoint (str): Endpoint name, see :func:`party.endpoints.endpoint_name`.
+    status (int): HTTP status of the last attempt, ``None`` if it failed to
+        connect.
+    elapsed (float): Seconds from the first attempt to the end of the last,
+        including retry delays.
+    connect (float): Seconds spent opening connections, ``0.0`` when a pooled
+        connection was reused.
+    ttfb (float): Seconds from sending the last attempt until its response
+        headers arrived, excluding ``connect``.
+    download (float): Seconds spent reading the body of the last attempt,
+        ``0.0`` for streamed bodies which are read later.
+    bytes (int): Response body size.
+    retries (int): Attempts made after the first one.
+
+"""
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+class Histogram(object):
+    """Cumulative latency histogram with fixed bucket bounds.
+
+    Args:
+        buckets (tuple): Sorted upper bounds in seconds.
+
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Yield ``(upper bound, count of values at or below it)`` pairs."""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Estimate quantile ``q`` (0-1) as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class RequestStats(object):
+    """Aggregated metrics of one method and endpoint."""
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.statuses = collections.Counter()
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.download = 0.0
+        self.bytes = 0
+        self.retries = 0
+
+
+class MetricsCollector(object):
+    """In-memory request metrics, use an instance as a request hook.
+
+    Examples:
+        Collect and export metrics:
+
+        >>> collector = MetricsCollector()
+        >>> artifact.add_hook(collector)
+        >>> print(collector.to_prometheus())
+
+    Args:
+        buckets (tuple): Latency histogram upper bounds in seconds.
+        prefix (str): Metric name prefix for :meth:`to_prometheus`.
+
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='party'):
+        self.buckets = buckets
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def __call__(self, event):
+        """Record a :class:`RequestEvent`."""
+        key = (event.method, event.endpoint)
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = RequestStats(self.buckets)
+
+            stats.latency.observe(event.elapsed)
+            stats.statuses[str(event.status or 'error')] += 1
+            stats.connect += event.connect
+            stats.ttfb += event.ttfb
+            stats.download += event.download
+            stats.bytes += event.bytes
+            stats.retries += event.retries
+
+    def summary(self):
+        """Summarise latency per endpoint.
+
+        Returns:
+            dict: ``{(method, endpoint): {count, mean, p50, p95, p99, bytes,
+            retries}}``.
+
+        """
+        with self.lock:
+            return dict((key, {
+                'count': stats.latency.count,
+                'mean': stats.latency.sum / stats.latency.count,
+                'p50': stats.latency.quantile(0.5),
+                'p95': stats.latency.quantile(0.95),
+                'p99': stats.latency.quantile(0.99),
+                'bytes': stats.bytes,
+                'retries': stats.retries,
+            }) for key, stats in self.stats.items())
+
+    def to_prometheus(self):
+        """Render metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text.
+
+        """
+        prefix = self.prefix
+        lines = []
+
+        def header(name, kind, text):
+            lines.append('# HELP %s_%s %s' % (prefix, name, text))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+        with self.lock:
+            items = sorted(self.stats.items())
+
+            header('request_duration_seconds', 'histogram',
+                   'Request latency including retries.')
+            for (method, endpoint), stats in items:
+                labels = 'method="%s",endpoint="%s"' % (method, endpoint)
+                for bound, total in stats.latency.cumulative():
+                    lines.append('%s_request_duration_seconds_bucket{%s,le="%s"} %d'
+                                 % (prefix, labels, format_bound(bound), total))
+                lines.append('%s_request_duration_seconds_sum{%s} %r'
+                             % (prefix, labels, stats.latency.sum))
+                lines.append('%s_request_duration_seconds_count{%s} %d'
+                             % (prefix, labels, stats.latency.count))
+
+            header('requests_total', 'counter', 'Requests by status.')
+            for (method, endpoint), stats in items:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        '%s_requests_total{method="%s",endpoint="%s",status="%s"} %d'
+                        % (prefix, method, endpoint, status, count))
+
+            for name, attribute, text in (
+                    ('request_connect_seconds_total', 'connect',
+                     'Time spent opening connections.'),
+                    ('request_ttfb_seconds_total', 'ttfb',
+                     'Time until response headers arrived.'),
+                    ('request_download_seconds_total', 'download',
+                     'Time spent reading response bodies.'),
+                    ('response_bytes_total', 'bytes', 'Response body bytes.'),
+                    ('request_retries_total', 'retries', 'Retried attempts.')):
+                header(name, 'counter', text)
+                for (method, endpoint), stats in items:
+                    lines.append('%s_%s{method="%s",endpoint="%s"} %r' % (
+                        prefix, name, method, endpoint,
+                        getattr(stats, attribute)))
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_bound(bound):
+    """Format a histogram bound the way Prometheus expects."""
+    if bound == float('inf'):
+        return '+Inf'
+    return repr(bound)
@@ -2,7 +2,6 @@ import logging
 import json
 import requests
 import urllib
-import base64
 import os
 
 try:
@@ -10,10 +9,21 @@ try:
 except ImportError:
     from urllib.parse import urlencode
 
-from .exceptions import UnknownQueryType
-from .party_aql import find_by_aql
-from .party_config import party_config
+from . import bulk
+from .cache import ResponseCache, auth_scope, cache_key
+from .disk_cache import SqliteCache
+from .endpoints import endpoint_name, repo_path
+from .exceptions import PartyError, RequestFailed, UnknownQueryType
+from .fanout import fan_out
+from .index import build_index
+from .jsonstream import iter_response
+from .party_aql import find_by_aql, get_properties_many, iter_aql
+from .party_config import Mapping, PartyConfig
 from .party_request import PartyRequest
+from .results import ArtifactRef, FileInfo, PropertySet
+from .singleflight import SingleFlight
+from .sync import sync
+from .transfer import download, download_parallel, upload, upload_many
 
 
 class Party(PartyRequest):
@@ -26,26 +36,52 @@ class Party(PartyRequest):
         password (str): Authentication password base64 encoded.
         search_name (str): Artifact search endpoint (default: search/artifact).
         search_prop (str): Property search endpoint (default: search/prop).
+        cache (party.cache.ResponseCache): Cache for GET requests and AQL
+            searches, enabled by setting cache_size. Can be shared between
+            instances, see also :class:`party.disk_cache.SqliteCache`.
+        config (party.party_config.PartyConfig): Read-only configuration the
+            instance was created with, ``party_config`` defaults updated with
+            the ``config`` argument. ``party_config`` itself is never changed.
         search_repos (str): Repositories list endpoint (default: repositories).
+        session (requests.Session): Pooled session shared by every request
+            this instance sends, see :mod:`party.session`.
+        single_flight (party.singleflight.SingleFlight): Collapses identical
+            concurrent lookups into one request while coalesce_requests is
+            set. Can be shared between instances.
         username (str): Authentication username.
 
     """
 
     find_by_aql = find_by_aql
-
-    def __init__(self, config={}, *args, **kwargs):
+    get_properties_many = get_properties_many
+    iter_aql = iter_aql
+    download = download
+    download_parallel = download_parallel
+    upload = upload
+    upload_many = upload_many
+    sync = sync
+    build_index = build_index
+
+    def __init__(self, config=None, *args, **kwargs):
         super(Party, self).__init__(*args, **kwargs)
 
         self.log = logging.getLogger(__name__)
 
         self.files = []
+        self._cache = None
+        self.single_flight = SingleFlight()
 
-        party_config.update(config)
+        if not isinstance(config, PartyConfig):
+            config = PartyConfig(config)
+        self.config = config
 
-        # Set instance variables for every value in party_config
-        for k, v in party_config.items():
+        # Set instance variables for every configured value, mutable ones are
+        # copied so changing them never affects another instance
+        for k, v in config.items():
             existing_attribute = getattr(self, k, None)
             if not existing_attribute:
+                if isinstance(v, Mapping):
+                    v = dict(v)
                 setattr(self, '%s' % (k,), v)
 
     def query_artifactory(self, query, query_type='get', dry=False, **kwargs):
@@ -67,31 +103,151 @@ class Party(PartyRequest):
             response = requests.models.Response()
             response.status_code = 200
             response._content = content.encode()
+            response._content_consumed = True
 
             return response
 
-        auth = (self.username, base64.b64decode(self.password).decode())
         query_type = query_type.lower()
-
-        if query_type == "get":
-            response = requests.get(query, auth=auth, headers=self.headers, verify=self.certbundle)
-        elif query_type == "put":
-            response = requests.put(query, data=query.split('?', 1)[1], auth=auth, headers=self.headers, verify=self.certbundle)
-        elif query_type == 'delete':
-            response = requests.delete(query, auth=auth, headers=self.headers, verify=self.certbundle)
-        elif query_type == "post":
-            response = requests.post(query, auth=auth, headers=self.headers, verify=self.certbundle, **kwargs)
-        else:
+        if query_type not in ('get', 'put', 'delete', 'post'):
             raise UnknownQueryType('Unsupported query type: %s' % query_type)
 
-        self.log.debug('Artifactory response: [%d] %s', response.status_code,
-                       response.text)
+        def fetch():
+            if self.cacheable(query, query_type, **kwargs):
+                return self.cached_query(query, query_type, **kwargs)
+            return self.send_query(query, query_type, **kwargs)
+
+        # Identical lookups already in flight share that request's response
+        if self.coalesce_requests and self.read_only(query, query_type,
+                                                     **kwargs):
+            key = cache_key(query, kwargs.get('data'),
+                            auth_scope(self.username, self.password))
+            response, shared = self.single_flight.do(key, fetch)
+            if shared:
+                self.counters.increment('coalesced')
+        else:
+            response = fetch()
 
         if not response.ok:
+            response.close()
             return None
 
         return response
 
+    def send_query(self, query, query_type='get', headers=None, **kwargs):
+        """
+        Send request to Artifactory API endpoint whatever its response status.
+        @param: query - Required. The URL (including endpoint) to send to the Artifactory API
+        @param: query_type - Optional. CRUD method. Defaults to 'get'.
+        @param: headers - Optional. Request headers. Defaults to the instance headers.
+        @param: **kwargs - Extra keyword arguments to pass to :cls:`requests.models.Request`.
+        """
+        auth = self.auth
+        if headers is None:
+            headers = self.headers
+
+        if query_type == "put":
+            kwargs['data'] = query.split('?', 1)[1]
+        elif query_type not in ("get", "delete", "post"):
+            raise UnknownQueryType('Unsupported query type: %s' % query_type)
+
+        return self.send(query_type, query, auth=auth, headers=headers,
+                         verify=self.certbundle, **kwargs)
+
+    def read_only(self, query, query_type, **kwargs):
+        """
+        Whether a request is a read-only lookup whose response can be reused:
+        GET lookups and AQL searches whose body is not streamed.
+        @param: query - Required. The URL (including endpoint) to send to the Artifactory API
+        @param: query_type - Required. CRUD method.
+        """
+        if kwargs.get('stream'):
+            return False
+        if query_type == 'get':
+            return True
+        return (query_type == 'post' and
+                endpoint_name(query, self.artifactory_url) == 'search/aql')
+
+    def cacheable(self, query, query_type, **kwargs):
+        """
+        Whether a request is read-only and can go through the cache, see
+        read_only.
+        @param: query - Required. The URL (including endpoint) to send to the Artifactory API
+        @param: query_type - Required. CRUD method.
+        """
+        return (self.cache is not None and
+                self.read_only(query, query_type, **kwargs))
+
+    def cached_query(self, query, query_type='get', **kwargs):
+        """
+        Send a read-only request through the response cache. Fresh entries
+        are returned without a request, expired ones are revalidated with
+        their ETag/Last-Modified.
+        @param: query - Required. The URL (including endpoint) to send to the Artifactory API
+        @param: query_type - Optional. 'get', or 'post' for AQL searches. Defaults to 'get'.
+        @param: **kwargs - Extra keyword arguments to pass to :cls:`requests.models.Request`.
+        """
+        endpoint = endpoint_name(query, self.artifactory_url)
+        key = cache_key(query, kwargs.get('data'),
+                        auth_scope(self.username, self.password))
+
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            return entry.response
+
+        validators = entry.validators() if entry is not None else {}
+        headers = kwargs.get('headers')
+        if validators:
+            kwargs['headers'] = dict(headers or self.headers or {},
+                                     **validators)
+
+        response = self.send_query(query, query_type, **kwargs)
+
+        # Only a 304 answering our validators revalidates the entry.
+        if response.status_code == 304 and validators:
+            cached = self.cache.revalidated(key, endpoint)
+            if cached is not None:
+                return cached
+            # The entry was dropped meanwhile, ask for the full response.
+            response.close()
+            kwargs['headers'] = headers
+            return self.send_query(query, query_type, **kwargs)
+
+        if response.ok:
+            self.cache.set(key, response, endpoint)
+
+        return response
+
+    @property
+    def cache(self):
+        """
+        Response cache for read-only requests, None unless 'cache_size' is
+        set. 'cache_backend' selects an in-memory ('memory') or on-disk
+        ('sqlite') cache.
+        """
+        if self._cache is None and getattr(self, 'cache_size', 0):
+            if self.cache_backend == 'sqlite':
+                self._cache = SqliteCache(
+                    os.path.expanduser(self.cache_dir), self.cache_size,
+                    self.cache_ttl, self.cache_max_bytes)
+            elif self.cache_backend == 'memory':
+                self._cache = ResponseCache(self.cache_size, self.cache_ttl)
+            else:
+                raise PartyError(
+                    'Unknown cache_backend: %s' % self.cache_backend)
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
+    def invalidate(self, url):
+        """
+        Drop cached responses for an item and everything below it.
+        @param: url - Storage URL, item URL or repo/path of the changed item.
+        """
+        if self._cache is not None:
+            self._cache.invalidate(repo_path(url, self.artifactory_url))
+
     def query_file_info(self, filename):
         """
         Send request to Artifactory API endpoint for file details.
@@ -135,6 +291,30 @@ class Party(PartyRequest):
 
         return "OK"
 
+    def iter_by_properties(self, properties):
+        """
+        Look up artifacts by properties, yielding each result as it is
+        received instead of loading the whole response.
+        @param: properties - List of properties to use as search criteria.
+        """
+        query = "%s/%s?%s" % (self.artifactory_url,
+                              self.search_prop, urlencode(properties))
+        return self.iter_results(query, 'results')
+
+    def iter_results(self, query, key=None):
+        """
+        Send a GET request and yield the items of a JSON array from the body
+        while it downloads, in constant memory.
+        @param: query - Required. The URL (including endpoint) to send to the Artifactory API
+        @param: key - Optional. Top level member holding the array, e.g. 'results'.
+            Defaults to the body itself being an array.
+        """
+        raw_response = self.query_artifactory(query, stream=True)
+        if raw_response is None:
+            raise RequestFailed('Request failed: %s' % query)
+
+        return iter_response(raw_response, key, self.stream_chunk_size)
+
     def find(self, filename):
         """
         Look up an artifact, or artifacts, in Artifactory by
@@ -203,6 +383,69 @@ class Party(PartyRequest):
         setattr(self, 'file_stats', response)
         return "OK"
 
+    def storage_url(self, path):
+        """
+        Return the storage API URL of an artifact.
+        @param: path - repo/path of the artifact, or its storage or item URL.
+        """
+        return "%s/storage/%s" % (self.artifactory_url,
+                                  repo_path(path, self.artifactory_url))
+
+    def fetch_by_properties(self, properties):
+        """
+        Look up artifacts by properties without changing the instance.
+        @param: properties - List of properties to use as search criteria.
+        @return: List of ArtifactRef.
+        """
+        query = "%s/%s?%s" % (self.artifactory_url,
+                              self.search_prop, urlencode(properties))
+        return [ArtifactRef.from_uri(result['uri'], self.artifactory_url)
+                for result in self.iter_results(query, 'results')]
+
+    def fetch_by_name(self, filename):
+        """
+        Look up artifacts by filename without changing the instance.
+        @param: filename - Filename of the artifact to search.
+        @return: List of ArtifactRef.
+        """
+        query = "%s/%s?name=%s" % (self.artifactory_url,
+                                   self.search_name, filename)
+        return [ArtifactRef.from_uri(result['uri'], self.artifactory_url)
+                for result in self.iter_results(query, 'results')]
+
+    def fetch_properties(self, path, properties=None):
+        """
+        Get an artifact's properties without changing the instance.
+        @param: path - repo/path of the artifact, or its storage or item URL.
+        @param: properties - Optional. List of properties to help filter results.
+        @return: PropertySet, None if the artifact has no matching properties.
+        """
+        query = self.storage_url(path)
+        if properties:
+            query = "%s?properties=%s" % (query, ",".join(properties))
+        else:
+            query = "%s?properties" % query
+
+        raw_response = self.query_artifactory(query)
+        if raw_response is None:
+            return None
+        response = json.loads(raw_response.text)
+
+        return PropertySet(repo_path(query, self.artifactory_url),
+                           response.get('properties', {}))
+
+    def fetch_file_info(self, path):
+        """
+        Get an artifact's file info without changing the instance.
+        @param: path - repo/path of the artifact, or its storage or item URL.
+        @return: FileInfo, None if the lookup failed.
+        """
+        response = self.query_file_info(repo_path(path, self.artifactory_url))
+        if response is None:
+            return None
+
+        return FileInfo.from_json(response, self.artifactory_url)
+
     def get_storage_info(self):
         query = "%s/storageinfo" % (self.artifactory_url)
 
@@ -225,6 +468,7 @@ class Party(PartyRequest):
         query = "%s/%s" % (self.artifactory_url.replace('/api', ''), item_path)
         # Must remove the '/api' entry point according to Artifactory RestAPI documentation
         response = self.query_artifactory(query, "delete")
+        self.invalidate(item_path)
         if response is None:
             # response is equal to null when artifactory couldn't find the file
             return "OK nothing to delete"
@@ -242,11 +486,62 @@ class Party(PartyRequest):
         query = "%s?properties=%s" % (
             file_url, urlencode(properties).replace('&', '|'))
         response = self.query_artifactory(query, "put")
+        self.invalidate(file_url)
         if response is None:
             return response
 
         return "OK"
 
+    def delete_items(self, items, max_workers=None, rate=0, checkpoint=None, dry=False):
+        """
+        Delete many files or folders concurrently. Results are produced
+        lazily, iterate over the returned generator to run the batch.
+        @param: items - Required. Iterable of paths ('/repo-key/path/to/file') or AQL results.
+        @param: max_workers - Optional. Concurrent deletes. Defaults to the 'max_workers' config value.
+        @param: rate - Optional. Maximum deletes started per second. Defaults to no limit.
+        @param: checkpoint - Optional. File recording finished items, so an interrupted batch can be resumed.
+        @param: dry - Optional. Test run requests.
+        """
+        base_url = self.artifactory_url.replace('/api', '')
+
+        def delete(path):
+            query = "%s/%s" % (base_url, path)
+            if dry:
+                response = self.query_artifactory(query, "delete", dry=True)
+            else:
+                response = self.send_query(query, "delete")
+                self.invalidate(path)
+            return bulk.classify(path, response)
+
+        return bulk.run_batch(delete, items, max_workers or self.max_workers,
+                              rate, checkpoint)
+
+    def set_properties_many(self, items, properties, max_workers=None, rate=0, checkpoint=None, dry=False):
+        """
+        Set the same properties on many artifacts concurrently. Results are
+        produced lazily, iterate over the returned generator to run the batch.
+        @param: items - Required. Iterable of paths ('repo-key/path/to/file') or AQL results.
+        @param: properties - Required. JSON list of properties to set on each artifact.
+        @param: max_workers - Optional. Concurrent updates. Defaults to the 'max_workers' config value.
+        @param: rate - Optional. Maximum updates started per second. Defaults to no limit.
+        @param: checkpoint - Optional. File recording finished items, so an interrupted batch can be resumed.
+        @param: dry - Optional. Test run requests.
+        """
+        encoded = urlencode(properties).replace('&', '|')
+
+        def update(path):
+            query = "%s/storage/%s?properties=%s" % (
+                self.artifactory_url, path, encoded)
+            if dry:
+                response = self.query_artifactory(query, "put", dry=True)
+            else:
+                response = self.send_query(query, "put")
+                self.invalidate(path)
+            return bulk.classify(path, response)
+
+        return bulk.run_batch(update, items, max_workers or self.max_workers,
+                              rate, checkpoint)
+
     def get_repositories(self, repo_type=None):
         """
         Helper method to get repository names. Defaults to all.
@@ -275,7 +570,22 @@ class Party(PartyRequest):
 
         return None
 
-    def find_by_pattern(self, filename, specific_repo=None, repo_type=None, max_depth=10):
+    def iter_repositories(self, repo_type=None):
+        """
+        Yield repository names as they are received. Defaults to all.
+        @param: repo_type - type of repository to return (local, remote, virtual)
+        """
+        if repo_type is None:
+            query = "%s/%s" % (self.artifactory_url, self.search_repos)
+        else:
+            query = "%s/%s?type=%s" % (self.artifactory_url,
+                                       self.search_repos, repo_type)
+
+        return (line["key"] for line in self.iter_results(query))
+
+    def find_by_pattern(self, filename, specific_repo=None, repo_type=None,
+                        max_depth=10, max_workers=None, ignore_errors=False,
+                        engine=None):
         """
         Look up an artifact, or artifacts, in Artifactory by
         its partial filename (can use globs).
@@ -283,6 +593,14 @@ class Party(PartyRequest):
         @param: specific_repo - Optional. Name of Artifactory repo to search.
         @param: repo_type - Optional. Values are local|virtual|remote.
         @param: max_depth - Optional. How many directories deep to search. Defaults to 10.
+        @param: max_workers - Optional. Number of repo/depth searches to run
+            concurrently. Defaults to the 'max_workers' config value.
+        @param: ignore_errors - Optional. Skip searches that fail instead of
+            aborting the whole lookup. Defaults to False.
+        @param: engine - Optional. 'pattern' sends a pattern search per repo
+            and depth, 'aql' a single paged AQL search, see
+            search_pattern_aql. Defaults to the 'pattern_engine' config value.
+            Virtual repos are always searched with the pattern engine.
         """
 
         # Ensure filename is specified
@@ -298,6 +616,12 @@ class Party(PartyRequest):
             raise ValueError(errmsg)
             return False
 
+        if engine is None:
+            engine = self.pattern_engine
+        if engine not in ("pattern", "aql"):
+            errmsg = "Invalid engine '%s' specified (valid engines: 'pattern', 'aql'.)" % engine
+            raise ValueError(errmsg)
+
         # Add in bookend globs to aid the search, but not if
         # they're already there, cuz Artifactory doesn't like that
         if filename[-1] != "*":
@@ -305,6 +629,19 @@ class Party(PartyRequest):
         if filename[0] != "*":
             filename = "*%s" % filename
 
+        if engine == "aql" and repo_type == "virtual":
+            # AQL does not search virtual repos, only the repos behind them.
+            self.log.debug('Searching virtual repos with the pattern engine')
+            engine = "pattern"
+
+        if engine == "aql":
+            results = self.search_pattern_aql(filename, specific_repo,
+                                              repo_type, max_depth)
+            if not results:
+                return None
+            self.files = results
+            return "OK"
+
         # Create pattern list
         patterns = []
         # Adjust max_depth to determine how many (inclusive) directories deep
@@ -316,24 +653,39 @@ class Party(PartyRequest):
             repos = [specific_repo]
         else:
             repos = self.get_repositories(repo_type)
+            if repos is None:
+                return None
+
+        if max_workers is None:
+            max_workers = self.max_workers
+
+        def search(repo_pattern):
+            query = "%s/search/pattern?pattern=%s:%s%s" % (
+                self.artifactory_url, repo_pattern[0], repo_pattern[1],
+                filename)
+            raw_response = self.query_artifactory(query)
+            if raw_response is None:
+                raise RequestFailed('Pattern search failed: %s' % query)
+            return json.loads(raw_response.text)
+
+        # Search each pattern in each repo to find the artifact, results are
+        # merged in repo then pattern order however many run at once
+        searches = [(repo, pattern) for repo in repos for pattern in patterns]
+        try:
+            responses = fan_out(search, searches, max_workers=max_workers,
+                                stop_on_error=not ignore_errors)
+        except RequestFailed as error:
+            self.log.debug('%s', error)
+            return None
 
-        # Cycle through each pattern in each repo to find the artifact
         results = []
-        for repo in repos:
-            for pattern in patterns:
-                query = "%s/search/pattern?pattern=%s:%s%s" % (
-                    self.artifactory_url, repo, pattern, filename)
-                raw_response = self.query_artifactory(query)
-                if raw_response is None:
-                    return raw_response
-                response = json.loads(raw_response.text)
-
-                try:
-                    if response['files']:
-                        for i in response['files']:
-                            results.append("%s/%s" % (response['repoUri'], i))
-                except KeyError:
-                    pass
+        for response in responses:
+            try:
+                if response['files']:
+                    for i in response['files']:
+                        results.append("%s/%s" % (response['repoUri'], i))
+            except (KeyError, TypeError):
+                pass
 
         if not results:
             return None
@@ -341,3 +693,58 @@ class Party(PartyRequest):
         # Set the class 'files' variable to have the list of found artifacts
         self.files = results
         return "OK"
+
+    def search_pattern_aql(self, filename, specific_repo=None, repo_type=None,
+                           max_depth=10, page_size=1000):
+        """
+        Find artifacts by filename glob with a single AQL search instead of
+        one pattern search per repo and depth. Results are paged by the
+        server and ordered by repo, path and name.
+        @param: filename - Required. Filename glob, e.g. '*erlang*.rpm'.
+        @param: specific_repo - Optional. Name of Artifactory repo to search.
+        @param: repo_type - Optional. Values are local|remote. Remote repos
+            are searched through their '<key>-cache' repos, which hold the
+            cached artifacts AQL can see.
+        @param: max_depth - Optional. How many directories deep to search. Defaults to 10.
+        @param: page_size - Optional. Results requested per AQL page. Defaults to 1000.
+        @return: List of artifact URLs, None if a search failed.
+        @raise: ValueError - repo_type is 'virtual', AQL does not search
+            virtual repos.
+        """
+        if repo_type == "virtual":
+            raise ValueError("AQL cannot search virtual repos, use the "
+                             "'pattern' engine")
+
+        criteria = {
+            "type": "file",
+            "name": {"$match": filename},
+            "depth": {"$lte": max_depth},
+        }
+
+        # Remote repo artifacts are found in '<key>-cache', reported under
+        # the remote key like the pattern engine does.
+        caches = {}
+        if specific_repo is not None:
+            criteria["repo"] = specific_repo
+        elif repo_type is not None:
+            repos = self.get_repositories(repo_type)
+            if repos is None:
+                return None
+            if repo_type == "remote":
+                caches = dict(("%s-cache" % repo, repo) for repo in repos)
+                repos = sorted(caches)
+            criteria["$or"] = [{"repo": repo} for repo in repos]
+
+        base_url = self.artifactory_url.replace('/api', '')
+        try:
+            return ["%s/%s" % (base_url, bulk.item_path(
+                        dict(result, repo=caches.get(result["repo"],
+                                                     result["repo"]))))
+                    for result in self.iter_aql(
+                        page_size=page_size,
+                        criteria=criteria,
+                        fields=["repo", "path", "name"],
+                        order_and_fields={"$asc": ["repo", "path", "name"]})]
+        except RequestFailed as error:
+            self.log.debug('%s', error)
+            return None
@@ -1,28 +1,228 @@
 """Interface for AQL searches."""
+import collections
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from .aql import Aql
+from .bulk import item_path
+from .exceptions import RequestFailed
+from .fanout import fan_out
+from .jsonstream import iter_response
 
 LOG = logging.getLogger(__name__)
 
 
-def find_by_aql(self, **kwargs):
+def post_aql(self, statement, **kwargs):
+    """Send an AQL statement to Artifactory.
+
+    The ``text/plain`` content type is sent with this request only, the
+    shared :attr:`headers` are left untouched so concurrent requests keep
+    their own content type.
+
+    Args:
+        statement (str): Full AQL statement, see :attr:`party.aql.Aql.aql`.
+        **kwargs: Extra keyword arguments for ``query_artifactory``, e.g.
+            ``stream=True``.
+
+    Returns:
+        requests.models.Response: Artifactory response, ``None`` on a bad
+        status.
+
+    """
+    url = '/'.join([self.artifactory_url, 'search/aql'])
+    headers = dict(self.headers, **{'Content-type': 'text/plain'})
+
+    return self.query_artifactory(url, data=statement, query_type='post',
+                                  headers=headers, **kwargs)
+
+
+def find_by_aql(self, aql=None, **kwargs):
     """Find artifacts using AQL.
 
     Args:
-        **kwargs: See :class:`party.aql.Aql` for arguments.
+        aql (party.aql.Aql or str, optional): Query built beforehand, or a
+            statement such as one returned by
+            :meth:`party.aql.AqlTemplate.bind`.
+        **kwargs: See :class:`party.aql.Aql` for arguments, used when ``aql``
+            is not given.
 
     Returns:
         object: Results from AQL search.
 
     """
+    if aql is None:
+        aql = Aql(**kwargs)
+    statement = getattr(aql, 'aql', aql)
+
+    results = post_aql(self, statement)
+
+    return results.json()
+
+
+def iter_aql(self, page_size=1000, prefetch=False, **kwargs):
+    """Iterate over AQL results one page at a time.
+
+    Pages are requested with ``.limit()`` and ``.offset()`` and parsed while
+    they download, so memory use does not depend on the total number of
+    results. Pass ``order_and_fields`` to keep page boundaries stable while
+    the repository changes.
+
+    Args:
+        page_size (int, optional): Number of records requested per page.
+            ``None`` streams every result from a single statement.
+        prefetch (bool): Request the next page in the background while the
+            current one is consumed. Each page is then held in memory.
+        **kwargs: See :class:`party.aql.Aql` for arguments. ``num_records``
+            caps the total number of results and ``offset_records`` sets the
+            first one.
+
+    Yields:
+        dict: One result from the ``results`` list of each page.
+
+    Raises:
+        party.exceptions.RequestFailed: A page could not be retrieved.
+
+    """
+    if page_size is not None and page_size < 1:
+        raise ValueError('page_size must be positive: %r' % page_size)
+
     aql = Aql(**kwargs)
+    offset = aql.offset_records
+    remaining = aql.num_records or None
 
-    url = '/'.join([self.artifactory_url, 'search/aql'])
+    def fetch(offset, count):
+        aql.offset_records = offset
+        aql.num_records = count or 0
+        response = post_aql(self, aql.aql, stream=True)
+        if response is None:
+            raise RequestFailed('AQL page at offset %d failed' % offset)
+        return iter_response(response, 'results', self.stream_chunk_size)
 
-    old_content_type = self.headers['Content-type']
-    self.headers['Content-type'] = 'text/plain'
-    results = self.query_artifactory(url, data=aql.aql, query_type='post')
-    self.headers['Content-type'] = old_content_type
+    def fetch_page(offset, count):
+        return list(fetch(offset, count))
 
-    return results.json()
+    def page_count(remaining):
+        if remaining is None:
+            return page_size
+        return min(page_size, remaining)
+
+    if page_size is None:
+        for result in fetch(offset, remaining):
+            yield result
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        count = page_count(remaining)
+        upcoming = None
+
+        while count:
+            if upcoming is not None:
+                page = upcoming.result()
+            elif prefetch:
+                page = fetch_page(offset, count)
+            else:
+                page = fetch(offset, count)
+
+            upcoming = None
+            if prefetch and len(page) == count:
+                left = None if remaining is None else remaining - count
+                next_count = page_count(left)
+                if next_count:
+                    upcoming = executor.submit(fetch_page, offset + count,
+                                               next_count)
+
+            received = 0
+            for result in page:
+                received += 1
+                yield result
+
+            LOG.debug('Received %d AQL results at offset %d', received, offset)
+            offset += received
+            if remaining is not None:
+                remaining -= received
+
+            if received < count:
+                break
+            count = page_count(remaining)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def property_criteria(paths):
+    """Build AQL criteria matching every one of ``paths``.
+
+    Paths in the same folder share one clause with a ``$in`` over their
+    names, which keeps statements short for artifacts that sit together.
+
+    Args:
+        paths (list): ``repo/path/name`` strings.
+
+    Returns:
+        dict: Criteria for :class:`party.aql.Aql`.
+
+    """
+    folders = collections.OrderedDict()
+    for path in paths:
+        folder, _, name = path.rpartition('/')
+        repo, _, directory = folder.partition('/')
+        folders.setdefault((repo, directory or '.'), []).append(name)
+
+    clauses = []
+    for (repo, directory), names in folders.items():
+        clauses.append({
+            'repo': repo,
+            'path': directory,
+            'name': names[0] if len(names) == 1 else {'$in': names},
+        })
+    return {'$or': clauses}
+
+
+def get_properties_many(self, paths, chunk_size=500, max_workers=None):
+    """Fetch the properties of many artifacts with a few AQL searches.
+
+    Instead of one ``?properties`` request per artifact, paths are searched
+    ``chunk_size`` at a time with ``.include("property.*")``, bounding the
+    size of each statement.
+
+    Args:
+        paths (iterable): Paths, e.g. ``repo/dir/a.rpm``, or AQL results, see
+            :func:`party.bulk.item_path`.
+        chunk_size (int): Artifacts per AQL statement.
+        max_workers (int, optional): Statements sent at once, defaults to the
+            ``max_workers`` setting.
+
+    Returns:
+        dict: ``{repo/path: {property: [values]}}``, artifacts that do not
+        exist are left out.
+
+    Raises:
+        party.exceptions.RequestFailed: A search failed.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive: %r' % chunk_size)
+
+    paths = [item_path(path) for path in paths]
+    chunks = [paths[i:i + chunk_size]
+              for i in range(0, len(paths), chunk_size)]
+
+    def search(chunk):
+        found = {}
+        for result in self.iter_aql(
+                page_size=None,
+                criteria=property_criteria(chunk),
+                fields=['repo', 'path', 'name', 'property.*']):
+            properties = found.setdefault(item_path(result), {})
+            for prop in result.get('properties') or ():
+                if 'key' in prop:
+                    properties.setdefault(prop['key'], []).append(
+                        prop.get('value', ''))
+        return found
+
+    properties = {}
+    for found in fan_out(search, chunks,
+                         max_workers=max_workers or self.max_workers):
+        properties.update(found)
+    return properties
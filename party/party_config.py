@@ -1,10 +1,139 @@
 party_config = {
     'artifactory_url': 'http://your-instance/artifactory/api',
+    'failover_urls': [],
+    'replica_urls': [],
+    'endpoint_down_time': 30,
+    'health_check_interval': 0,
     'search_prop': 'search/prop',
     'search_name': 'search/artifact',
     'search_repos': 'repositories',
     'username': 'your-user',
     'password': 'base64-encoded-password',
     'headers': {'Content-type': 'application/json'},
-    'certbundle': ''
+    'certbundle': '',
+    'pool_connections': 10,
+    'pool_maxsize': 10,
+    'keep_alive': True,
+    'adapter_max_retries': 0,
+    'adapter_backoff_factor': 0,
+    'max_workers': 1,
+    'pattern_engine': 'pattern',
+    'retry_attempts': 3,
+    'retry_backoff': 0.5,
+    'retry_backoff_max': 30,
+    'retry_statuses': [429, 502, 503, 504],
+    'rate_limit': 0,
+    'rate_burst': 0,
+    'breaker_threshold': 0,
+    'breaker_reset': 30,
+    'request_hooks': [],
+    'stream_chunk_size': 65536,
+    'coalesce_requests': True,
+    'cache_size': 0,
+    'cache_backend': 'memory',
+    'cache_dir': '~/.cache/party',
+    'cache_max_bytes': 0,
+    'cache_ttl': {
+        'default': 0,
+        'repositories': 300,
+        'storageinfo': 300,
+        'storage': 60,
+        'properties': 60,
+        'search/aql': 0
+    }
 }
+
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    from types import MappingProxyType
+except ImportError:
+    class MappingProxyType(Mapping):
+        """Read-only view of a dict, for Python 2."""
+
+        __slots__ = ('_mapping',)
+
+        def __init__(self, mapping):
+            self._mapping = mapping
+
+        def __getitem__(self, key):
+            return self._mapping[key]
+
+        def __iter__(self):
+            return iter(self._mapping)
+
+        def __len__(self):
+            return len(self._mapping)
+
+        def __repr__(self):
+            return 'MappingProxyType(%r)' % self._mapping
+
+
+def freeze(value):
+    """Return a read-only copy of dicts and lists in ``value``."""
+    if isinstance(value, Mapping):
+        return MappingProxyType(dict((key, freeze(item))
+                                     for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class PartyConfig(Mapping):
+    """Read-only configuration of one client.
+
+    Built from a snapshot of the ``party_config`` defaults and the given
+    overrides. Nested dicts and lists are copied into read-only mappings and
+    tuples, so clients never share mutable settings and changing
+    ``party_config`` afterwards does not affect existing clients.
+
+    Examples:
+        >>> config = PartyConfig({'artifactory_url': 'http://a/api'})
+        >>> config.artifactory_url
+        'http://a/api'
+        >>> config.replace(username='other')['username']
+        'other'
+
+    Args:
+        overrides (dict, optional): Values replacing the defaults.
+        defaults (dict, optional): Defaults, ``party_config`` when omitted.
+
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, overrides=None, defaults=None):
+        values = dict(party_config if defaults is None else defaults)
+        values.update(overrides or {})
+        for key, value in values.items():
+            values[key] = freeze(value)
+        object.__setattr__(self, '_values', values)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PartyConfig is read-only')
+
+    def __repr__(self):
+        return 'PartyConfig(%r)' % self._values
+
+    def replace(self, **changes):
+        """Return a copy with ``changes`` applied."""
+        return PartyConfig(changes, self._values)
@@ -1,9 +1,18 @@
 """Request interface for Artifactory."""
 import base64
 import logging
+import time
 
 import requests
 
+from .endpoints import endpoint_name
+from .metrics import RequestEvent
+from .party_config import party_config
+from .ratelimit import TokenBucket
+from .retry import CircuitBreaker, Counters, RetryPolicy, idempotent
+from .routing import Router
+from .session import connect_time, new_session, session_options
+
 
 class PartyRequest(object):
     """Request interface for Artifactory.
@@ -14,6 +23,23 @@ class PartyRequest(object):
         headers (dict): Custom request headers.
         password (str): Authentication password base64 encoded.
         username (str): Authentication username.
+        session (requests.Session, optional): Session to send requests
+            through, can be shared between clients. A pooled session is
+            created from the pool settings on first use when not given.
+
+    Attributes:
+        circuit_breaker (party.retry.CircuitBreaker): Fails requests fast
+            after repeated failures.
+        counters (party.retry.Counters): Request, retry and failure counts.
+        hooks (list): Callables receiving a
+            :class:`party.metrics.RequestEvent` after every request.
+        rate_limiter (party.ratelimit.TokenBucket): Limits requests per
+            second, can be shared between clients.
+        retry_policy (party.retry.RetryPolicy): Retries throttled and
+            failed requests with backoff.
+        router (party.routing.Router): Spreads requests over
+            ``failover_urls`` and ``replica_urls``, ``None`` when neither is
+            configured.
 
     """
 
@@ -21,7 +47,8 @@ class PartyRequest(object):
                  artifactory_url='',
                  headers=None,
                  password='',
-                 username=''):
+                 username='',
+                 session=None):
         self.log = logging.getLogger(__name__)
 
         self.artifactory_url = artifactory_url
@@ -30,6 +57,107 @@ class PartyRequest(object):
 
         self.headers = headers
 
+        self._session = session
+        self._auth = None
+        self._auth_source = None
+
+        self._retry_policy = None
+        self._circuit_breaker = None
+        self._rate_limiter = None
+        self._router = None
+        self.counters = Counters()
+        self.hooks = []
+
+    def setting(self, name):
+        """Return configuration value ``name``, falling back to ``party_config``."""
+        return getattr(self, name, party_config[name])
+
+    @property
+    def session(self):
+        """requests.Session: Pooled session used for every request."""
+        if self._session is None:
+            self._session = new_session(**session_options(self))
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    @property
+    def retry_policy(self):
+        """party.retry.RetryPolicy: Built from the retry settings on first use."""
+        if self._retry_policy is None:
+            self._retry_policy = RetryPolicy(
+                attempts=self.setting('retry_attempts'),
+                backoff=self.setting('retry_backoff'),
+                backoff_max=self.setting('retry_backoff_max'),
+                statuses=self.setting('retry_statuses'))
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, retry_policy):
+        self._retry_policy = retry_policy
+
+    @property
+    def circuit_breaker(self):
+        """party.retry.CircuitBreaker: Built from the breaker settings on first use."""
+        if self._circuit_breaker is None:
+            self._circuit_breaker = CircuitBreaker(
+                threshold=self.setting('breaker_threshold'),
+                reset_timeout=self.setting('breaker_reset'))
+        return self._circuit_breaker
+
+    @circuit_breaker.setter
+    def circuit_breaker(self, circuit_breaker):
+        self._circuit_breaker = circuit_breaker
+
+    @property
+    def rate_limiter(self):
+        """party.ratelimit.TokenBucket: Built from the rate settings on first use."""
+        if self._rate_limiter is None:
+            self._rate_limiter = TokenBucket(self.setting('rate_limit'),
+                                             self.setting('rate_burst'))
+        return self._rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, rate_limiter):
+        self._rate_limiter = rate_limiter
+
+    @property
+    def router(self):
+        """party.routing.Router: Built from the routing settings on first use."""
+        if self._router is None:
+            failover_urls = self.setting('failover_urls')
+            replica_urls = self.setting('replica_urls')
+            if not failover_urls and not replica_urls:
+                return None
+            self._router = Router(self.artifactory_url, failover_urls,
+                                  replica_urls,
+                                  down_time=self.setting('endpoint_down_time'))
+            interval = self.setting('health_check_interval')
+            if interval:
+                self._router.start_health_checks(self.session, interval)
+        return self._router
+
+    @router.setter
+    def router(self, router):
+        self._router = router
+
+    @property
+    def auth(self):
+        """tuple: Username and decoded password.
+
+        The password is only decoded again when :attr:`username` or
+        :attr:`password` change.
+
+        """
+        source = (self.username, self.password)
+        if self._auth_source != source:
+            self._auth = (self.username,
+                          base64.b64decode(self.password).decode())
+            self._auth_source = source
+        return self._auth
+
     def request(self, endpoint, method='get', **kwargs):
         """Send request to Artifactory API.
 
@@ -49,19 +177,181 @@ class PartyRequest(object):
         """
         url = '/'.join([self.artifactory_url, endpoint])
 
-        request_method = getattr(requests, method.lower())
-
-        auth = (self.username, base64.b64decode(self.password).decode())
-        response = request_method(
-            url, auth=auth, headers=self.headers, **kwargs)
-
-        self.log.debug('Artifactory response: [%d] %s', response.status_code,
-                       response.text)
+        kwargs.setdefault('headers', self.headers)
+        response = self.send(method, url, auth=self.auth, **kwargs)
 
         response.raise_for_status()
 
         return response
 
+    def send(self, method, url, **kwargs):
+        """Send a request through the session with retries.
+
+        Requests wait for :attr:`rate_limiter`, are refused while
+        :attr:`circuit_breaker` is open and are retried according to
+        :attr:`retry_policy` on connection errors and retryable statuses.
+        Idempotent methods and AQL searches are always retried, other
+        requests only when they are safe to send again, see
+        :class:`party.retry.RetryPolicy`.
+
+        With a :attr:`router`, ``url`` is sent to the node it picks: reads
+        and AQL searches to any healthy node, writes to a writable one. A
+        node failing to connect is marked down and the next attempt goes to
+        another node without waiting.
+
+        Args:
+            method (str): HTTP method to use.
+            url (str): Full URL to request.
+            **kwargs: Extra keyword arguments for
+                :meth:`requests.Session.request`.
+
+        Returns:
+            requests.models.Response: Last response, whatever its status.
+
+        Raises:
+            party.exceptions.CircuitOpen: Circuit breaker is open.
+            requests.exceptions.RequestException: Connection failed on every
+                attempt.
+
+        """
+        policy = self.retry_policy
+        breaker = self.circuit_breaker
+        search = endpoint_name(url, self.artifactory_url or '') == 'search/aql'
+        safe = idempotent(method) or search
+        router = self.router
+        write = not search and method.lower() not in ('get', 'head', 'options')
+        failed = []
+
+        start = time.time()
+        connect = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before()
+            self.rate_limiter.acquire()
+            self.counters.increment('requests')
+
+            node = target = None
+            if router is not None:
+                node = router.choose(write, failed) or router.choose(write)
+                target = node.rewrite(url, router.primary)
+
+            connect_time()
+            sent = time.time()
+            try:
+                response = self.session.request(method.upper(), target or url,
+                                                **kwargs)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as error:
+                connect += connect_time()
+                breaker.failure()
+                if node is not None:
+                    router.failed(node)
+                    failed.append(node)
+                self.counters.increment('connection_errors')
+                if (attempt >= policy.attempts or
+                        not policy.retryable_error(error, safe)):
+                    self.counters.increment('failures')
+                    self.emit(method, url, None, start, connect, 0.0, 0.0,
+                              0, attempt - 1)
+                    raise
+                delay = policy.delay(attempt)
+                if node is not None and router.choose(write, failed):
+                    # Another node is available, fail over right away.
+                    delay = 0.0
+                    self.counters.increment('failovers')
+                self.log.info('Retrying %s %s in %.2fs: %s', method, url,
+                              delay, error)
+            except Exception:
+                # Broken bodies, redirect loops, invalid headers: the
+                # request failed all the same, a half-open trial included.
+                breaker.failure()
+                raise
+            else:
+                connect += connect_time()
+                if node is not None:
+                    router.record(node, time.time() - sent)
+                if not policy.retryable(response):
+                    breaker.success()
+                    self.emit_response(method, url, response, start, sent,
+                                       connect, attempt - 1,
+                                       kwargs.get('stream'))
+                    return response
+
+                breaker.failure()
+                if response.status_code == 429:
+                    self.counters.increment('throttled')
+                if (attempt >= policy.attempts or
+                        not policy.retryable(response, safe)):
+                    self.counters.increment('failures')
+                    self.emit_response(method, url, response, start, sent,
+                                       connect, attempt - 1,
+                                       kwargs.get('stream'))
+                    return response
+                delay = policy.delay(attempt, response)
+                response.close()
+                self.log.info('Retrying %s %s in %.2fs: HTTP %d', method, url,
+                              delay, response.status_code)
+
+            self.counters.increment('retries')
+            time.sleep(delay)
+
+    def add_hook(self, hook):
+        """Register a callable receiving a :class:`party.metrics.RequestEvent`
+        after every request, e.g. a :class:`party.metrics.MetricsCollector`.
+        """
+        self.hooks.append(hook)
+
+    def emit_response(self, method, url, response, start, sent, connect,
+                      retries, stream=False):
+        """Report a finished request to the hooks, see :meth:`emit`."""
+        hooks = self.hooks + list(self.setting('request_hooks'))
+        if not hooks and not self.log.isEnabledFor(logging.DEBUG):
+            return
+
+        # elapsed runs from sending the request to parsed headers, so it also
+        # covers opening a fresh connection
+        ttfb = max(response.elapsed.total_seconds() - connect, 0.0)
+        if stream:
+            download = 0.0
+            size = int(response.headers.get('Content-Length') or 0)
+        else:
+            download = max(time.time() - sent - ttfb, 0.0)
+            size = len(response.content or b'')
+
+        self.log.debug('Artifactory response: [%d] %s %s in %.3fs, %d bytes',
+                       response.status_code, method.upper(), url,
+                       time.time() - start, size)
+        self.emit(method, url, response.status_code, start, connect, ttfb,
+                  download, size, retries, hooks)
+
+    def emit(self, method, url, status, start, connect, ttfb, download, size,
+             retries, hooks=None):
+        """Build a :class:`party.metrics.RequestEvent` and pass it to every
+        hook. Hooks raising exceptions are logged and ignored.
+        """
+        if hooks is None:
+            hooks = self.hooks + list(self.setting('request_hooks'))
+        if not hooks:
+            return
+
+        event = RequestEvent(
+            method=method.lower(),
+            endpoint=endpoint_name(url, self.artifactory_url or ''),
+            status=status,
+            elapsed=time.time() - start,
+            connect=connect,
+            ttfb=ttfb,
+            download=download,
+            bytes=size,
+            retries=retries)
+
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception:  # pylint: disable=W0703
+                self.log.exception('Request hook %r failed', hook)
+
     def delete(self, endpoint, **kwargs):
         """DELETE request to Artifactory API endpoint.
 
@@ -0,0 +1,77 @@
+"""Client-side request rate limiting."""
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread safe token bucket.
+
+    Tokens are added continuously at ``rate`` per second up to ``burst``,
+    every request takes one and waits when none are left. A single bucket can
+    be shared by any number of threads and clients.
+
+    Args:
+        rate (float): Tokens added per second, ``0`` disables limiting.
+        burst (int, optional): Maximum number of stored tokens, defaults to
+            ``rate`` (at least one).
+
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        self.waited = 0.0
+
+    def reserve(self):
+        """Take a token, possibly ahead of time.
+
+        Returns:
+            float: Seconds to wait before the token may be used.
+
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+            delay = -self.tokens / self.rate
+            self.waited += delay
+            return delay
+
+    def try_acquire(self):
+        """Take a token only when one is available right away.
+
+        Returns:
+            float: ``0.0`` when a token was taken, otherwise seconds until
+            the next one is available.
+
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
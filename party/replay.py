@@ -0,0 +1,447 @@
+"""Record Artifactory traffic and replay it from a local server.
+
+:func:`recording` captures the requests a client sends and the responses it
+receives into a cassette file, without credentials. :class:`ReplayServer`
+answers the same requests from the cassette on a local port, optionally
+with added latency, errors and throttling, so code using :class:`party.Party`
+can be tested and benchmarked without network access::
+
+    with recording(artifact, 'lookups.jsonl'):
+        artifact.find('app-1.0.jar')
+
+    with ReplayServer(Cassette.load('lookups.jsonl'), latency=0.05) as stub:
+        offline = Party(config={'artifactory_url': stub.url})
+        offline.find('app-1.0.jar')
+
+The server can also run standalone::
+
+    python -m party.replay lookups.jsonl --port 8081 --error-rate 0.01
+"""
+import argparse
+import base64
+import collections
+import contextlib
+import io
+import json
+import math
+import random
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from .ratelimit import TokenBucket
+from .routing import base_url
+
+# Stands in for the recorded server in response bodies, replaced by the
+# replaying server's own URL.
+ROOT = '__PARTY_ROOT__'
+# Request bodies larger than this, e.g. uploads, are not matched on.
+MAX_BODY = 65536
+# Bytes read at a time from bodies too large to match on.
+DRAIN_SIZE = 65536
+DROPPED_HEADERS = frozenset([
+    'authorization', 'connection', 'content-encoding', 'content-length',
+    'date', 'keep-alive', 'server', 'set-cookie', 'transfer-encoding',
+    'www-authenticate',
+])
+
+
+class Interaction(collections.namedtuple(
+        'Interaction', 'method path body status headers content')):
+    """One recorded request and its response.
+
+    Attributes:
+        method (str): HTTP method, upper case.
+        path (str): Path and query below the Artifactory root, e.g.
+            ``/api/storage/repo/a.rpm?properties``.
+        body (str): Request body, ``None`` without one or when it is not
+            matched on: too large, not text, or streamed.
+        status (int): Response status.
+        headers (dict): Response headers, without credentials and framing.
+        content (bytes): Response body, the recorded root replaced by
+            ``__PARTY_ROOT__``.
+
+    """
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """tuple: What a request has to match to get this response."""
+        return self.method, self.path, self.body
+
+    def to_json(self):
+        """Return the cassette line of the interaction."""
+        data = dict(self._asdict())
+        content = data.pop('content')
+        try:
+            data['text'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            data['base64'] = base64.b64encode(content).decode('ascii')
+        return json.dumps(data, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, line):
+        """Parse a cassette line."""
+        data = json.loads(line)
+        if 'base64' in data:
+            content = base64.b64decode(data.pop('base64'))
+        else:
+            content = data.pop('text', '').encode('utf-8')
+        return cls(content=content, **data)
+
+
+def request_body(body):
+    """Return ``body`` as text to match on, ``None`` if it cannot be.
+
+    The same rule applies to recorded and replayed requests: bodies over
+    :data:`MAX_BODY` bytes, binary ones and streamed ones (files,
+    generators) are not matched on.
+
+    """
+    if isinstance(body, type(u'')):
+        body = body.encode('utf-8')
+    try:
+        view = memoryview(body)
+    except TypeError:
+        return None
+    if not view.nbytes or view.nbytes > MAX_BODY:
+        return None
+    try:
+        return view.tobytes().decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+class Cassette(object):
+    """Recorded interactions, replayed in order for each request.
+
+    Identical requests recorded several times get their responses in the
+    recorded order, the last one is repeated afterwards. Interactions
+    recorded without a body match any body.
+
+    Args:
+        interactions (iterable, optional): :class:`Interaction` objects.
+
+    """
+
+    def __init__(self, interactions=()):
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.by_key = {}
+        self.played = collections.Counter()
+        for interaction in interactions:
+            self.add(interaction)
+
+    def __len__(self):
+        return len(self.interactions)
+
+    @classmethod
+    def load(cls, path):
+        """Read a cassette file, one JSON interaction per line."""
+        with io.open(path, encoding='utf-8') as handle:
+            return cls(Interaction.from_json(line) for line in handle
+                       if line.strip())
+
+    def save(self, path):
+        """Write every interaction to ``path``."""
+        with self.lock:
+            lines = [interaction.to_json() for interaction in self.interactions]
+        with io.open(path, 'w', encoding='utf-8') as handle:
+            for line in lines:
+                handle.write(u'%s\n' % line)
+
+    def add(self, interaction):
+        """Append a recorded interaction."""
+        with self.lock:
+            self.interactions.append(interaction)
+            self.by_key.setdefault(interaction.key, []).append(interaction)
+
+    def match(self, method, path, body=None):
+        """Return the next response recorded for a request, or ``None``."""
+        key = (method.upper(), path, request_body(body))
+        with self.lock:
+            recorded = self.by_key.get(key)
+            if not recorded and key[2] is not None:
+                key = key[:2] + (None,)
+                recorded = self.by_key.get(key)
+            if not recorded:
+                return None
+            index = min(self.played[key], len(recorded) - 1)
+            self.played[key] += 1
+            return recorded[index]
+
+
+class Recorder(object):
+    """``requests`` response hook adding each response to a cassette.
+
+    Only requests below ``root`` are recorded. Request headers are not
+    kept, so credentials never reach the cassette. Reading the response to
+    record it loads streamed bodies into memory.
+
+    Args:
+        root (str): Artifactory root URL, e.g. ``https://host/artifactory``.
+        cassette (Cassette): Cassette receiving the interactions.
+
+    """
+
+    def __init__(self, root, cassette):
+        self.root = root.rstrip('/')
+        self.cassette = cassette
+
+    def __call__(self, response, *args, **kwargs):
+        request = response.request
+        if not request.url.startswith(self.root + '/'):
+            return response
+
+        headers = dict((name, value) for name, value in response.headers.items()
+                       if name.lower() not in DROPPED_HEADERS)
+        content = (response.content or b'').replace(
+            self.root.encode('utf-8'), ROOT.encode('utf-8'))
+        self.cassette.add(Interaction(
+            method=request.method.upper(),
+            path=request.url[len(self.root):],
+            body=request_body(request.body),
+            status=response.status_code,
+            headers=headers,
+            content=content))
+        return response
+
+
+@contextlib.contextmanager
+def recording(client, path):
+    """Record every response ``client`` receives into the cassette ``path``.
+
+    Requests rerouted to other nodes, see :mod:`party.routing`, are not
+    recorded.
+
+    Yields:
+        Cassette: Cassette being recorded, written to ``path`` on exit.
+
+    """
+    cassette = Cassette()
+    recorder = Recorder(base_url(client.artifactory_url), cassette)
+    hooks = client.session.hooks['response']
+    hooks.append(recorder)
+    try:
+        yield cassette
+    finally:
+        hooks.remove(recorder)
+        cassette.save(path)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Answer requests from the server's cassette."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, content, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    def error(self, status, message, headers=()):
+        content = json.dumps({'errors': [{'status': status,
+                                          'message': message}]})
+        self.reply(status, content.encode('utf-8'),
+                   [('Content-Type', 'application/json')] + list(headers))
+
+    def read_chunks(self):
+        """Yield the chunks of a ``Transfer-Encoding: chunked`` body."""
+        while True:
+            size = int(self.rfile.readline().split(b';', 1)[0], 16)
+            if not size:
+                break
+            while size:
+                chunk = self.rfile.read(min(size, DRAIN_SIZE))
+                size -= len(chunk)
+                yield chunk
+            self.rfile.readline()
+        # Skip trailers up to the blank line ending the body.
+        while self.rfile.readline().strip():
+            pass
+
+    def read_sized(self, length):
+        """Yield a body of ``length`` bytes in chunks."""
+        while length > 0:
+            chunk = self.rfile.read(min(length, DRAIN_SIZE))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+    def read_body(self):
+        """Read the request body.
+
+        Returns:
+            bytes: Body to match on, ``None`` without one or when larger
+            than :data:`MAX_BODY`, the rest is read and dropped.
+
+        """
+        encoding = self.headers.get('Transfer-Encoding', '').lower()
+        if encoding == 'chunked':
+            chunks = self.read_chunks()
+        else:
+            chunks = self.read_sized(int(self.headers.get('Content-Length')
+                                         or 0))
+        body = []
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if size <= MAX_BODY:
+                body.append(chunk)
+        if not size or size > MAX_BODY:
+            return None
+        return b''.join(body)
+
+    def respond(self):
+        body = self.read_body()
+        server = self.server
+        server.count('requests')
+
+        wait = server.bucket.try_acquire()
+        if wait > 0:
+            server.count('throttled')
+            return self.error(429, 'Too many requests',
+                              [('Retry-After', str(int(math.ceil(wait))))])
+
+        delay = server.latency + server.random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.random.random() < server.error_rate:
+            server.count('errors')
+            return self.error(503, 'Injected error')
+
+        if not self.path.startswith(server.prefix + '/'):
+            server.count('misses')
+            return self.error(404, 'Not below %s' % server.prefix)
+
+        interaction = server.cassette.match(
+            self.command, self.path[len(server.prefix):], body)
+        if interaction is None:
+            server.count('misses')
+            return self.error(404, 'Not recorded: %s %s' % (self.command,
+                                                            self.path))
+
+        content = interaction.content.replace(
+            ROOT.encode('utf-8'), server.root.encode('utf-8'))
+        return self.reply(interaction.status, content,
+                          sorted(interaction.headers.items()))
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = do_PATCH = respond
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class ReplayServer(ThreadingMixIn, HTTPServer):
+    """Local Artifactory stand-in replaying a cassette.
+
+    Use as a context manager to serve from a background thread, or call
+    :meth:`serve_forever`.
+
+    Args:
+        cassette (Cassette): Recorded interactions.
+        latency (float): Seconds added to every response.
+        jitter (float): Up to this many random seconds added on top.
+        error_rate (float): Share of requests answered with HTTP 503.
+        rate (float): Requests per second served before answering HTTP 429
+            with ``Retry-After``, ``0`` for no limit.
+        burst (int, optional): Requests allowed in a burst above ``rate``.
+        host (str): Address to listen on.
+        port (int): Port to listen on, ``0`` picks a free one.
+        seed (int, optional): Seed for reproducible errors and jitter.
+
+    Attributes:
+        stats (collections.Counter): ``requests``, ``throttled``, ``errors``
+            and ``misses`` (requests without a recording).
+
+    """
+
+    daemon_threads = True
+    prefix = '/artifactory'
+
+    def __init__(self, cassette, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate=0, burst=None, host='127.0.0.1', port=0, seed=None):
+        HTTPServer.__init__(self, (host, port), ReplayHandler)
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate, burst)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+        self.thread = None
+
+    def count(self, name):
+        """Increment one of the :attr:`stats`."""
+        with self.lock:
+            self.stats[name] += 1
+
+    @property
+    def root(self):
+        """str: Artifactory root URL of the server."""
+        return 'http://%s:%d%s' % (self.server_address[0],
+                                   self.server_address[1], self.prefix)
+
+    @property
+    def url(self):
+        """str: API URL to configure clients with."""
+        return self.root + '/api'
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       name='party-replay')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    """Serve a cassette until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog='python -m party.replay',
+        description='Replay recorded Artifactory responses.')
+    parser.add_argument('cassette')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate', type=float, default=0)
+    parser.add_argument('--burst', type=int)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(Cassette.load(args.cassette), args.latency,
+                          args.jitter, args.error_rate, args.rate, args.burst,
+                          args.host, args.port, args.seed)
+    print('Replaying %d interactions at %s' % (len(server.cassette),
+                                                server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Immutable results of Artifactory lookups.
+
+Returned by the ``fetch_*`` methods of :class:`party.Party`, which unlike the
+older lookups leave the instance untouched, so one client can serve any
+number of threads.
+"""
+import collections
+
+from .endpoints import repo_path
+
+
+class ArtifactRef(collections.namedtuple('ArtifactRef', 'path uri')):
+    """Reference to an artifact found by a search.
+
+    Attributes:
+        path (str): ``repo/path/name`` of the artifact.
+        uri (str): Storage API URL of the artifact.
+
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_uri(cls, uri, base_url):
+        """Build a reference from a storage API URL."""
+        return cls(repo_path(uri, base_url), uri)
+
+    @property
+    def repo(self):
+        """str: Repository key."""
+        return self.path.split('/', 1)[0]
+
+    @property
+    def name(self):
+        """str: File name."""
+        return self.path.rsplit('/', 1)[-1]
+
+
+class PropertySet(collections.namedtuple('PropertySet', 'path properties')):
+    """Properties of one artifact.
+
+    Attributes:
+        path (str): ``repo/path/name`` of the artifact.
+        properties (dict): Values of each property, ``{name: [values]}``.
+
+    """
+
+    __slots__ = ()
+
+    def get(self, name, default=None):
+        """Return the first value of property ``name``."""
+        values = self.properties.get(name)
+        if not values:
+            return default
+        return values[0]
+
+    def values(self, name):
+        """Return every value of property ``name``."""
+        return list(self.properties.get(name) or ())
+
+
+class FileInfo(collections.namedtuple('FileInfo', [
+        'path',
+        'uri',
+        'download_uri',
+        'size',
+        'mime_type',
+        'created',
+        'last_modified',
+        'checksums',
+])):
+    """File details from the storage API.
+
+    Attributes:
+        path (str): ``repo/path/name`` of the artifact.
+        uri (str): Storage API URL.
+        download_uri (str): URL the content is downloaded from.
+        size (int): Size in bytes.
+        mime_type (str): Content type.
+        created (str): ISO 8601 creation time.
+        last_modified (str): ISO 8601 modification time.
+        checksums (dict): Hex digests by algorithm, e.g. ``sha256``.
+
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, info, base_url):
+        """Build from the JSON body of a storage lookup."""
+        uri = info.get('uri', '')
+        return cls(
+            path=repo_path(uri, base_url) if uri else '%s%s' % (
+                info.get('repo', ''), info.get('path', '')),
+            uri=uri,
+            download_uri=info.get('downloadUri', ''),
+            size=int(info.get('size') or 0),
+            mime_type=info.get('mimeType', ''),
+            created=info.get('created', ''),
+            last_modified=info.get('lastModified', ''),
+            checksums=dict(info.get('checksums') or {}))
@@ -0,0 +1,225 @@
+"""Retry, backoff and circuit breaking for Artifactory requests."""
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+
+try:
+    from urllib3.exceptions import NewConnectionError
+except ImportError:
+    from requests.packages.urllib3.exceptions import NewConnectionError
+
+from .exceptions import CircuitOpen
+
+LOG = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset(['get', 'head', 'options', 'put', 'delete'])
+
+
+class Counters(object):
+    """Thread safe named counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def increment(self, name, amount=1):
+        """Add ``amount`` to counter ``name``."""
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def as_dict(self):
+        """Return a snapshot of every counter."""
+        with self.lock:
+            return dict(self.values)
+
+
+class RetryPolicy(object):
+    """Decide whether and when to retry a request.
+
+    Delays grow exponentially with full jitter, ``Retry-After`` sent by
+    Artifactory takes precedence.
+
+    Requests that are not idempotent may already have taken effect when they
+    fail, they are only retried when they never reached Artifactory or when
+    Artifactory refused them with ``429``/``503`` and a ``Retry-After``.
+
+    Args:
+        attempts (int): Total attempts per request, ``1`` disables retries.
+        backoff (float): Base delay in seconds.
+        backoff_max (float): Maximum delay in seconds.
+        statuses (iterable): HTTP statuses worth retrying.
+        jitter (bool): Randomise delays between zero and the exponential
+            backoff, spreading out retries of concurrent clients.
+
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, backoff_max=30,
+                 statuses=(429, 502, 503, 504), jitter=True):
+        self.attempts = max(int(attempts), 1)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+        self.jitter = jitter
+
+    def retryable(self, response, idempotent=True):
+        """bool: ``response`` has a status worth retrying.
+
+        Args:
+            response (requests.models.Response): Response of the attempt.
+            idempotent (bool): The request can safely be sent twice.
+
+        """
+        if response.status_code not in self.statuses:
+            return False
+        if idempotent:
+            return True
+        return (response.status_code in (429, 503) and
+                parse_retry_after(response) is not None)
+
+    def retryable_error(self, error, idempotent=True):
+        """bool: A request failing with ``error`` is worth retrying.
+
+        Args:
+            error (requests.exceptions.RequestException): Connection error or
+                timeout of the attempt.
+            idempotent (bool): The request can safely be sent twice.
+
+        """
+        return idempotent or failed_to_connect(error)
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before the next attempt.
+
+        Args:
+            attempt (int): Number of attempts made so far, starting at 1.
+            response (requests.models.Response, optional): Failed response.
+
+        """
+        retry_after = parse_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def idempotent(method):
+    """bool: Requests with HTTP ``method`` can safely be sent twice."""
+    return method.lower() in IDEMPOTENT_METHODS
+
+
+def failed_to_connect(error):
+    """bool: ``error`` was raised before the request was sent.
+
+    Read timeouts and connections dropped while waiting for the response do
+    not count, Artifactory may have processed the request.
+
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+def parse_retry_after(response):
+    """Read ``Retry-After`` in seconds from a response, ``None`` if absent."""
+    if response is None:
+        return None
+
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(email.utils.mktime_tz(parsed) - time.time(), 0.0)
+
+
+class CircuitBreaker(object):
+    """Fail fast while Artifactory is saturated.
+
+    After ``threshold`` consecutive failures the circuit opens and requests
+    raise :class:`party.exceptions.CircuitOpen` without being sent. Once
+    ``reset_timeout`` has passed a single trial request is let through; its
+    success closes the circuit, its failure opens it again. A trial that
+    never reports back, e.g. because it was interrupted, is replaced by a
+    new one after another ``reset_timeout``.
+
+    Args:
+        threshold (int): Consecutive failures opening the circuit, ``0``
+            disables the breaker.
+        reset_timeout (float): Seconds the circuit stays open.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=0, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+
+    def before(self):
+        """Check the circuit before sending a request.
+
+        Raises:
+            party.exceptions.CircuitOpen: Circuit is open.
+
+        """
+        if not self.threshold:
+            return
+
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.time()
+            if now - self.opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened = now
+                return
+            raise CircuitOpen('Artifactory circuit is %s after %d failures'
+                              % (self.state, self.failures))
+
+    def success(self):
+        """Record a successful request."""
+        if not self.threshold:
+            return
+
+        with self.lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def failure(self):
+        """Record a failed request."""
+        if not self.threshold:
+            return
+
+        with self.lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= self.threshold):
+                if self.state != self.OPEN:
+                    LOG.warning('Opening Artifactory circuit after %d '
+                                'failures', self.failures)
+                self.state = self.OPEN
+                self.opened = time.time()
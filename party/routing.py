@@ -0,0 +1,191 @@
+"""Routing requests across several Artifactory nodes."""
+import logging
+import random
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+
+def base_url(url):
+    """Strip the API suffix from an Artifactory API URL."""
+    url = url.rstrip('/')
+    if url.endswith('/api'):
+        url = url[:-len('/api')]
+    return url
+
+
+class Endpoint(object):
+    """One Artifactory node and its observed health.
+
+    Args:
+        url (str): API URL of the node, e.g. ``http://node/artifactory/api``.
+        writable (bool): The node accepts writes, ``False`` for read
+            replicas.
+
+    Attributes:
+        latency (float): Moving average of response times in seconds,
+            ``None`` until the first response.
+        down_until (float): Time until which the node is skipped after a
+            failure.
+
+    """
+
+    __slots__ = ('url', 'base', 'writable', 'latency', 'down_until',
+                 'failures')
+
+    def __init__(self, url, writable=True):
+        self.url = url.rstrip('/')
+        self.base = base_url(url)
+        self.writable = writable
+        self.latency = None
+        self.down_until = 0.0
+        self.failures = 0
+
+    def __repr__(self):
+        return 'Endpoint(%r, writable=%r)' % (self.url, self.writable)
+
+    @property
+    def healthy(self):
+        """bool: The node is not marked down."""
+        return self.down_until <= time.time()
+
+    def rewrite(self, url, primary):
+        """Point ``url`` of the ``primary`` endpoint at this node."""
+        if self is primary or not url.startswith(primary.base + '/'):
+            return url
+        return self.base + url[len(primary.base):]
+
+
+class Router(object):
+    """Choose the node each request is sent to.
+
+    Writes go to the primary, or to the next healthy writable node while it
+    is down. Reads are spread over every healthy node, weighted by the
+    inverse of their moving average latency, so nearby replicas take most of
+    the load and each added replica adds read capacity. Nodes failing to
+    connect are skipped for ``down_time`` seconds, or until a health check
+    succeeds.
+
+    Args:
+        primary (str): API URL of the primary node.
+        failover_urls (iterable): API URLs of other writable nodes, in order
+            of preference for writes.
+        replica_urls (iterable): API URLs of read-only replicas.
+        down_time (float): Seconds a failed node is skipped.
+        smoothing (float): Weight of the newest response time in the moving
+            average.
+
+    """
+
+    def __init__(self, primary, failover_urls=(), replica_urls=(),
+                 down_time=30, smoothing=0.3):
+        self.primary = Endpoint(primary)
+        self.endpoints = ([self.primary] +
+                          [Endpoint(url) for url in failover_urls] +
+                          [Endpoint(url, writable=False)
+                           for url in replica_urls])
+        self.down_time = down_time
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.checker = None
+        self.stopped = threading.Event()
+
+    def choose(self, write=False, exclude=()):
+        """Pick the node for one request.
+
+        Args:
+            write (bool): The request changes data.
+            exclude (iterable): Nodes that already failed for this request.
+
+        Returns:
+            Endpoint: Chosen node, ``None`` when every candidate is
+            excluded.
+
+        """
+        candidates = [endpoint for endpoint in self.endpoints
+                      if endpoint not in exclude and
+                      (endpoint.writable or not write)]
+        if not candidates:
+            return None
+
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+        if not healthy:
+            # Everything is marked down, try the node that failed longest ago.
+            return min(candidates, key=lambda endpoint: endpoint.down_until)
+
+        if write:
+            return healthy[0]
+
+        known = [endpoint.latency for endpoint in healthy
+                 if endpoint.latency is not None]
+        fastest = min(known) if known else 1.0
+        weights = [1.0 / max(endpoint.latency
+                             if endpoint.latency is not None else fastest,
+                             1e-3)
+                   for endpoint in healthy]
+
+        pick = random.uniform(0, sum(weights))
+        for endpoint, weight in zip(healthy, weights):
+            pick -= weight
+            if pick <= 0:
+                return endpoint
+        return healthy[-1]
+
+    def record(self, endpoint, elapsed):
+        """Record a response from ``endpoint`` that took ``elapsed`` seconds."""
+        with self.lock:
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency += self.smoothing * (elapsed -
+                                                      endpoint.latency)
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+    def failed(self, endpoint):
+        """Mark ``endpoint`` down after a connection error."""
+        with self.lock:
+            endpoint.failures += 1
+            endpoint.down_until = time.time() + self.down_time
+        LOG.warning('Artifactory node %s failed, skipping it for %ds',
+                    endpoint.url, self.down_time)
+
+    def check(self, session, timeout=5):
+        """Ping every node and update its health and latency.
+
+        Args:
+            session (requests.Session): Session sending the pings.
+            timeout (float): Seconds to wait for each node.
+
+        """
+        for endpoint in self.endpoints:
+            start = time.time()
+            try:
+                response = session.get(endpoint.url + '/system/ping',
+                                       timeout=timeout)
+                response.close()
+            except Exception:  # pylint: disable=W0703
+                self.failed(endpoint)
+                continue
+            if response.ok:
+                self.record(endpoint, time.time() - start)
+            else:
+                self.failed(endpoint)
+
+    def start_health_checks(self, session, interval):
+        """Run :meth:`check` every ``interval`` seconds in a daemon thread."""
+        if self.checker is not None:
+            return
+
+        def run():
+            while not self.stopped.wait(interval):
+                self.check(session)
+
+        self.checker = threading.Thread(target=run, name='party-health-check')
+        self.checker.daemon = True
+        self.checker.start()
+
+    def stop(self):
+        """Stop the health check thread."""
+        self.stopped.set()
@@ -0,0 +1,144 @@
+"""Pooled HTTP sessions for Artifactory requests."""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3 import connection, connectionpool
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3 import connection, connectionpool
+    from requests.packages.urllib3.util.retry import Retry
+
+from .party_config import party_config
+
+SESSION_OPTIONS = (
+    'pool_connections',
+    'pool_maxsize',
+    'keep_alive',
+    'adapter_max_retries',
+    'adapter_backoff_factor',
+)
+
+
+TIMING = threading.local()
+
+
+def connect_time():
+    """Seconds spent opening connections by the calling thread since the last call.
+
+    Reused pooled connections take no time, so this is ``0.0`` for requests
+    sent over a kept-alive connection.
+
+    """
+    elapsed = getattr(TIMING, 'connect', 0.0)
+    TIMING.connect = 0.0
+    return elapsed
+
+
+class TimedConnectionMixin(object):
+    """Record the time spent in ``connect()`` for the calling thread."""
+
+    def connect(self):
+        start = time.time()
+        try:
+            super(TimedConnectionMixin, self).connect()
+        finally:
+            TIMING.connect = (getattr(TIMING, 'connect', 0.0) +
+                              time.time() - start)
+
+
+class TimedHTTPConnection(TimedConnectionMixin, connection.HTTPConnection):
+    """HTTP connection recording its connect time."""
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, connection.HTTPSConnection):
+    """HTTPS connection recording its connect and TLS handshake time."""
+
+
+class TimedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    """HTTP pool creating :class:`TimedHTTPConnection`."""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    """HTTPS pool creating :class:`TimedHTTPSConnection`."""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Pooled adapter whose connections report their connect time.
+
+    See :func:`connect_time`.
+
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def new_session(pool_connections=10,
+                pool_maxsize=10,
+                keep_alive=True,
+                adapter_max_retries=0,
+                adapter_backoff_factor=0):
+    """Create a connection pooled :class:`requests.Session`.
+
+    A single session can be shared by any number of clients and threads, every
+    request made through it reuses an already open TCP/TLS connection when one
+    is available in the pool.
+
+    Args:
+        pool_connections (int): Number of per-host connection pools to cache.
+        pool_maxsize (int): Maximum number of connections kept open per host.
+        keep_alive (bool): Reuse connections between requests. When disabled
+            every request sends ``Connection: close``.
+        adapter_max_retries (int): Connection level retries performed by the
+            HTTP adapter, e.g. on connection resets.
+        adapter_backoff_factor (float): Backoff factor between adapter retries.
+
+    Returns:
+        requests.Session: Session with pooled adapters mounted for http and
+        https.
+
+    """
+    retries = Retry(
+        total=adapter_max_retries,
+        backoff_factor=adapter_backoff_factor,
+        raise_on_status=False)
+    adapter = TimedHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+def session_options(client):
+    """Collect session options from a client, falling back to ``party_config``.
+
+    Args:
+        client (object): Object with optional attributes named after
+            :data:`SESSION_OPTIONS`.
+
+    Returns:
+        dict: Keyword arguments for :func:`new_session`.
+
+    """
+    return dict((option, getattr(client, option, party_config[option]))
+                for option in SESSION_OPTIONS)
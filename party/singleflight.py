@@ -0,0 +1,81 @@
+"""Collapse identical concurrent requests into one."""
+import threading
+
+
+class Call(object):
+    """One in-flight call and the threads waiting for it."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Run at most one call per key at a time.
+
+    Threads asking for a key that is already being fetched wait for that
+    call and share its result, or its exception, instead of sending the same
+    request again. Nothing is kept once the call finishes, see
+    :class:`party.cache.ResponseCache` for reusing results afterwards. An
+    instance can be shared by several clients.
+
+    Attributes:
+        calls (int): Calls made.
+        collapsed (int): Calls answered by another thread's call.
+
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, func):
+        """Return ``func()``, shared with concurrent calls for ``key``.
+
+        Returns:
+            tuple: ``(result, shared)``, ``shared`` is ``True`` when the
+            result came from another thread's call.
+
+        """
+        with self.lock:
+            call = self.flights.get(key)
+            if call is None:
+                call = self.flights[key] = Call()
+                self.calls += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        """Return ``calls``, ``collapsed`` and keys currently in flight."""
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'collapsed': self.collapsed,
+                'in_flight': len(self.flights),
+            }
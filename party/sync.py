@@ -0,0 +1,262 @@
+"""Mirror Artifactory repositories to local directories."""
+import collections
+import datetime
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from .bulk import item_path
+from .exceptions import PartyError
+from .fanout import fan_out
+
+LOG = logging.getLogger(__name__)
+
+# Appended to the mirror directory, the manifest sits next to the mirror so
+# no remote file can collide with it.
+MANIFEST_NAME = '.party-sync.json'
+TIMESTAMP = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'
+                       r'(?:\.(\d+))?(Z|[+-]\d\d:?\d\d)?$')
+SYNC_FIELDS = ['repo', 'path', 'name', 'size', 'modified', 'sha256',
+               'actual_sha1', 'actual_md5']
+
+
+class SyncResult(collections.namedtuple(
+        'SyncResult', 'repo downloaded unchanged deleted failed high_water '
+                      'elapsed')):
+    """Outcome of :func:`sync`.
+
+    Attributes:
+        repo (str): Repository mirrored.
+        downloaded (list): Paths downloaded, relative to the repository.
+        unchanged (int): Remote files already up to date locally.
+        deleted (list): Stale paths removed locally.
+        failed (list): Paths that could not be downloaded, tried again by
+            the next run.
+        high_water (str): Latest ``modified`` time seen in UTC, the next run
+            only lists files modified since.
+        elapsed (float): Seconds the run took.
+
+    """
+
+    __slots__ = ()
+
+
+def utc_timestamp(text):
+    """Return an ISO 8601 time as UTC ``YYYY-MM-DDTHH:MM:SS.fffZ``.
+
+    Artifactory reports times in the server's zone, e.g.
+    ``2024-01-01T02:00:00.000+02:00``. Normalized times compare correctly as
+    strings, times without a zone are taken as UTC.
+
+    Returns:
+        str: Normalized time, ``None`` if ``text`` is not an ISO 8601 time.
+
+    """
+    match = TIMESTAMP.match(text or '')
+    if match is None:
+        return None
+    fields = [int(field) for field in match.groups()[:6]]
+    microseconds = int((match.group(7) or '0')[:6].ljust(6, '0'))
+    value = datetime.datetime(*fields + [microseconds])
+    zone = match.group(8)
+    if zone and zone != 'Z':
+        digits = zone[1:].replace(':', '')
+        offset = datetime.timedelta(hours=int(digits[:2]),
+                                    minutes=int(digits[2:]))
+        value = value - offset if zone[0] == '+' else value + offset
+    return '%s.%03dZ' % (value.strftime('%Y-%m-%dT%H:%M:%S'),
+                         value.microsecond // 1000)
+
+
+def manifest_path(local_dir):
+    """Return the manifest of the mirror in ``local_dir``.
+
+    The manifest is ``<local_dir>.party-sync.json``, beside the directory
+    rather than in it.
+
+    """
+    return os.path.normpath(os.path.abspath(local_dir)) + MANIFEST_NAME
+
+
+class Manifest(object):
+    """Files a local mirror holds, stored as JSON beside the mirror.
+
+    Args:
+        path (str): Manifest file, read if it exists.
+        repo (str): Repository the mirror belongs to.
+
+    Attributes:
+        files (dict): ``{relative path: {'sha256', 'size', 'modified'}}``.
+        high_water (str): Latest ``modified`` time of a complete run, UTC.
+
+    """
+
+    def __init__(self, path, repo):
+        self.path = path
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.files = {}
+        self.high_water = None
+
+        if os.path.exists(path):
+            with io.open(path, encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('repo') != repo:
+                raise PartyError('%s mirrors %s, not %s'
+                                 % (path, data.get('repo'), repo))
+            self.files = data.get('files', {})
+            self.high_water = utc_timestamp(data.get('high_water'))
+
+    def current(self, name, item, local):
+        """Whether the local copy of ``name`` matches the remote ``item``."""
+        known = self.files.get(name)
+        if known is None or not os.path.isfile(local):
+            return False
+        if os.path.getsize(local) != item.get('size'):
+            return False
+        checksum = item.get('sha256') or item.get('actual_sha1')
+        return checksum in (known.get('sha256'), known.get('sha1'))
+
+    def record(self, name, item):
+        """Remember the remote ``item`` now stored locally as ``name``."""
+        with self.lock:
+            self.files[name] = {
+                'sha256': item.get('sha256'),
+                'sha1': item.get('actual_sha1'),
+                'size': item.get('size'),
+                'modified': item.get('modified'),
+            }
+
+    def save(self):
+        """Write the manifest, replacing the previous one atomically."""
+        temporary = self.path + '.tmp'
+        with self.lock:
+            data = json.dumps({'repo': self.repo,
+                               'high_water': self.high_water,
+                               'files': self.files}, sort_keys=True)
+        with io.open(temporary, 'w', encoding='utf-8') as handle:
+            handle.write(data if isinstance(data, type(u'')) else
+                         data.decode('utf-8'))
+        getattr(os, 'replace', os.rename)(temporary, self.path)
+
+
+def local_path(local_dir, name):
+    """Return the local file for ``name``, refusing paths outside the mirror."""
+    root = os.path.abspath(local_dir)
+    local = os.path.abspath(os.path.join(root, *name.split('/')))
+    if not local.startswith(root + os.sep):
+        raise PartyError('Refusing to write outside %s: %s' % (root, name))
+    return local
+
+
+def sync(self, repo, local_dir, delete=False, full=False, max_workers=None,
+         page_size=1000, verify=True):
+    """Mirror the files of a repository into a local directory.
+
+    Files are listed with paginated AQL and compared with the manifest
+    (``<local_dir>.party-sync.json``) of the previous run; only new and
+    changed files are downloaded, concurrently over the pooled session. Once
+    every file succeeded the latest ``modified`` time is kept, in UTC, as
+    high-water mark, and the next run only lists files modified since. Call
+    once per repository, each into its own directory.
+
+    Args:
+        repo (str): Repository key.
+        local_dir (str): Directory of the mirror, created if missing.
+        delete (bool): Remove local files that no longer exist remotely.
+            Lists the whole repository, deletions cannot be found from
+            modification times. Only files of the manifest are removed.
+        full (bool): List the whole repository even with a high-water mark.
+        max_workers (int, optional): Concurrent downloads, defaults to
+            ``max_workers``.
+        page_size (int): AQL records requested per page.
+        verify (bool): Check downloads against the checksums listed by AQL.
+
+    Returns:
+        party.sync.SyncResult: Files downloaded, deleted and failed.
+
+    Raises:
+        party.exceptions.PartyError: The manifest belongs to another
+            repository.
+        party.exceptions.RequestFailed: Listing the repository failed.
+
+    """
+    start = time.time()
+    if not os.path.isdir(local_dir):
+        os.makedirs(local_dir)
+    manifest = Manifest(manifest_path(local_dir), repo)
+
+    criteria = {'repo': repo, 'type': 'file'}
+    since = None if (delete or full) else manifest.high_water
+    if since is not None:
+        # $gte, files modified within the same millisecond as the mark may
+        # not have been listed last time; unchanged ones are skipped below.
+        criteria['modified'] = {'$gte': since}
+
+    remote = set()
+    pending = []
+    unchanged = 0
+    high_water = manifest.high_water
+    for item in self.iter_aql(page_size=page_size, criteria=criteria,
+                              fields=SYNC_FIELDS,
+                              order_and_fields={'$asc': ['path', 'name']}):
+        name = item_path(dict(item, repo='')).lstrip('/')
+        remote.add(name)
+        modified = utc_timestamp(item.get('modified'))
+        if modified and (high_water is None or modified > high_water):
+            high_water = modified
+        if manifest.current(name, item, local_path(local_dir, name)):
+            unchanged += 1
+        else:
+            pending.append((name, item))
+
+    def fetch(entry):
+        name, item = entry
+        local = local_path(local_dir, name)
+        parent = os.path.dirname(local)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                if not os.path.isdir(parent):
+                    raise
+        checksums = {'sha256': item.get('sha256'),
+                     'sha1': item.get('actual_sha1'),
+                     'md5': item.get('actual_md5')}
+        self.download('%s/%s' % (repo, name), local, verify=verify,
+                      checksums=checksums)
+        manifest.record(name, item)
+        return name
+
+    workers = self.max_workers if max_workers is None else max_workers
+    try:
+        results = fan_out(fetch, pending, max_workers=workers,
+                          stop_on_error=False)
+    finally:
+        manifest.save()
+    downloaded = [name for name in results if name is not None]
+    failed = sorted(set(name for name, _ in pending) - set(downloaded))
+
+    deleted = []
+    if delete:
+        for name in sorted(set(manifest.files) - remote):
+            local = local_path(local_dir, name)
+            if os.path.exists(local):
+                os.remove(local)
+            del manifest.files[name]
+            deleted.append(name)
+
+    if not failed:
+        manifest.high_water = high_water
+    manifest.save()
+
+    result = SyncResult(repo, downloaded, unchanged, deleted, failed,
+                        manifest.high_water, time.time() - start)
+    LOG.info('Synced %s to %s: %d downloaded, %d unchanged, %d deleted, '
+             '%d failed in %.2fs', repo, local_dir, len(downloaded),
+             unchanged, len(deleted), len(failed), result.elapsed)
+    return result
@@ -0,0 +1,529 @@
+"""Streaming artifact downloads and uploads."""
+import collections
+import contextlib
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+from .endpoints import item_url, repo_path
+from .exceptions import ChecksumMismatch, RequestFailed
+from .fanout import fan_out
+
+LOG = logging.getLogger(__name__)
+
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+CHECKSUM_HEADERS = {
+    'sha256': 'X-Checksum-Sha256',
+    'sha1': 'X-Checksum-Sha1',
+    'md5': 'X-Checksum',
+}
+
+
+class TransferResult(collections.namedtuple(
+        'TransferResult', 'path local bytes resumed elapsed checksum saved')):
+    """Outcome of a download or upload.
+
+    Attributes:
+        path (str): ``repo/path`` of the artifact.
+        local (str): Local file written or read.
+        bytes (int): Bytes transferred by this call.
+        resumed (int): Bytes already present locally when a download resumed.
+        elapsed (float): Seconds spent transferring.
+        checksum (str): Algorithm the content was verified with, ``None`` if
+            it was not verified.
+        saved (int): Bytes a checksum deploy did not need to upload.
+
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, path, local, bytes, resumed, elapsed,  # pylint: disable=W0622
+                checksum, saved=0):
+        return super(TransferResult, cls).__new__(
+            cls, path, local, bytes, resumed, elapsed, checksum, saved)
+
+    @property
+    def throughput(self):
+        """float: Bytes transferred per second."""
+        if not self.elapsed:
+            return 0.0
+        return self.bytes / self.elapsed
+
+
+def pick_checksum(checksums):
+    """Choose the strongest checksum Artifactory reported.
+
+    Args:
+        checksums (dict): ``checksums`` of a storage lookup, e.g.
+            ``{'sha1': '...', 'md5': '...'}``.
+
+    Returns:
+        tuple: ``(algorithm, hex digest)``, ``(None, None)`` without any.
+
+    """
+    for algorithm in CHECKSUM_ALGORITHMS:
+        if checksums.get(algorithm):
+            return algorithm, checksums[algorithm].lower()
+    return None, None
+
+
+@contextlib.contextmanager
+def mapped(handle):
+    """Map an open file read-only and yield its content as a memoryview.
+
+    The view is handed to the socket as one buffer, so uploads do not copy
+    the file through Python byte strings. Empty files yield ``b''``.
+
+    """
+    if not os.fstat(handle.fileno()).st_size:
+        yield b''
+        return
+
+    region = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(region)
+    try:
+        yield view
+    finally:
+        view.release()
+        region.close()
+
+
+def hash_file(path, *digests):
+    """Feed the content of a local file to :mod:`hashlib` objects."""
+    with open(path, 'rb') as handle, mapped(handle) as content:
+        for digest in digests:
+            digest.update(content)
+
+
+def file_digests(path, algorithms=CHECKSUM_ALGORITHMS):
+    """Hash a local file.
+
+    Args:
+        path (str): Local file.
+        algorithms (iterable): :mod:`hashlib` algorithm names.
+
+    Returns:
+        dict: Hex digest by algorithm.
+
+    """
+    digests = dict((algorithm, hashlib.new(algorithm))
+                   for algorithm in algorithms)
+    hash_file(path, *digests.values())
+    return dict((algorithm, digest.hexdigest())
+                for algorithm, digest in digests.items())
+
+
+def byte_ranges(size, part_size):
+    """Split ``size`` bytes into inclusive ``(first, last)`` ranges."""
+    return [(first, min(first + part_size, size) - 1)
+            for first in range(0, size, part_size)]
+
+
+def allocate(path, size):
+    """Create ``path`` with ``size`` bytes reserved on disk."""
+    with open(path, 'wb') as handle:
+        if size and hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(handle.fileno(), 0, size)
+        else:
+            handle.truncate(size)
+
+
+class PositionalWriter(object):
+    """Write at absolute offsets of a file shared by several threads.
+
+    Uses ``os.pwrite`` where available, every thread can then write without
+    locking. Elsewhere writes are serialized around a seek.
+
+    """
+
+    def __init__(self, path):
+        self.handle = open(path, 'r+b')
+        self.lock = threading.Lock()
+
+    def write(self, offset, data):
+        """Write ``data`` starting at ``offset``."""
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self.handle.fileno(), data, offset)
+            return
+        with self.lock:
+            self.handle.seek(offset)
+            self.handle.write(data)
+
+    def close(self):
+        """Close the file."""
+        self.handle.close()
+
+
+def log_transfer(action, result):
+    """Log the throughput of a finished transfer."""
+    LOG.info('%s %s: %d bytes in %.2fs (%.1f MB/s)', action, result.path,
+             result.bytes, result.elapsed, result.throughput / 1e6)
+
+
+def download(self, path, dest, verify=True, resume=True, chunk_size=None,
+             checksums=None):
+    """Stream an artifact to a local file.
+
+    The body is written as it arrives and hashed on the way, it is never held
+    in memory. Content goes to ``<dest>.part`` first, which is renamed once
+    complete; an interrupted download continues from the end of the partial
+    file with an HTTP ``Range`` request.
+
+    Args:
+        path (str): ``repo/path`` of the artifact, or its storage or item URL.
+        dest (str): Local file, or directory to write the artifact name into.
+        verify (bool): Compare the content with the strongest checksum of
+            :meth:`party.Party.query_file_info`.
+        resume (bool): Continue an existing partial file.
+        chunk_size (int, optional): Bytes read at a time, defaults to
+            ``stream_chunk_size``.
+        checksums (dict, optional): Checksums of the artifact by algorithm,
+            e.g. from an AQL result, verified instead of looking them up.
+
+    Returns:
+        party.transfer.TransferResult: Bytes transferred and throughput.
+
+    Raises:
+        party.exceptions.RequestFailed: Lookup or download failed.
+        party.exceptions.ChecksumMismatch: Content does not match its
+            checksum, the partial file is removed.
+
+    """
+    path = repo_path(path, self.artifactory_url)
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(path))
+    partial = dest + '.part'
+
+    algorithm = expected = digest = None
+    if verify:
+        if checksums is None:
+            info = self.query_file_info(path)
+            if info is None:
+                raise RequestFailed('File info lookup failed: %s' % path)
+            checksums = info.get('checksums') or {}
+        algorithm, expected = pick_checksum(checksums)
+        if algorithm is not None:
+            digest = hashlib.new(algorithm)
+
+    offset = 0
+    if resume and os.path.exists(partial):
+        offset = os.path.getsize(partial)
+
+    headers = dict(self.headers or {})
+    if offset:
+        headers['Range'] = 'bytes=%d-' % offset
+
+    start = time.time()
+    response = self.send_query(item_url(path, self.artifactory_url), 'get',
+                               headers=headers, stream=True)
+    received = 0
+    try:
+        if response.status_code == 416 and offset:
+            # The partial file already holds every byte.
+            if digest is not None:
+                hash_file(partial, digest)
+        elif not response.ok:
+            raise RequestFailed('Download failed: HTTP %d %s'
+                                % (response.status_code, path))
+        else:
+            if response.status_code != 206:
+                offset = 0
+            if digest is not None and offset:
+                hash_file(partial, digest)
+            with open(partial, 'ab' if offset else 'wb') as handle:
+                for chunk in response.iter_content(
+                        chunk_size or self.stream_chunk_size):
+                    handle.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    received += len(chunk)
+    finally:
+        response.close()
+
+    if digest is not None and digest.hexdigest() != expected:
+        os.remove(partial)
+        raise ChecksumMismatch('%s %s of %s does not match %s' % (
+            algorithm, digest.hexdigest(), path, expected))
+
+    os.rename(partial, dest)
+
+    result = TransferResult(path, dest, received, offset,
+                            time.time() - start, algorithm)
+    log_transfer('Downloaded', result)
+    return result
+
+
+def upload(self, src, path, verify=True, checksum_deploy=False,
+           checksums=None):
+    """Upload a local file without reading it into memory.
+
+    The file is memory mapped and sent as a single buffer. Its checksums are
+    sent along, Artifactory rejects the upload if the content it received
+    does not match them.
+
+    With ``checksum_deploy`` only the checksums are sent first. When
+    Artifactory already stores that content it links the artifact without
+    receiving the body, otherwise the file is uploaded in full. Bytes sent
+    and saved are counted in ``counters`` as ``bytes_uploaded`` and
+    ``bytes_saved``.
+
+    Args:
+        src (str): Local file.
+        path (str): ``repo/path`` to deploy to, a trailing ``/`` appends the
+            name of ``src``.
+        verify (bool): Compare the checksums Artifactory reports for the
+            stored artifact with the local ones.
+        checksum_deploy (bool): Try a checksum deploy before uploading.
+        checksums (dict, optional): Precomputed digests of ``src``, see
+            :func:`file_digests`.
+
+    Returns:
+        party.transfer.TransferResult: Bytes transferred and throughput.
+
+    Raises:
+        party.exceptions.RequestFailed: Upload failed.
+        party.exceptions.ChecksumMismatch: Stored artifact does not match the
+            local file.
+
+    """
+    if path.endswith('/'):
+        path += os.path.basename(src)
+    path = repo_path(path, self.artifactory_url)
+    url = item_url(path, self.artifactory_url)
+
+    size = os.path.getsize(src)
+    if checksums is None:
+        checksums = file_digests(src)
+    headers = dict(self.headers or {})
+    headers['Content-type'] = 'application/octet-stream'
+    for algorithm, header in CHECKSUM_HEADERS.items():
+        headers[header] = checksums[algorithm]
+
+    start = time.time()
+    response = None
+    if checksum_deploy:
+        response = self.send('put', url, auth=self.auth,
+                             headers=dict(headers, **{
+                                 'X-Checksum-Deploy': 'true'}),
+                             verify=self.certbundle)
+        if response.status_code == 404:
+            # Artifactory does not hold this content yet.
+            response.close()
+            response = None
+
+    sent = 0
+    if response is None:
+        with open(src, 'rb') as handle, mapped(handle) as content:
+            response = self.send('put', url, auth=self.auth, headers=headers,
+                                 data=content, verify=self.certbundle)
+        sent = size
+    elapsed = time.time() - start
+    self.invalidate(path)
+
+    if not response.ok:
+        raise RequestFailed('Upload failed: HTTP %d %s'
+                            % (response.status_code, path))
+
+    self.counters.increment('bytes_uploaded', sent)
+    self.counters.increment('bytes_saved', size - sent)
+
+    algorithm = None
+    if verify:
+        stored = response.json().get('checksums') or {}
+        algorithm, expected = pick_checksum(stored)
+        if algorithm is not None and expected != checksums[algorithm]:
+            raise ChecksumMismatch('%s %s of %s does not match %s' % (
+                algorithm, expected, path, checksums[algorithm]))
+
+    result = TransferResult(path, src, sent, 0, elapsed, algorithm,
+                            size - sent)
+    log_transfer('Linked' if size and not sent else 'Uploaded', result)
+    return result
+
+
+def upload_many(self, files, max_workers=None, checksum_deploy=True,
+                processes=0, verify=True):
+    """Upload many files, linking content Artifactory already holds.
+
+    Checksums are computed up front, in a pool of ``processes`` worker
+    processes when given so hashing is not bound to one core, then the
+    uploads run concurrently. See :meth:`upload`.
+
+    Args:
+        files (iterable): ``(src, path)`` pairs.
+        max_workers (int, optional): Concurrent uploads, defaults to the
+            ``max_workers`` setting.
+        checksum_deploy (bool): Try a checksum deploy before each upload.
+        processes (int): Processes hashing files, ``0`` hashes them in the
+            calling thread.
+        verify (bool): See :meth:`upload`.
+
+    Returns:
+        list: :class:`TransferResult` of each file, in order.
+
+    Raises:
+        party.exceptions.RequestFailed: An upload failed, uploads not started
+            yet are cancelled.
+
+    """
+    files = list(files)
+    sources = [src for src, _ in files]
+    if processes:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            digests = list(executor.map(file_digests, sources))
+    else:
+        digests = [file_digests(src) for src in sources]
+
+    def deploy(index):
+        src, path = files[index]
+        return self.upload(src, path, verify=verify,
+                           checksum_deploy=checksum_deploy,
+                           checksums=digests[index])
+
+    return fan_out(deploy, range(len(files)),
+                   max_workers=max_workers or self.setting('max_workers'))
+
+
+def download_parallel(self, path, dest, max_workers=None,
+                      part_size=8 * 1024 * 1024, verify=True):
+    """Download an artifact as byte ranges fetched concurrently.
+
+    The file is allocated at its full size up front and every range is
+    written at its offset as it arrives, so one slow connection no longer
+    caps the transfer rate. A range cut short while streaming is requested
+    again from the last byte written, up to the ``retry_attempts`` setting;
+    failed requests are retried by the retry policy. Artifacts smaller than
+    two parts, and servers ignoring ``Range``, fall back to :meth:`download`.
+
+    Args:
+        path (str): ``repo/path`` of the artifact, or its storage or item URL.
+        dest (str): Local file, or directory to write the artifact name into.
+        max_workers (int, optional): Ranges fetched at once, defaults to
+            ``pool_maxsize`` so every range has a pooled connection.
+        part_size (int): Bytes per range.
+        verify (bool): Compare the finished file with the strongest checksum
+            of :meth:`party.Party.query_file_info`, SHA-256 when available.
+
+    Returns:
+        party.transfer.TransferResult: Bytes transferred and throughput.
+
+    Raises:
+        party.exceptions.RequestFailed: Lookup failed or a range could not be
+            fetched.
+        party.exceptions.ChecksumMismatch: Content does not match its
+            checksum, the partial file is removed.
+
+    """
+    path = repo_path(path, self.artifactory_url)
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(path))
+    partial = dest + '.part'
+
+    info = self.query_file_info(path)
+    if info is None:
+        raise RequestFailed('File info lookup failed: %s' % path)
+    size = int(info.get('size') or 0)
+    if size < 2 * part_size:
+        return self.download(path, dest, verify=verify, resume=False)
+
+    url = item_url(path, self.artifactory_url)
+    policy = self.retry_policy
+    ranges = byte_ranges(size, part_size)
+
+    def request(first, last):
+        headers = dict(self.headers or {})
+        headers['Range'] = 'bytes=%d-%d' % (first, last)
+        return self.send_query(url, 'get', headers=headers, stream=True)
+
+    def ranged(response, first):
+        return (response.status_code == 206 and
+                response.headers.get('Content-Range', '').startswith(
+                    'bytes %d-' % first))
+
+    # The first range is opened up front: a server ignoring Range answers
+    # with the whole file, which download() handles in a single request.
+    opened = {ranges[0]: request(*ranges[0])}
+    if not ranged(opened[ranges[0]], 0):
+        response = opened.pop(ranges[0])
+        response.close()
+        if response.status_code != 200:
+            raise RequestFailed('Range 0-%d of %s failed: HTTP %d'
+                                % (ranges[0][1], path, response.status_code))
+        self.log.info('Server ignored Range, downloading %s at once', path)
+        return self.download(path, dest, verify=verify, resume=False,
+                             checksums=info.get('checksums') or {})
+
+    def fetch(byte_range):
+        # Connection errors and retryable statuses are retried by the retry
+        # policy of send_query, this loop only resumes ranges cut short
+        # while streaming.
+        first, last = byte_range
+        response = opened.pop(byte_range, None)
+        attempt = 0
+        while True:
+            attempt += 1
+            if response is None:
+                response = request(first, last)
+            try:
+                if not ranged(response, first):
+                    raise RequestFailed('Range %d-%d of %s failed: HTTP %d'
+                                        % (first, last, path,
+                                           response.status_code))
+                for chunk in response.iter_content(self.stream_chunk_size):
+                    chunk = chunk[:last - first + 1]
+                    writer.write(first, chunk)
+                    first += len(chunk)
+                    if first > last:
+                        return
+                error = 'ended at byte %d of %d' % (first, last)
+            except requests.exceptions.RequestException as exc:
+                error = exc
+            finally:
+                response.close()
+                response = None
+
+            if attempt >= policy.attempts:
+                raise RequestFailed('Range of %s failed at byte %d of %d: %s'
+                                    % (path, first, last, error))
+            delay = policy.delay(attempt)
+            self.log.info('Resuming range %d-%d of %s in %.2fs: %s',
+                          first, last, path, delay, error)
+            time.sleep(delay)
+
+    start = time.time()
+    allocate(partial, size)
+    writer = PositionalWriter(partial)
+    try:
+        fan_out(fetch, ranges,
+                max_workers=max_workers or self.setting('pool_maxsize'))
+    except Exception:
+        # A partial file with holes cannot be resumed by download().
+        for response in opened.values():
+            response.close()
+        writer.close()
+        os.remove(partial)
+        raise
+    writer.close()
+
+    algorithm = None
+    if verify:
+        algorithm, expected = pick_checksum(info.get('checksums') or {})
+        if algorithm is not None:
+            actual = file_digests(partial, [algorithm])[algorithm]
+            if actual != expected:
+                os.remove(partial)
+                raise ChecksumMismatch('%s %s of %s does not match %s' % (
+                    algorithm, actual, path, expected))
+
+    os.rename(partial, dest)
+
+    result = TransferResult(path, dest, size, 0, time.time() - start,
+                            algorithm)
+    log_transfer('Downloaded', result)
+    return result
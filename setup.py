@@ -15,5 +15,12 @@ setup(
     long_description=open('README.rst').read(),
     install_requires=[
         "requests>=2.3.0",
+        "futures; python_version < '3'",
     ],
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+    },
+    entry_points={
+        'console_scripts': ['party = party.cli:main'],
+    },
 )
@@ -0,0 +1,8 @@
+"""Test configuration."""
+import sys
+
+collect_ignore = []
+
+# The asyncio client uses async/await syntax.
+if sys.version_info < (3, 5):
+    collect_ignore.append('test_async_party.py')
@@ -1,5 +1,7 @@
 """Test AQL construction."""
-from party.aql import Aql
+import pytest
+
+from party.aql import Aql, Param, and_, match, or_
 
 
 def test_basic():
@@ -65,3 +67,79 @@ def test_sort():
 
     aql.order_and_fields = {'$asc': ['repo', 'name']}
     assert aql.format_sort() == '.sort({"$asc": ["repo", "name"]})'
+
+
+def test_defaults_not_shared():
+    """Each query gets its own criteria, fields and sort order."""
+    first, second = Aql(), Aql()
+    first.criteria['repo'] = 'myrepo'
+    first.fields.append('name')
+    assert second.criteria == {} and second.fields == []
+
+
+def test_statement_memoized():
+    """The statement is kept until an attribute is assigned."""
+    aql = Aql(criteria={'repo': 'myrepo'})
+    assert aql.aql is aql.aql
+
+    aql.num_records = 10
+    assert aql.aql == 'items.find({"repo": "myrepo"}).limit(10)'
+    aql.criteria = {'repo': 'other'}
+    assert aql.aql == 'items.find({"repo": "other"}).limit(10)'
+
+
+def test_statement_changed_in_place():
+    """Changing criteria, fields or sort in place renews the statement."""
+    aql = Aql(criteria={'repo': 'myrepo'})
+    assert aql.aql == 'items.find({"repo": "myrepo"})'
+
+    aql.criteria['repo'] = 'other'
+    aql.fields.append('name')
+    assert aql.aql == 'items.find({"repo": "other"}).include("name")'
+
+    aql.sort(desc=['name']).order_and_fields['$desc'].append('repo')
+    assert aql.aql.endswith('.sort({"$desc": ["name", "repo"]})')
+
+
+def test_builder():
+    """Builder methods compose criteria and return the query."""
+    aql = (Aql()
+           .where(repo='myrepo', type='file')
+           .match('name', '*.rpm')
+           .any_of({'path': 'a'}, {'path': 'b'})
+           .include('name', 'repo')
+           .sort(asc=['name'])
+           .limit(5)
+           .offset(10))
+    assert aql.criteria == {'$and': [
+        {'repo': 'myrepo'},
+        {'type': 'file'},
+        {'name': {'$match': '*.rpm'}},
+        {'$or': [{'path': 'a'}, {'path': 'b'}]},
+    ]}
+    assert aql.aql.endswith('.include("name", "repo")'
+                            '.sort({"$asc": ["name"]}).limit(5).offset(10)')
+
+    with pytest.raises(ValueError):
+        Aql().sort()
+    with pytest.raises(ValueError):
+        Aql().sort(asc=['name'], desc=['repo'])
+
+    assert and_() == {}
+    assert and_({'repo': 'a'}, {}) == {'repo': 'a'}
+    assert or_(match('name', 'a*'), or_({'name': 'b'}, {'name': 'c'})) == \
+        {'$or': [{'name': {'$match': 'a*'}}, {'name': 'b'}, {'name': 'c'}]}
+
+
+def test_template():
+    """Parameters are bound into the precompiled statement."""
+    template = Aql(criteria={'repo': Param('repo'),
+                             'name': {'$match': Param('name')}},
+                   fields=['name'], num_records=1).compile()
+    assert sorted(template.names) == ['name', 'repo']
+    assert template.bind(repo='my"repo', name='*.rpm') == (
+        'items.find({"repo": "my\\"repo", "name": {"$match": "*.rpm"}})'
+        '.include("name").limit(1)')
+
+    with pytest.raises(ValueError):
+        template.bind(repo='myrepo')
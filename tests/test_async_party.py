@@ -0,0 +1,162 @@
+"""Test the asyncio client against a local aiohttp server."""
+import asyncio
+import base64
+import json
+import ssl
+
+import pytest
+from flexmock import flexmock
+
+web = pytest.importorskip('aiohttp.web')
+
+from party.async_party import AsyncParty  # noqa: E402
+from party.party_config import party_config  # noqa: E402
+
+
+def run(coroutine):
+    """Run ``coroutine`` to completion on a fresh event loop."""
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+async def serve(handler):
+    """Start a local server answering every request with ``handler``."""
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'http://127.0.0.1:%d/artifactory/api' % port
+
+
+def client(url, **config):
+    """AsyncParty pointing at ``url``."""
+    config.update({
+        'artifactory_url': url,
+        'username': 'user',
+        'password': base64.b64encode(b'pass').decode(),
+    })
+    return AsyncParty(config=config)
+
+
+def test_find_by_properties():
+    """Property search sets files and count like Party."""
+    async def handler(request):
+        assert request.path.endswith('/search/prop')
+        assert request.query['build.number'] == '789'
+        return web.json_response({'results': [{'uri': 'http://x/a.rpm'},
+                                              {'uri': 'http://x/b.rpm'}]})
+
+    async def scenario():
+        runner, url = await serve(handler)
+        try:
+            async with client(url) as artifact:
+                assert await artifact.find_by_properties(
+                    {'build.number': '789'}) == 'OK'
+                return artifact
+        finally:
+            await runner.cleanup()
+
+    artifact = run(scenario())
+    assert artifact.files == ['a.rpm', 'b.rpm']
+    assert artifact.count == 2
+
+
+@pytest.mark.parametrize('config, limit', [
+    ({}, party_config['pool_maxsize']),
+    ({'max_workers': 3}, 3),
+])
+def test_find_by_pattern_concurrent(config, limit):
+    """Pattern searches run concurrently and merge in order."""
+    state = {'running': 0, 'peak': 0}
+
+    async def handler(request):
+        state['running'] += 1
+        state['peak'] = max(state['peak'], state['running'])
+        await asyncio.sleep(0.01)
+        state['running'] -= 1
+        repo, pattern = request.query['pattern'].split(':', 1)
+        return web.json_response({'repoUri': 'http://x/%s' % repo,
+                                  'files': ['%d.rpm' % pattern.count('*/')]})
+
+    async def scenario():
+        runner, url = await serve(handler)
+        try:
+            async with client(url, **config) as artifact:
+                assert await artifact.find_by_pattern(
+                    'file', 'repo', max_depth=12) == 'OK'
+                return artifact
+        finally:
+            await runner.cleanup()
+
+    artifact = run(scenario())
+    assert artifact.files == ['http://x/repo/%d.rpm' % i for i in range(12)]
+    assert 1 < state['peak'] <= limit
+
+
+def test_find_by_aql_and_errors():
+    """AQL posts plain text; bad statuses return None."""
+    async def handler(request):
+        if request.method == 'POST':
+            assert request.headers['Content-type'] == 'text/plain'
+            return web.json_response({'results': [{'name': await request.text()}]})
+        return web.Response(status=404)
+
+    async def scenario():
+        runner, url = await serve(handler)
+        try:
+            async with client(url) as artifact:
+                results = await artifact.find_by_aql(criteria={'repo': 'r'})
+                missing = await artifact.get_file_info('repo/missing.rpm')
+                deleted = await artifact.delete_item('repo/missing.rpm')
+                return artifact, results, missing, deleted
+        finally:
+            await runner.cleanup()
+
+    artifact, results, missing, deleted = run(scenario())
+    assert results == {'results': [{'name': 'items.find({"repo": "r"})'}]}
+    assert artifact.headers['Content-type'] == 'application/json'
+    assert missing is None
+    assert deleted == 'OK nothing to delete'
+
+
+def test_dry_run():
+    """Dry mode never opens a connection."""
+    async def scenario():
+        artifact = client('http://unreachable.invalid/api')
+        response = await artifact.query_artifactory(
+            'http://unreachable.invalid/api/storage', 'put', dry=True)
+        assert artifact._session is None
+        return response
+
+    response = run(scenario())
+    assert response.status_code == 200
+    assert json.loads(response.text)['query_type'] == 'put'
+
+
+def test_ssl_context_and_auth_built_once():
+    """The SSL context and credentials are reused across requests."""
+    async def handler(request):
+        return web.json_response([{'key': 'repo'}])
+
+    context = ssl.create_default_context()
+    flexmock(ssl).should_receive('create_default_context') \
+        .with_args(cafile='bundle.pem').and_return(context).once()
+
+    async def scenario():
+        runner, url = await serve(handler)
+        try:
+            async with client(url, certbundle='bundle.pem') as artifact:
+                auth = artifact.auth
+                for _ in range(3):
+                    assert await artifact.get_repositories() == ['repo']
+                assert artifact.ssl_context is context
+                assert artifact.auth is auth
+
+                artifact.password = base64.b64encode(b'other').decode()
+                assert artifact.auth.password == 'other'
+        finally:
+            await runner.cleanup()
+
+    run(scenario())
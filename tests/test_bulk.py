@@ -0,0 +1,118 @@
+"""Test batch operations."""
+import threading
+import time
+
+from flexmock import flexmock
+
+import party
+from party import bulk
+from party.fanout import iter_fan_out
+from party.ratelimit import TokenBucket
+
+API = 'http://host/artifactory/api'
+
+
+def response(status_code):
+    """Fake response with ``status_code``."""
+    return flexmock(status_code=status_code, ok=status_code < 400)
+
+
+def test_item_path():
+    """Paths and AQL results reduce to repo/path/name."""
+    assert bulk.item_path('/repo/dir/a.rpm') == 'repo/dir/a.rpm'
+    assert bulk.item_path({'repo': 'repo', 'path': 'dir', 'name': 'a.rpm'}) == 'repo/dir/a.rpm'
+    assert bulk.item_path({'repo': 'repo', 'path': '.', 'name': 'a.rpm'}) == 'repo/a.rpm'
+
+
+def test_iter_fan_out_lazy():
+    """Items are consumed lazily and every outcome is reported."""
+    consumed = []
+
+    def items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    def half_fail(item):
+        if item % 2:
+            raise ValueError(item)
+        return item
+
+    outcomes = iter_fan_out(half_fail, items(), max_workers=2)
+    first = next(outcomes)
+    assert len(consumed) <= 5
+
+    # Outcomes arrive in order of completion, the first may be a failure.
+    everything = [first] + list(outcomes)
+    assert sorted(item for item, _, _ in everything) == list(range(100))
+    for item, result, error in everything:
+        if item % 2:
+            assert result is None and isinstance(error, ValueError)
+        else:
+            assert result == item and error is None
+
+
+def test_token_bucket():
+    """Requests beyond the burst wait for new tokens."""
+    bucket = TokenBucket(rate=100, burst=1)
+    start = time.time()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.time() - start >= 0.04
+    assert TokenBucket(0).reserve() == 0
+
+
+def test_delete_items_statuses():
+    """Each item reports ok, not found or error."""
+    artifact = party.Party(config={'artifactory_url': API})
+    statuses = {'repo/a': 204, 'repo/b': 404, 'repo/c': 500}
+
+    def send(query, query_type):
+        assert query_type == 'delete'
+        path = query.replace('http://host/artifactory/', '')
+        if path == 'repo/d':
+            raise IOError('connection reset')
+        return response(statuses[path])
+
+    flexmock(artifact).should_receive('send_query').replace_with(send)
+
+    results = dict((r.path, r.status) for r in artifact.delete_items(
+        ['repo/a', '/repo/b', 'repo/c', {'repo': 'repo', 'path': '.', 'name': 'd'}],
+        max_workers=3))
+    assert results == {'repo/a': 'ok', 'repo/b': 'not_found',
+                       'repo/c': 'error', 'repo/d': 'error'}
+
+
+def test_set_properties_many_checkpoint(tmp_path):
+    """Finished items are skipped when resuming from a checkpoint."""
+    artifact = party.Party(config={'artifactory_url': API})
+    checkpoint = str(tmp_path / 'checkpoint')
+    sent = []
+    lock = threading.Lock()
+
+    def send(query, query_type):
+        with lock:
+            sent.append(query)
+        return response(500 if 'repo/c' in query else 204)
+
+    flexmock(artifact).should_receive('send_query').replace_with(send)
+
+    paths = ['repo/a', 'repo/b', 'repo/c']
+    first = list(artifact.set_properties_many(paths, {'keep': 'no'},
+                                              max_workers=2, checkpoint=checkpoint))
+    assert len(first) == 3
+    assert API + '/storage/repo/a?properties=keep=no' in sent
+
+    del sent[:]
+    second = list(artifact.set_properties_many(paths, {'keep': 'no'},
+                                               checkpoint=checkpoint))
+    assert [r.path for r in second] == ['repo/c']
+    assert len(sent) == 1
+
+
+def test_delete_items_dry():
+    """Dry runs never send requests."""
+    artifact = party.Party(config={'artifactory_url': API})
+    flexmock(artifact).should_receive('send_query').never()
+    results = list(artifact.delete_items(['repo/a'], dry=True))
+    assert results == [bulk.ItemResult('repo/a', 'ok', '200')]
@@ -0,0 +1,150 @@
+"""Test the response cache."""
+import time
+
+from flexmock import flexmock
+
+import party
+from party.cache import ResponseCache
+from party.endpoints import endpoint_name, repo_path
+
+API = 'http://host/artifactory/api'
+
+
+def response(status_code=200, headers=None, text='{}'):
+    """Fake response."""
+    return flexmock(status_code=status_code, ok=status_code < 400,
+                    headers=headers or {}, text=text, close=lambda: None)
+
+
+def test_endpoint_name():
+    """URLs are classified by endpoint."""
+    assert endpoint_name(API + '/repositories?type=local', API) == 'repositories'
+    assert endpoint_name(API + '/storage/repo/a.rpm', API) == 'storage'
+    assert endpoint_name(API + '/storage/repo/a.rpm?properties=a,b', API) == 'properties'
+    assert endpoint_name(API + '/search/aql', API) == 'search/aql'
+    assert endpoint_name('http://host/artifactory/repo/a.rpm', API) == 'item'
+    assert endpoint_name('http://elsewhere/x', API) == ''
+
+
+def test_repo_path():
+    """Storage, item and bare paths reduce to repo/path."""
+    assert repo_path(API + '/storage/repo/dir/a.rpm?properties', API) == 'repo/dir/a.rpm'
+    assert repo_path('http://host/artifactory/repo/a.rpm', API) == 'repo/a.rpm'
+    assert repo_path('/repo/dir/', API) == 'repo/dir'
+
+
+def test_lru_eviction():
+    """Least recently used entries are evicted first."""
+    cache = ResponseCache(2, {'default': 60})
+    for key in 'abc':
+        if key == 'c':
+            cache.get('a')
+        cache.set(key, response(), 'storage')
+
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_per_endpoint():
+    """Endpoints without a time to live are not cached."""
+    cache = ResponseCache(10, {'storage': 60})
+    cache.set('a', response(), 'storage')
+    cache.set('b', response(), 'search/prop')
+    assert len(cache) == 1
+
+    cache.entries['a'].expires = time.time() - 1
+    assert not cache.get('a').fresh
+    assert cache.stats()['misses'] == 1
+
+
+def test_party_cache_hits_and_invalidation():
+    """Party serves repeated GETs from the cache until an item changes."""
+    artifact = party.Party(config={'artifactory_url': API})
+    artifact.cache = ResponseCache(10, {'storage': 60, 'properties': 60})
+    query = API + '/storage/repo/a.rpm'
+
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get').and_return(response()).twice()
+    flexmock(artifact).should_receive('send_query').with_args(
+        query + '?properties=a=1', 'put').and_return(response(204)).once()
+
+    first = artifact.query_artifactory(query)
+    assert artifact.query_artifactory(query) is first
+    artifact.set_properties(query, {'a': 1})
+    artifact.query_artifactory(query)
+
+    assert artifact.cache.stats()['hits'] == 1
+    assert artifact.cache.stats()['invalidations'] == 1
+
+
+def test_party_cache_revalidation():
+    """Expired entries are revalidated with their ETag."""
+    artifact = party.Party(config={'artifactory_url': API})
+    artifact.cache = ResponseCache(10, {'storage': 60})
+    query = API + '/storage/repo/a.rpm'
+    original = response(headers={'ETag': '"abc"'})
+
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get').and_return(original).once()
+    artifact.query_artifactory(query)
+    (key,) = artifact.cache.entries
+    artifact.cache.entries[key].expires = 0
+
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get', headers=dict(artifact.headers, **{'If-None-Match': '"abc"'})
+    ).and_return(response(304)).once()
+    assert artifact.query_artifactory(query) is original
+    assert artifact.cache.stats()['revalidations'] == 1
+
+
+def test_party_cache_304_without_validators():
+    """A 304 is only taken as revalidation when validators were sent."""
+    artifact = party.Party(config={'artifactory_url': API})
+    artifact.cache = ResponseCache(10, {'storage': 60})
+    query = API + '/storage/repo/a.rpm'
+
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get').and_return(response()).once()
+    artifact.query_artifactory(query)
+    (key,) = artifact.cache.entries
+    artifact.cache.entries[key].expires = 0
+
+    not_modified = response(304)
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get').and_return(not_modified).once()
+    assert artifact.query_artifactory(query) is not_modified
+    assert artifact.cache.stats()['revalidations'] == 0
+
+    # The entry is dropped while its revalidation is in flight.
+    etag = response(headers={'ETag': '"abc"'})
+    artifact.cache.set(key, etag, 'storage')
+    artifact.cache.entries[key].expires = 0
+    fresh = response()
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get', headers=dict(artifact.headers,
+                                   **{'If-None-Match': '"abc"'})
+    ).replace_with(lambda *args, **kwargs: (artifact.cache.clear(),
+                                            response(304))[1]).once()
+    flexmock(artifact).should_receive('send_query').with_args(
+        query, 'get', headers=None).and_return(fresh).once()
+    assert artifact.query_artifactory(query) is fresh
+
+
+def test_party_cache_per_user():
+    """Responses cached for one user are not served to another."""
+    cache = ResponseCache(10, {'storage': 60})
+    query = API + '/storage/repo/a.rpm'
+    clients = []
+    for username in ('alice', 'bob'):
+        artifact = party.Party(config={'artifactory_url': API})
+        artifact.username = username
+        artifact.cache = cache
+        flexmock(artifact).should_receive('send_query').and_return(
+            response()).once()
+        clients.append(artifact)
+
+    for artifact in clients + clients:
+        artifact.query_artifactory(query)
+
+    assert len(cache) == 2
+    assert cache.stats()['hits'] == 2
@@ -0,0 +1,57 @@
+"""Test the command line interface."""
+import json
+
+from flexmock import flexmock
+
+from party import cli
+from party.party import Party
+from party.results import ArtifactRef, PropertySet
+
+API = 'http://host/artifactory/api'
+
+
+def outputs(capsys):
+    """JSON records printed so far, by id."""
+    lines = capsys.readouterr().out.splitlines()
+    return dict((record['id'], record)
+                for record in (json.loads(line) for line in lines))
+
+
+def test_single_command(capsys):
+    """A command runs one operation and prints its result."""
+    flexmock(Party).should_receive('fetch_by_name').with_args('a.rpm') \
+        .and_return([ArtifactRef('repo/a.rpm', API + '/storage/repo/a.rpm')])
+
+    assert cli.main(['--url', API, 'find', 'a.rpm']) == 0
+    assert outputs(capsys) == {1: {
+        'id': 1, 'op': 'find', 'ok': True,
+        'result': [{'path': 'repo/a.rpm',
+                    'uri': API + '/storage/repo/a.rpm'}]}}
+
+    flexmock(Party).should_receive('set_properties') \
+        .with_args(API + '/storage/repo/a.rpm', {'qa': 'passed', 'b': '1'}) \
+        .and_return('OK').once()
+    assert cli.main(['--url', API, 'props', 'set', 'repo/a.rpm',
+                     'qa=passed', 'b=1']) == 0
+
+
+def test_batch(capsys, tmpdir):
+    """Batches run concurrently and report every line, failed or not."""
+    flexmock(Party).should_receive('fetch_properties').replace_with(
+        lambda path, names=None: PropertySet(path, {'build': [path[-5]]}))
+    batch = tmpdir.join('ops.jsonl')
+    batch.write('\n'.join(
+        [json.dumps({'op': 'props-get', 'path': 'repo/%d.rpm' % i, 'id': i})
+         for i in range(20)] +
+        ['', 'not json', json.dumps({'op': 'upload'})]) + '\n')
+
+    assert cli.main(['--url', API, '--workers', '4', 'batch',
+                     str(batch)]) == 1
+
+    records = outputs(capsys)
+    assert len(records) == 22
+    assert all(records[i]['ok'] for i in range(20))
+    assert records[7]['result'] == {'path': 'repo/7.rpm',
+                                    'properties': {'build': ['7']}}
+    assert not records[22]['ok'] and 'op' not in records[22]
+    assert records[23]['error'] == "ValueError: Unknown operation: 'upload'"
@@ -0,0 +1,117 @@
+"""Test the persistent response cache."""
+import os
+import stat
+import threading
+
+import requests
+from flexmock import flexmock
+
+import party
+from party.cache import auth_scope, cache_key
+from party.disk_cache import SqliteCache
+
+API = 'http://host/artifactory/api'
+TTL = {'default': 60}
+
+
+def response(content=b'{"results": []}', headers=None):
+    """Fully read response."""
+    result = requests.models.Response()
+    result.status_code = 200
+    result.url = API
+    result.headers.update(headers or {'Content-Type': 'application/json'})
+    result._content = content
+    result._content_consumed = True
+    return result
+
+
+def test_cache_key():
+    """Equivalent URLs and statements share a key."""
+    assert cache_key('HTTP://Host/api/x?b=2&a=1') == 'http://host/api/x?a=1&b=2'
+    assert cache_key(API + '/search/aql', ' items.find({})\n') == \
+        API + '/search/aql\nitems.find({})'
+
+    alice = cache_key(API, scope=auth_scope('alice', 'secret'))
+    assert alice != cache_key(API, scope=auth_scope('bob', 'secret'))
+    assert alice != cache_key(API, scope=auth_scope('alice', 'other'))
+    assert alice.endswith(' ' + API)
+
+
+def test_private_files(tmp_path):
+    """The cache directory and database are only accessible by the owner."""
+    directory = tmp_path / 'cache'
+    cache = SqliteCache(str(directory), ttl=TTL)
+    cache.set('key', response(), 'storage')
+
+    assert stat.S_IMODE(os.stat(str(directory)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+
+
+def test_shared_between_instances(tmp_path):
+    """A second cache on the same directory sees stored responses."""
+    SqliteCache(str(tmp_path), ttl=TTL).set(
+        'key', response(headers={'ETag': '"x"'}), 'storage')
+
+    entry = SqliteCache(str(tmp_path), ttl=TTL).get('key')
+    assert entry.fresh
+    assert entry.response.json() == {'results': []}
+    assert entry.validators() == {'If-None-Match': '"x"'}
+
+
+def test_eviction(tmp_path):
+    """Entry count and total size are bounded."""
+    cache = SqliteCache(str(tmp_path), max_entries=3, ttl=TTL)
+    for key in 'abcd':
+        cache.set(key, response(), 'storage')
+    assert len(cache) == 3
+    assert cache.get('a') is None
+
+    cache = SqliteCache(str(tmp_path / 'bytes'), ttl=TTL, max_bytes=25)
+    cache.set('a', response(b'x' * 20), 'storage')
+    cache.set('b', response(b'y' * 20), 'storage')
+    assert cache.get('a') is None
+    assert cache.get('b').response.content == b'y' * 20
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_and_ttl(tmp_path):
+    """Entries are dropped by path, endpoints without TTL are not stored."""
+    cache = SqliteCache(str(tmp_path), ttl={'storage': 60})
+    cache.set(API + '/storage/repo/a.rpm', response(), 'storage')
+    cache.set(API + '/storage/repo/b.rpm', response(), 'storage')
+    cache.set(API + '/search/prop?a=b', response(), 'search/prop')
+    cache.invalidate('/repo/a.rpm')
+
+    assert len(cache) == 1
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_concurrent_writers(tmp_path):
+    """Threads with their own connections write without errors."""
+    cache = SqliteCache(str(tmp_path), ttl=TTL, max_entries=50)
+
+    def write(worker):
+        for i in range(20):
+            cache.set('%d-%d' % (worker, i), response(), 'storage')
+            cache.get('%d-%d' % (worker, i))
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 50
+
+
+def test_party_caches_aql(tmp_path):
+    """Repeated AQL searches are answered from the persistent cache."""
+    artifact = party.Party(config={'artifactory_url': API})
+    artifact.cache = SqliteCache(str(tmp_path), ttl={'search/aql': 60})
+
+    flexmock(artifact).should_receive('send_query').and_return(
+        response()).once()
+
+    assert artifact.find_by_aql(criteria={'repo': 'r'}) == {'results': []}
+    assert artifact.find_by_aql(criteria={'repo': 'r'}) == {'results': []}
+    assert artifact.cache.stats()['hits'] == 1
@@ -0,0 +1,62 @@
+"""Test concurrent fan-out."""
+import threading
+import time
+
+import pytest
+
+from party.fanout import fan_out
+
+
+def test_results_in_item_order():
+    """Results keep item order even when calls finish out of order."""
+    def slow_first(item):
+        time.sleep(0.01 * (5 - item))
+        return item * 2
+
+    assert fan_out(slow_first, range(5), max_workers=5) == [0, 2, 4, 6, 8]
+    assert fan_out(slow_first, range(5)) == [0, 2, 4, 6, 8]
+
+
+def test_bounded_concurrency():
+    """No more than ``max_workers`` calls run at once."""
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def track(_):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+
+    fan_out(track, range(20), max_workers=3)
+    assert state['peak'] <= 3
+
+
+def test_stop_on_error():
+    """First failure is raised and pending calls are cancelled."""
+    calls = []
+
+    def fail_early(item):
+        calls.append(item)
+        if item == 0:
+            raise ValueError(item)
+        time.sleep(0.01)
+
+    with pytest.raises(ValueError):
+        fan_out(fail_early, range(50), max_workers=2)
+    assert len(calls) < 50
+
+
+def test_ignore_errors():
+    """Failed calls yield ``None`` when not stopping on errors."""
+    def odd_fails(item):
+        if item % 2:
+            raise ValueError(item)
+        return item
+
+    assert fan_out(odd_fails, range(4), max_workers=2,
+                   stop_on_error=False) == [0, None, 2, None]
+    assert fan_out(odd_fails, range(4),
+                   stop_on_error=False) == [0, None, 2, None]
@@ -0,0 +1,100 @@
+"""Test the local repository snapshot."""
+import hashlib
+
+from flexmock import flexmock
+
+from party import Party
+from party.results import ArtifactRef
+
+API = 'http://host/artifactory/api'
+
+
+def item(path, modified, **properties):
+    """AQL result of the file ``repo/path/name`` with ``properties``."""
+    repo, _, rest = path.partition('/')
+    folder, _, name = rest.rpartition('/')
+    return {
+        'repo': repo, 'path': folder or '.', 'name': name,
+        'size': len(path), 'created': modified, 'modified': modified,
+        'sha256': hashlib.sha256(path.encode()).hexdigest(),
+        'actual_sha1': hashlib.sha1(path.encode()).hexdigest(),
+        'properties': [{'key': key, 'value': value}
+                       for key, value in sorted(properties.items())],
+    }
+
+
+def serve(artifact, listing):
+    """Answer AQL searches from ``listing``, recording their criteria."""
+    searches = []
+
+    def iter_aql(criteria, **kwargs):
+        searches.append(criteria)
+        since = criteria.get('modified', {}).get('$gte', '')
+        return iter([result for result in listing
+                     if result['repo'] == criteria['repo'] and
+                     result['modified'] >= since])
+
+    flexmock(artifact).should_receive('iter_aql').replace_with(iter_aql)
+    return searches
+
+
+def test_index_lookups(tmpdir):
+    """Names, globs, properties and checksums are looked up locally."""
+    artifact = Party(config={'artifactory_url': API})
+    serve(artifact, [
+        item('rpm/foo/foo-1.2.0.rpm', '2024-01-01', **{'build.number': '189'}),
+        item('rpm/foo/foo-1.3.0.rpm', '2024-01-02', **{'build.number': '190'}),
+        item('rpm/bar.rpm', '2024-01-03', **{'build.number': '189',
+                                             'qa': 'passed'}),
+        item('other/foo-1.2.1.rpm', '2024-01-04'),
+    ])
+
+    index = artifact.build_index(str(tmpdir.join('index.sqlite')),
+                                 ['rpm', 'other'])
+
+    assert len(index) == 4
+    assert index.find('foo-1.2*.rpm') == [
+        ArtifactRef('other/foo-1.2.1.rpm',
+                    API + '/storage/other/foo-1.2.1.rpm'),
+        ArtifactRef('rpm/foo/foo-1.2.0.rpm',
+                    API + '/storage/rpm/foo/foo-1.2.0.rpm')]
+    assert [ref.path for ref in index.find('bar.rpm')] == ['rpm/bar.rpm']
+    assert index.find('foo-1.2*.rpm', repos=['rpm'])[0].repo == 'rpm'
+    assert [ref.name for ref in
+            index.find_by_properties({'build.number': '189'})] == \
+        ['bar.rpm', 'foo-1.2.0.rpm']
+    assert [ref.name for ref in index.find_by_properties(
+        [('build.number', '189'), ('qa', 'passed')])] == ['bar.rpm']
+    checksum = hashlib.sha256(b'rpm/bar.rpm').hexdigest()
+    assert [ref.path for ref in index.find_by_checksum(checksum)] == \
+        ['rpm/bar.rpm']
+
+    assert index.properties('rpm/bar.rpm').get('qa') == 'passed'
+    assert index.properties(API + '/storage/other/foo-1.2.1.rpm') is None
+    info = index.file_info('rpm/bar.rpm')
+    assert info.download_uri == 'http://host/artifactory/rpm/bar.rpm'
+    assert info.checksums['sha256'] == checksum
+    assert index.file_info('rpm/missing.rpm') is None
+
+
+def test_index_refresh(tmpdir):
+    """Refreshes list files modified since, full ones drop deleted files."""
+    artifact = Party(config={'artifactory_url': API})
+    listing = [item('rpm/a.rpm', '2024-01-01', state='old'),
+               item('rpm/b.rpm', '2024-01-02')]
+    searches = serve(artifact, listing)
+    path = str(tmpdir.join('index.sqlite'))
+    artifact.build_index(path, ['rpm'])
+
+    listing[0] = item('rpm/a.rpm', '2024-01-05', state='new')
+    del listing[1]
+    index = artifact.build_index(path)
+
+    assert searches[-1]['modified'] == {'$gte': '2024-01-02'}
+    assert index.repos == {'rpm': '2024-01-05'}
+    assert index.properties('rpm/a.rpm').values('state') == ['new']
+    assert len(index) == 2
+
+    index.refresh(artifact, full=True)
+    assert 'modified' not in searches[-1]
+    assert [ref.path for ref in index.find('*.rpm')] == ['rpm/a.rpm']
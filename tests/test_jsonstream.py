@@ -0,0 +1,68 @@
+"""Test incremental JSON parsing."""
+import json
+
+import pytest
+
+from party.jsonstream import iter_items
+
+
+def chunked(body, size):
+    """Split the encoded ``body`` into chunks of ``size`` bytes."""
+    content = json.dumps(body).encode()
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 64, 4096])
+def test_results_member(size):
+    """Array elements are yielded whatever the chunk boundaries."""
+    results = [{'uri': 'http://x/%d.rpm' % i, 'size': i * 1000}
+               for i in range(50)]
+    body = {'range': {'total': 50}, 'results': results, 'after': [1, 2]}
+    assert list(iter_items(chunked(body, size), 'results')) == results
+
+
+@pytest.mark.parametrize('size', [1, 5])
+def test_top_level_array(size):
+    """The body itself can be the array."""
+    body = [{'key': 'a'}, 12345, True, None, 'text é']
+    assert list(iter_items(chunked(body, size))) == body
+
+
+def test_split_at_every_offset():
+    """Numbers, literals and strings survive a chunk boundary anywhere."""
+    body = {'results': [1500.0, 1e5, -2.5E-3, 0, 123456789, True, False,
+                        None, 'a\u00e9b', {'size': 12.75, 'n': [1, -1]}]}
+    content = json.dumps(body).encode()
+    for offset in range(1, len(content)):
+        chunks = [content[:offset], content[offset:]]
+        assert list(iter_items(chunks, 'results')) == body['results'], offset
+
+
+def test_missing_and_empty():
+    """Missing members and empty arrays yield nothing."""
+    assert list(iter_items(chunked({'other': []}, 2), 'results')) == []
+    assert list(iter_items(chunked({'results': []}, 2), 'results')) == []
+    assert list(iter_items(chunked({}, 2), 'results')) == []
+    assert list(iter_items(chunked([], 2))) == []
+
+
+def test_yields_before_body_complete():
+    """Items are produced before the rest of the body is read."""
+    read = []
+
+    def chunks():
+        for chunk in chunked({'results': list(range(100))}, 4):
+            read.append(chunk)
+            yield chunk
+
+    items = iter_items(chunks(), 'results')
+    assert next(items) == 0
+    assert len(read) < 10
+
+
+def test_invalid_body():
+    """Broken JSON raises ``ValueError``."""
+    with pytest.raises(ValueError):
+        list(iter_items([b'{"results": [1, 2'], 'results'))
+    with pytest.raises(ValueError):
+        list(iter_items([b'<html>'], 'results'))
@@ -0,0 +1,124 @@
+"""Test request instrumentation."""
+import base64
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import pytest
+
+from party import Party
+from party.metrics import Histogram, MetricsCollector, RequestEvent
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answer with a fixed body, 503 for paths containing ``busy``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=C0103
+        body = b'{"results": []}'
+        self.send_response(503 if 'busy' in self.path else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded server so kept-alive connections do not block shutdown."""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    """Local HTTP server, yields its API URL."""
+    httpd = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://%s:%d/artifactory/api' % httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def client(url):
+    """Party pointing at ``url``."""
+    artifact = Party(config={'artifactory_url': url})
+    artifact.password = base64.b64encode(b'pass').decode()
+    return artifact
+
+
+def event(elapsed, endpoint='storage', status=200, retries=0):
+    """Request event with ``elapsed`` seconds."""
+    return RequestEvent('get', endpoint, status, elapsed, 0.0, elapsed / 2,
+                        elapsed / 2, 100, retries)
+
+
+def test_histogram_quantiles():
+    """Quantiles resolve to bucket upper bounds."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+
+
+def test_prometheus_export():
+    """Metrics render in the text exposition format."""
+    collector = MetricsCollector(buckets=(0.1, 1.0))
+    collector(event(0.05))
+    collector(event(0.5, status=503, retries=2))
+
+    text = collector.to_prometheus()
+    assert '# TYPE party_request_duration_seconds histogram' in text
+    assert 'party_request_duration_seconds_bucket{method="get",endpoint="storage",le="0.1"} 1' in text
+    assert 'party_request_duration_seconds_bucket{method="get",endpoint="storage",le="+Inf"} 2' in text
+    assert 'party_requests_total{method="get",endpoint="storage",status="503"} 1' in text
+    assert 'party_request_retries_total{method="get",endpoint="storage"} 2' in text
+    assert collector.summary()[('get', 'storage')]['count'] == 2
+
+
+def test_hooks_receive_events(server):
+    """Every request reports timing, size and retries to the hooks."""
+    artifact = client(server)
+    artifact.retry_policy.backoff = 0
+    events = []
+    collector = MetricsCollector()
+    artifact.add_hook(events.append)
+    artifact.add_hook(collector)
+
+    artifact.query_artifactory(server + '/storage/repo/a.rpm')
+    artifact.query_artifactory(server + '/storage/repo/b.rpm')
+    artifact.query_artifactory(server + '/search/busy')
+
+    first, second, busy = events
+    assert first.endpoint == 'storage'
+    assert first.status == 200
+    assert first.bytes == len(b'{"results": []}')
+    assert first.connect > 0
+    assert second.connect == 0
+    assert busy.endpoint == 'search/busy'
+    assert busy.status == 503
+    assert busy.retries == artifact.retry_policy.attempts - 1
+    assert ('get', 'search/busy') in collector.summary()
+
+
+def test_failing_hook_ignored(server):
+    """A broken hook does not break the request."""
+    artifact = client(server)
+
+    def broken(_):
+        raise RuntimeError('boom')
+
+    artifact.add_hook(broken)
+    assert artifact.query_artifactory(server + '/storage/a') is not None
@@ -108,3 +108,127 @@ def test_get_repositories():
     repos = artifact.get_repositories("local")
     assert_is_instance(repos, list)
     assert_equals(repos, ["mykey"])
+
+
+def test_find_by_pattern_parallel():
+    """ find_by_pattern: Concurrent searches merge in repo then depth order. """
+    artifact = party.Party()
+
+    def search(query):
+        repo, pattern = query.split('pattern=', 1)[1].split(':', 1)
+        depth = pattern.count('*/')
+        return flexmock(status_code=200, text=json.dumps(
+            {"repoUri": "http://mock/%s" % repo,
+             "files": ["%d.rpm" % depth]}))
+
+    flexmock(artifact).should_receive("query_artifactory").replace_with(search)
+    flexmock(artifact).should_receive(
+        "get_repositories").and_return(["a", "b"])
+
+    assert_equals(artifact.find_by_pattern("none", max_depth=2, max_workers=4), "OK")
+    assert_equals(artifact.files, ["http://mock/a/0.rpm", "http://mock/a/1.rpm",
+                                   "http://mock/b/0.rpm", "http://mock/b/1.rpm"])
+
+
+def test_find_by_pattern_errors():
+    """ find_by_pattern: Failed searches abort unless errors are ignored. """
+    artifact = party.Party()
+    good = flexmock(status_code=200, text=json.dumps(
+        {"repoUri": "http://mock", "files": ["file.rpm"]}))
+
+    def search(query):
+        if query.endswith(':*/*none*'):
+            return None
+        return good
+
+    flexmock(artifact).should_receive("query_artifactory").replace_with(search)
+
+    assert_equals(artifact.find_by_pattern("none", "repo", max_depth=2, max_workers=2), None)
+    assert_equals(artifact.find_by_pattern("none", "repo", max_depth=2, max_workers=2,
+                                           ignore_errors=True), "OK")
+    assert_equals(artifact.files, ["http://mock/file.rpm"])
+
+
+def test_iter_by_properties():
+    """ iter_by_properties: Results are parsed from the streamed body. """
+    artifact = party.Party()
+    content = json.dumps({"results": [{"uri": "a.rpm"}, {"uri": "b.rpm"}]}).encode()
+    mock_response = flexmock(encoding=None, close=lambda: None,
+                             iter_content=lambda size: iter([content[:10], content[10:]]))
+    flexmock(artifact).should_receive("query_artifactory").with_args(
+        str, stream=True).and_return(mock_response)
+
+    assert_equals([r["uri"] for r in artifact.iter_by_properties(testprops)],
+                  ["a.rpm", "b.rpm"])
+
+
+def test_find_by_pattern_aql():
+    """ find_by_pattern: The AQL engine sends a single paged search. """
+    artifact = party.Party()
+    artifact.artifactory_url = "http://mock/artifactory/api"
+    statements = []
+
+    def post(query, data, query_type, stream=False, headers=None):
+        statements.append(data)
+        content = json.dumps({"results": [
+            {"repo": "a", "path": ".", "name": "none-1.rpm"},
+            {"repo": "b", "path": "x/y", "name": "none-2.rpm"}]}).encode()
+        return flexmock(encoding=None, close=lambda: None,
+                        iter_content=lambda size: iter([content]))
+
+    flexmock(artifact).should_receive("query_artifactory").replace_with(post)
+    flexmock(artifact).should_receive(
+        "get_repositories").and_return(["a", "b"])
+
+    assert_equals(artifact.find_by_pattern("none", repo_type="local",
+                                           max_depth=3, engine="aql"), "OK")
+    assert_equals(artifact.files, ["http://mock/artifactory/a/none-1.rpm",
+                                   "http://mock/artifactory/b/x/y/none-2.rpm"])
+    assert_equals(len(statements), 1)
+    criteria = json.loads(statements[0].split("find(", 1)[1].split(").include", 1)[0])
+    assert_equals(criteria["name"], {"$match": "*none*"})
+    assert_equals(criteria["depth"], {"$lte": 3})
+    assert_equals(criteria["$or"], [{"repo": "a"}, {"repo": "b"}])
+
+    with assert_raises(ValueError):
+        artifact.find_by_pattern("none", engine="nope")
+
+
+def test_find_by_pattern_aql_repo_types():
+    """ find_by_pattern: AQL searches remote caches, virtual repos use patterns. """
+    artifact = party.Party()
+    artifact.artifactory_url = "http://mock/artifactory/api"
+    statements = []
+
+    def post(query, data, query_type, stream=False, headers=None):
+        statements.append(data)
+        content = json.dumps({"results": [
+            {"repo": "jcenter-cache", "path": "org", "name": "none-1.jar"}]}).encode()
+        return flexmock(encoding=None, close=lambda: None,
+                        iter_content=lambda size: iter([content]))
+
+    flexmock(artifact).should_receive("query_artifactory").replace_with(post)
+    flexmock(artifact).should_receive("get_repositories").with_args(
+        "remote").and_return(["jcenter", "central"])
+
+    assert_equals(artifact.find_by_pattern("none", repo_type="remote",
+                                           engine="aql"), "OK")
+    assert_equals(artifact.files,
+                  ["http://mock/artifactory/jcenter/org/none-1.jar"])
+    criteria = json.loads(statements[0].split("find(", 1)[1].split(").include", 1)[0])
+    assert_equals(criteria["$or"], [{"repo": "central-cache"},
+                                    {"repo": "jcenter-cache"}])
+
+    with assert_raises(ValueError):
+        artifact.search_pattern_aql("*none*", repo_type="virtual")
+
+    flexmock(artifact).should_receive("get_repositories").with_args(
+        "virtual").and_return(["libs"]).once()
+    flexmock(artifact).should_receive("query_artifactory").replace_with(
+        lambda query: flexmock(text=json.dumps({
+            "repoUri": "http://mock/artifactory/libs",
+            "files": ["none-2.jar"] if query.endswith(":*none*") else []})))
+    assert_equals(artifact.find_by_pattern("none", repo_type="virtual",
+                                           max_depth=2, engine="aql"), "OK")
+    assert_equals(artifact.files, ["http://mock/artifactory/libs/none-2.jar"])
+    assert_equals(len(statements), 1)
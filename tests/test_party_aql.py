@@ -0,0 +1,153 @@
+"""Test AQL searches."""
+import json
+import re
+
+import pytest
+from flexmock import flexmock
+
+import party
+from party.exceptions import RequestFailed
+
+
+def streamed(body):
+    """Response streaming ``body`` as JSON in small chunks."""
+    content = json.dumps(body).encode()
+    return flexmock(
+        encoding='utf-8', close=lambda: None,
+        iter_content=lambda size: (content[i:i + 7]
+                                   for i in range(0, len(content), 7)))
+
+
+def paged_party(total, fail_at=None):
+    """Party answering AQL posts from ``total`` fake records."""
+    artifact = party.Party()
+    statements = []
+
+    def post(url, data, query_type, stream=False, headers=None):
+        statements.append(data)
+        limit = int(re.search(r'\.limit\((\d+)\)', data).group(1))
+        offset = re.search(r'\.offset\((\d+)\)', data)
+        offset = int(offset.group(1)) if offset else 0
+        if offset == fail_at:
+            return None
+        results = [{'name': '%d.rpm' % i}
+                   for i in range(offset, min(offset + limit, total))]
+        return streamed({'results': results})
+
+    flexmock(artifact).should_receive('query_artifactory').replace_with(post)
+    return artifact, statements
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_aql_pages(prefetch):
+    """All records are yielded across pages of ``page_size``."""
+    artifact, statements = paged_party(25)
+
+    names = [r['name'] for r in artifact.iter_aql(
+        page_size=10, prefetch=prefetch, criteria={'repo': 'r'})]
+
+    assert names == ['%d.rpm' % i for i in range(25)]
+    assert len(statements) == 3
+    assert statements[0] == 'items.find({"repo": "r"}).limit(10)'
+    assert statements[2].endswith('.limit(10).offset(20)')
+
+
+def test_iter_aql_exact_multiple():
+    """A short final page ends iteration."""
+    artifact, statements = paged_party(20)
+    assert len(list(artifact.iter_aql(page_size=10))) == 20
+    assert len(statements) == 3
+
+
+def test_iter_aql_limit_and_offset():
+    """``num_records`` caps and ``offset_records`` starts the iteration."""
+    artifact, statements = paged_party(100)
+    names = [r['name'] for r in artifact.iter_aql(
+        page_size=10, num_records=15, offset_records=5)]
+
+    assert names == ['%d.rpm' % i for i in range(5, 20)]
+    assert statements[-1].endswith('.limit(5).offset(15)')
+
+
+def test_iter_aql_unpaged():
+    """Without a page size a single statement is streamed."""
+    artifact, _ = paged_party(30)
+    artifact.should_receive('query_artifactory').replace_with(
+        lambda url, data, query_type, stream, headers: streamed(
+            {'results': [{'name': 'a'}, {'name': 'b'}], 'range': {}}))
+
+    assert [r['name'] for r in artifact.iter_aql(page_size=None)] == ['a', 'b']
+
+
+def test_iter_aql_failure():
+    """A failed page raises after earlier pages were yielded."""
+    artifact, _ = paged_party(30, fail_at=10)
+    results = artifact.iter_aql(page_size=10)
+    assert len([next(results) for _ in range(10)]) == 10
+    with pytest.raises(RequestFailed):
+        next(results)
+
+
+def test_find_by_aql_restores_headers():
+    """Content type is only plain text for the AQL post."""
+    artifact = party.Party()
+    flexmock(artifact).should_receive('query_artifactory').and_return(
+        flexmock(json=lambda: json.loads('{"results": []}')))
+    assert artifact.find_by_aql(criteria={}) == {'results': []}
+    assert artifact.headers['Content-type'] == 'application/json'
+
+
+def test_post_aql_headers_per_request():
+    """AQL posts send ``text/plain`` without touching the shared headers."""
+    artifact = party.Party()
+    sent = []
+    shared = artifact.headers
+    before = dict(shared)
+
+    def send_query(query, query_type, headers=None, **kwargs):
+        sent.append(headers)
+        return flexmock(ok=True, json=lambda: {'results': []})
+
+    flexmock(artifact).should_receive('send_query').replace_with(send_query)
+
+    assert artifact.find_by_aql(criteria={'repo': 'r'}) == {'results': []}
+    assert sent[0]['Content-type'] == 'text/plain'
+    assert artifact.headers is shared
+    assert shared == before
+
+
+def test_get_properties_many():
+    """Properties of many artifacts come from chunked AQL searches."""
+    artifact = party.Party()
+    statements = []
+
+    def post(url, data, query_type, stream=False, headers=None):
+        statements.append(data)
+        criteria = json.loads(data[len('items.find('):data.index(').include')])
+        results = []
+        for clause in criteria['$or']:
+            names = clause['name']
+            for name in names['$in'] if isinstance(names, dict) else [names]:
+                if name == 'missing.rpm':
+                    continue
+                results.append({
+                    'repo': clause['repo'], 'path': clause['path'],
+                    'name': name, 'properties': [
+                        {'key': 'build', 'value': name[0]},
+                        {'key': 'os', 'value': 'el7'},
+                        {'key': 'os', 'value': 'el8'}]})
+        return streamed({'results': results})
+
+    flexmock(artifact).should_receive('query_artifactory').replace_with(post)
+
+    found = artifact.get_properties_many(
+        ['repo/dir/a.rpm', '/repo/dir/b.rpm', 'repo/c.rpm',
+         {'repo': 'other', 'path': 'x', 'name': 'd.rpm'}, 'repo/missing.rpm'],
+        chunk_size=2)
+
+    assert len(statements) == 3
+    assert '.include("repo", "path", "name", "property.*")' in statements[0]
+    assert '{"$in": ["a.rpm", "b.rpm"]}' in statements[0]
+    assert sorted(found) == ['other/x/d.rpm', 'repo/c.rpm', 'repo/dir/a.rpm',
+                             'repo/dir/b.rpm']
+    assert found['repo/c.rpm'] == {'build': ['c'], 'os': ['el7', 'el8']}
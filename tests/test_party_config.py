@@ -0,0 +1,67 @@
+"""Test per-client configuration."""
+import pytest
+
+import party
+from party.fanout import fan_out
+from party.party_config import PartyConfig, party_config
+
+
+def test_party_config_read_only():
+    """Configurations cannot be changed, only copied with changes."""
+    config = PartyConfig({'username': 'alice'})
+    assert config.username == config['username'] == 'alice'
+    assert config.password == party_config['password']
+    with pytest.raises(AttributeError):
+        config.username = 'bob'
+    with pytest.raises(TypeError):
+        config['username'] = 'bob'  # pylint: disable=E1137
+
+    with pytest.raises(TypeError):
+        config['headers']['X-Extra'] = '1'  # pylint: disable=E1137
+    with pytest.raises(TypeError):
+        config.cache_ttl['storage'] = 0  # pylint: disable=E1137
+    with pytest.raises(AttributeError):
+        config.retry_statuses.append(500)  # pylint: disable=E1101
+
+    other = config.replace(username='bob')
+    assert (config.username, other.username) == ('alice', 'bob')
+    assert other.headers is not config.headers
+
+
+def test_clients_do_not_share_settings():
+    """Creating a client leaves the defaults and other clients alone."""
+    defaults = dict(party_config, headers=dict(party_config['headers']))
+    first = party.Party(config={'artifactory_url': 'http://a/api',
+                                'username': 'alice'})
+    second = party.Party()
+
+    assert party_config == defaults
+    assert second.artifactory_url == party_config['artifactory_url']
+    assert second.username == party_config['username']
+    assert first.config.username == 'alice'
+
+    first.headers['X-Extra'] = '1'
+    assert 'X-Extra' not in second.headers
+    assert 'X-Extra' not in party_config['headers']
+    assert 'X-Extra' not in first.config.headers
+
+
+def test_concurrent_clients():
+    """Clients for different instances can be created from many threads."""
+    def create(index):
+        return party.Party(config={'artifactory_url': 'http://%d/api' % index,
+                                   'username': 'user%d' % index})
+
+    clients = fan_out(create, range(32), max_workers=8)
+    assert [c.artifactory_url for c in clients] == \
+        ['http://%d/api' % i for i in range(32)]
+    assert [c.username for c in clients] == ['user%d' % i for i in range(32)]
+
+
+def test_shared_config_object():
+    """One configuration object can back several clients."""
+    config = PartyConfig({'artifactory_url': 'http://shared/api'})
+    clients = [party.Party(config), party.Party(config)]
+    assert all(c.config is config for c in clients)
+    assert all(c.artifactory_url == 'http://shared/api' for c in clients)
+    assert clients[0].headers is not clients[1].headers
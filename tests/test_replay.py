@@ -0,0 +1,167 @@
+"""Test recording and replaying Artifactory traffic."""
+import base64
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import pytest
+import requests
+
+from party import Party
+from party.replay import (MAX_BODY, Cassette, Interaction, ReplayServer,
+                          recording)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answer searches, storage lookups and AQL like Artifactory."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, body):
+        body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Set-Cookie', 'session=secret')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        root = 'http://%s:%d/artifactory' % self.server.server_address
+        self.reply({'results': [{'uri': root + '/api/storage/repo/a.rpm'}]})
+
+    def do_POST(self):  # pylint: disable=C0103
+        statement = self.rfile.read(int(self.headers['Content-Length']))
+        self.reply({'results': [{'statement': statement.decode()}]})
+
+    def do_PUT(self):  # pylint: disable=C0103
+        content = self.rfile.read(int(self.headers['Content-Length']))
+        self.reply({'checksums': {
+            'sha256': hashlib.sha256(content).hexdigest()}})
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded server so kept-alive connections do not block shutdown."""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    """Local Artifactory to record from."""
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.api = 'http://%s:%d/artifactory/api' % httpd.server_address
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def client(url):
+    """Client of ``url`` with credentials."""
+    artifact = Party(config={'artifactory_url': url, 'username': 'user',
+                             'retry_backoff': 0})
+    artifact.password = base64.b64encode(b'secret-password').decode()
+    return artifact
+
+
+def test_record_and_replay(server, tmpdir):
+    """Recorded responses are replayed, pointing at the replay server."""
+    path = str(tmpdir.join('cassette.jsonl'))
+    artifact = client(server.api)
+    with recording(artifact, path) as cassette:
+        assert artifact.find('a.rpm') == 'OK'
+        assert artifact.find_by_aql(criteria={'repo': 'one'})
+        assert artifact.find_by_aql(criteria={'repo': 'two'})
+    assert len(cassette) == 3
+
+    with open(path) as handle:
+        recorded = handle.read()
+    assert 'secret' not in recorded
+    assert 'Authorization' not in recorded
+    assert server.api not in recorded
+
+    with ReplayServer(Cassette.load(path)) as stub:
+        offline = client(stub.url)
+        assert offline.fetch_by_name('a.rpm')[0].uri == \
+            stub.url + '/storage/repo/a.rpm'
+        assert offline.find_by_aql(criteria={'repo': 'two'}) == {
+            'results': [{'statement': 'items.find({"repo": "two"})'}]}
+        assert offline.query_artifactory(stub.url + '/storage/b.rpm') is None
+        assert stub.stats['requests'] == 3
+        assert stub.stats['misses'] == 1
+
+
+def test_replay_faults():
+    """Injected errors are retried and throttling answers with Retry-After."""
+    cassette = Cassette([Interaction('GET', '/api/repositories', None, 200,
+                                     {'Content-Type': 'application/json'},
+                                     b'[{"key": "repo"}]')])
+
+    with ReplayServer(cassette, error_rate=0.5, seed=1) as stub:
+        artifact = client(stub.url)
+        artifact.retry_policy.attempts = 20
+        for _ in range(10):
+            assert artifact.get_repositories() == ['repo']
+        assert stub.stats['errors'] > 0
+        assert artifact.counters.as_dict()['retries'] == stub.stats['errors']
+
+    with ReplayServer(cassette, rate=1, burst=2) as stub:
+        statuses = [requests.get(stub.url + '/repositories').status_code
+                    for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        response = requests.get(stub.url + '/repositories')
+        assert int(response.headers['Retry-After']) >= 1
+
+
+def test_record_and_replay_upload(server, tmpdir):
+    """Uploads replay whatever the size of their body."""
+    small = tmpdir.join('small.txt')
+    small.write(b'small text body', mode='wb')
+    large = tmpdir.join('large.bin')
+    large.write(os.urandom(MAX_BODY + 1), mode='wb')
+
+    path = str(tmpdir.join('cassette.jsonl'))
+    artifact = client(server.api)
+    with recording(artifact, path) as cassette:
+        artifact.upload(str(small), 'repo/small.txt')
+        artifact.upload(str(large), 'repo/large.bin')
+    assert [item.body for item in cassette.interactions] == \
+        ['small text body', None]
+
+    with ReplayServer(Cassette.load(path)) as stub:
+        offline = client(stub.url)
+        assert offline.upload(str(small), 'repo/small.txt').bytes == 15
+        assert offline.upload(str(large), 'repo/large.bin').bytes == \
+            MAX_BODY + 1
+        assert stub.stats['misses'] == 0
+
+        # Chunked bodies are read, the connection stays usable.
+        session = requests.Session()
+        for _ in range(2):
+            response = session.put(stub.url[:-len('/api')] + '/repo/large.bin',
+                                   data=iter([b'chunked ', b'body']))
+            assert response.status_code == 200
+        response = session.put(stub.url[:-len('/api')] + '/repo/small.txt',
+                               data=bytearray(b'other body'))
+        assert response.status_code == 404
+
+    cassette = Cassette.load(path)
+    assert cassette.match('PUT', '/repo/small.txt',
+                          memoryview(b'small text body')) is not None
+    assert cassette.match('PUT', '/repo/small.txt', u'small text body') \
+        is not None
@@ -0,0 +1,80 @@
+"""Test lookups returning result objects."""
+import json
+
+import pytest
+from flexmock import flexmock
+
+import party
+from party.fanout import fan_out
+from party.results import ArtifactRef, FileInfo, PropertySet
+
+API = 'http://host/artifactory/api'
+
+
+def client():
+    """Party pointing at :data:`API`."""
+    artifact = party.Party()
+    artifact.artifactory_url = API
+    return artifact
+
+
+def streamed(body):
+    """Response streaming ``body`` as JSON."""
+    content = json.dumps(body).encode()
+    return flexmock(encoding='utf-8', close=lambda: None,
+                    iter_content=lambda size: iter([content]))
+
+
+def test_result_objects():
+    """Results are compact and immutable."""
+    ref = ArtifactRef.from_uri(API + '/storage/repo/dir/a.rpm', API)
+    assert ref == ('repo/dir/a.rpm', API + '/storage/repo/dir/a.rpm')
+    assert (ref.repo, ref.name) == ('repo', 'a.rpm')
+    assert not hasattr(ref, '__dict__')
+    with pytest.raises(AttributeError):
+        ref.path = 'other'
+
+    properties = PropertySet('repo/a.rpm', {'os': ['el7', 'el8']})
+    assert properties.get('os') == 'el7'
+    assert properties.get('missing', 'x') == 'x'
+    assert properties.values('os') == ['el7', 'el8']
+
+
+def test_fetch_by_properties_leaves_instance():
+    """Search results are returned instead of set on the instance."""
+    artifact = client()
+    headers = artifact.headers
+    flexmock(artifact).should_receive('query_artifactory').and_return(
+        streamed({'results': [{'uri': API + '/storage/repo/a.rpm',
+                               'headers': 'clobbered'}]}))
+
+    refs = artifact.fetch_by_properties({'build': '42'})
+
+    assert refs == [ArtifactRef('repo/a.rpm', API + '/storage/repo/a.rpm')]
+    assert artifact.headers is headers
+    assert artifact.files == []
+
+
+def test_fetch_properties_and_file_info():
+    """Property and storage lookups build their result objects."""
+    artifact = client()
+    flexmock(artifact).should_receive('query_artifactory').with_args(
+        API + '/storage/repo/a.rpm?properties').and_return(flexmock(
+            text=json.dumps({'properties': {'build': ['42']}})))
+    flexmock(artifact).should_receive('query_file_info').with_args(
+        'repo/a.rpm').and_return({
+            'uri': API + '/storage/repo/a.rpm', 'size': '1024',
+            'downloadUri': 'http://host/artifactory/repo/a.rpm',
+            'checksums': {'sha256': 'abc'}})
+
+    assert artifact.fetch_properties('repo/a.rpm') == PropertySet(
+        'repo/a.rpm', {'build': ['42']})
+
+    infos = fan_out(artifact.fetch_file_info, ['/repo/a.rpm'] * 4,
+                    max_workers=4)
+    assert all(info == infos[0] for info in infos)
+    info = infos[0]
+    assert isinstance(info, FileInfo)
+    assert (info.path, info.size, info.checksums) == ('repo/a.rpm', 1024,
+                                                       {'sha256': 'abc'})
+    assert not hasattr(artifact, 'file_info')
@@ -0,0 +1,153 @@
+"""Test retries, backoff and circuit breaking."""
+import time
+
+import pytest
+import requests
+from flexmock import flexmock
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from party.exceptions import CircuitOpen
+from party.party_request import PartyRequest
+from party.retry import CircuitBreaker, RetryPolicy, parse_retry_after
+
+
+def response(status_code, headers=None):
+    """Fake response."""
+    return flexmock(status_code=status_code, ok=status_code < 400,
+                    headers=headers or {}, close=lambda: None)
+
+
+def client(*responses, **settings):
+    """PartyRequest whose session returns ``responses`` in turn."""
+    request = PartyRequest(artifactory_url='http://host/api')
+    request.retry_policy = RetryPolicy(backoff=0, **settings)
+    flexmock(request.session).should_receive('request').and_return(
+        *responses).one_by_one()
+    flexmock(time).should_receive('sleep')
+    return request
+
+
+def test_retry_after():
+    """Retry-After seconds and dates are honoured and capped."""
+    assert parse_retry_after(response(429, {'Retry-After': '3'})) == 3
+    assert parse_retry_after(response(503)) is None
+    date = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    assert parse_retry_after(response(503, {'Retry-After': date})) == 0
+
+    policy = RetryPolicy(backoff_max=10)
+    assert policy.delay(1, response(429, {'Retry-After': '60'})) == 10
+
+
+def test_exponential_jitter():
+    """Backoff doubles per attempt within the cap."""
+    policy = RetryPolicy(backoff=1, backoff_max=5)
+    assert all(0 <= policy.delay(3) <= 4 for _ in range(50))
+    assert RetryPolicy(backoff=1, backoff_max=5, jitter=False).delay(4) == 5
+
+
+def test_send_retries_until_success():
+    """Retryable statuses are retried and counted."""
+    request = client(response(503), response(429), response(200))
+    assert request.send('get', 'http://host/api/x').status_code == 200
+    assert request.counters.as_dict() == {'requests': 3, 'retries': 2,
+                                          'throttled': 1}
+
+
+def test_send_gives_up():
+    """The last response is returned once attempts run out."""
+    request = client(response(502), response(502), attempts=2)
+    assert request.send('get', 'http://host/api/x').status_code == 502
+    assert request.counters.as_dict()['failures'] == 1
+
+
+def test_send_connection_errors():
+    """Connection errors are retried and re-raised on the last attempt."""
+    request = PartyRequest(artifactory_url='http://host/api')
+    request.retry_policy = RetryPolicy(attempts=2, backoff=0)
+    flexmock(request.session).should_receive('request').and_raise(
+        requests.exceptions.ConnectionError).twice()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        request.send('get', 'http://host/api/x')
+
+
+def test_send_post_retries_only_when_safe():
+    """POSTs are only retried when they cannot have taken effect."""
+    request = client(response(503), response(200))
+    assert request.send('post', 'http://host/api/plugins/x').status_code == 503
+    assert 'retries' not in request.counters.as_dict()
+
+    request = client(response(503, {'Retry-After': '0'}), response(200))
+    assert request.send('post', 'http://host/api/plugins/x').status_code == 200
+
+    request = client(response(502), response(200))
+    assert request.send('post', 'http://host/api/search/aql').status_code == 200
+    assert request.send('put', 'http://host/api/storage/x').status_code == 200
+
+
+def test_send_post_connection_errors():
+    """POSTs are retried when connecting failed, not on read timeouts."""
+    request = PartyRequest(artifactory_url='http://host/api')
+    request.retry_policy = RetryPolicy(attempts=3, backoff=0)
+    flexmock(time).should_receive('sleep')
+    flexmock(request.session).should_receive('request').and_raise(
+        requests.exceptions.ReadTimeout).once()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        request.send('post', 'http://host/api/plugins/x')
+
+    refused = requests.exceptions.ConnectionError(
+        MaxRetryError(None, '/', NewConnectionError(None, 'refused')))
+    flexmock(request.session).should_receive('request').and_raise(
+        refused).times(3)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        request.send('post', 'http://host/api/plugins/x')
+
+
+def test_circuit_breaker():
+    """Circuit opens after failures and closes after a good trial."""
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    breaker.failure()
+    breaker.before()
+    breaker.failure()
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+    breaker.opened -= 60
+    breaker.before()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_trial_raising():
+    """A trial failing with any exception opens the circuit again."""
+    request = PartyRequest(artifactory_url='http://host/api')
+    request.retry_policy = RetryPolicy(backoff=0)
+    breaker = request.circuit_breaker = CircuitBreaker(threshold=1,
+                                                       reset_timeout=60)
+    breaker.failure()
+    breaker.opened -= 60
+    flexmock(request.session).should_receive('request').and_raise(
+        requests.exceptions.ChunkedEncodingError('broken')).once()
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        request.send('get', 'http://host/api/x')
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        request.send('get', 'http://host/api/x')
+
+    # A trial that never reported back is replaced after reset_timeout.
+    breaker.opened -= 60
+    breaker.before()
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+    breaker.opened -= 60
+    breaker.before()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_send_fails_fast_when_open():
+    """No request is sent while the circuit is open."""
+    request = client(response(503), response(503), attempts=1)
+    request.circuit_breaker = CircuitBreaker(threshold=1)
+    assert request.send('get', 'http://host/api/x').status_code == 503
+    with pytest.raises(CircuitOpen):
+        request.send('get', 'http://host/api/x')
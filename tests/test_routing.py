@@ -0,0 +1,113 @@
+"""Test routing across Artifactory nodes."""
+import base64
+import socket
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import pytest
+import requests
+
+from party import Party
+from party.routing import Router
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answer every request with ``{}`` and remember its path."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        self.server.paths.append((self.command, self.path))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_GET = do_PUT = respond
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded server so kept-alive connections do not block shutdown."""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def node():
+    """Local node, yields the server with its API URL as ``api``."""
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.paths = []
+    httpd.api = 'http://%s:%d/artifactory/api' % httpd.server_address
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def dead():
+    """API URL of a port nothing listens on."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    url = 'http://%s:%d/artifactory/api' % sock.getsockname()
+    sock.close()
+    return url
+
+
+def test_choose():
+    """Writes stay on writable nodes, reads favour fast nodes."""
+    router = Router('http://a/api', replica_urls=['http://b/api'])
+    primary, replica = router.endpoints
+    router.record(primary, 1.0)
+    router.record(replica, 0.01)
+
+    assert all(router.choose(write=True) is primary for _ in range(20))
+    reads = [router.choose() for _ in range(500)]
+    assert reads.count(replica) > 400
+
+    router.failed(replica)
+    assert all(router.choose() is primary for _ in range(20))
+    assert router.choose(write=True, exclude=[primary]) is None
+
+    assert replica.rewrite('http://a/repo/x.rpm', primary) == 'http://b/repo/x.rpm'
+    assert replica.rewrite('http://a/api/storage/x', primary) == \
+        'http://b/api/storage/x'
+
+
+def test_failover(node, dead):
+    """Requests move to a healthy node when the primary does not answer."""
+    artifact = Party(config={'artifactory_url': dead,
+                             'failover_urls': [node.api]})
+    artifact.password = base64.b64encode(b'pass').decode()
+
+    assert artifact.query_artifactory(dead + '/storage/repo/a.rpm') is not None
+    assert artifact.query_artifactory(dead + '/storage/repo/b.rpm?properties=a=1',
+                                      'put') is not None
+
+    assert node.paths == [('GET', '/artifactory/api/storage/repo/a.rpm'),
+                          ('PUT', '/artifactory/api/storage/repo/b.rpm?properties=a=1')]
+    assert artifact.counters.as_dict()['failovers'] == 1
+    assert not artifact.router.primary.healthy
+
+
+def test_health_check(node, dead):
+    """Pings update health and latency of every node."""
+    router = Router(dead, replica_urls=[node.api])
+    router.check(requests.Session(), timeout=1)
+
+    primary, replica = router.endpoints
+    assert not primary.healthy
+    assert replica.healthy and replica.latency is not None
+    assert node.paths == [('GET', '/artifactory/api/system/ping')]
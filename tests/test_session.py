@@ -0,0 +1,45 @@
+"""Test pooled sessions."""
+import base64
+
+from party import Party
+from party.party_request import PartyRequest
+from party.session import new_session
+
+
+def test_new_session_pool():
+    """Adapters are mounted with the configured pool size."""
+    session = new_session(pool_connections=2, pool_maxsize=5,
+                          adapter_max_retries=3)
+    adapter = session.get_adapter('https://example.com')
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 5
+    assert adapter.max_retries.total == 3
+    assert session.headers['Connection'] == 'keep-alive'
+
+
+def test_new_session_no_keep_alive():
+    """Disabling keep-alive closes connections after each request."""
+    session = new_session(keep_alive=False)
+    assert session.headers['Connection'] == 'close'
+
+
+def test_session_reused_and_shared():
+    """One session per client unless a shared one is passed in."""
+    artifact = Party()
+    assert artifact.session is artifact.session
+
+    shared = new_session()
+    first = PartyRequest(session=shared)
+    second = Party(session=shared)
+    assert first.session is second.session is shared
+
+
+def test_auth_decoded_once():
+    """Password is decoded lazily and refreshed when it changes."""
+    request = PartyRequest(username='user',
+                           password=base64.b64encode(b'secret').decode())
+    assert request.auth == ('user', 'secret')
+    assert request.auth is request.auth
+
+    request.password = base64.b64encode(b'other').decode()
+    assert request.auth == ('user', 'other')
@@ -0,0 +1,75 @@
+"""Test coalescing of identical concurrent requests."""
+import threading
+import time
+
+import pytest
+from flexmock import flexmock
+
+import party
+from party.fanout import fan_out
+from party.singleflight import SingleFlight
+
+API = 'http://host/artifactory/api'
+
+
+def test_single_flight_shares_result_and_error():
+    """Waiting threads get the leader's result or exception."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return object()
+
+    outcomes = []
+    leader = threading.Thread(
+        target=lambda: outcomes.append(flight.do('key', slow)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(
+        target=lambda: outcomes.append(flight.do('key', slow)))
+    follower.start()
+    while not flight.flights['key'].waiters:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert outcomes[0][0] is outcomes[1][0]
+    assert sorted(shared for _, shared in outcomes) == [False, True]
+    assert flight.stats() == {'calls': 1, 'collapsed': 1, 'in_flight': 0}
+
+    def fail():
+        raise ValueError('down')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_party_coalesces_lookups():
+    """Concurrent identical lookups send one request."""
+    artifact = party.Party(config={'artifactory_url': API})
+    sent = []
+
+    def send_query(query, query_type='get', **kwargs):
+        sent.append(query)
+        time.sleep(0.2)
+        return flexmock(ok=True, text='{"results": [{"uri": "a.rpm"}]}',
+                        close=lambda: None)
+
+    flexmock(artifact).should_receive('send_query').replace_with(send_query)
+
+    results = fan_out(lambda _: artifact.find('base-image.tar'), range(16),
+                      max_workers=16)
+
+    assert results == ['OK'] * 16
+    assert len(sent) == 1
+    assert artifact.counters.as_dict()['coalesced'] == 15
+
+    artifact.coalesce_requests = False
+    fan_out(lambda _: artifact.query_artifactory(API + '/storage/a'),
+            range(4), max_workers=4)
+    assert len(sent) == 5
@@ -0,0 +1,195 @@
+"""Test mirroring repositories to local directories."""
+import base64
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import pytest
+
+from party import Party
+from party.exceptions import PartyError
+from party.sync import manifest_path, utc_timestamp
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answer AQL listings and downloads of ``server.items``."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        path = self.path.split('/artifactory/', 1)[1]
+        self.server.downloads.append(path)
+        self.reply(200, self.server.items[path][0])
+
+    def do_POST(self):  # pylint: disable=C0103
+        statement = self.rfile.read(
+            int(self.headers['Content-Length'])).decode()
+        self.server.statements.append(statement)
+        criteria = json.loads(statement.split('.find(', 1)[1].split(')')[0])
+        since = criteria.get('modified', {}).get('$gte', '')
+        results = []
+        for path, (content, modified) in sorted(self.server.items.items()):
+            repo, rest = path.split('/', 1)
+            folder, _, name = rest.rpartition('/')
+            if repo == criteria['repo'] and modified >= since:
+                results.append({
+                    'repo': repo, 'path': folder or '.', 'name': name,
+                    'size': len(content), 'modified': modified,
+                    'sha256': hashlib.sha256(content).hexdigest()})
+        self.reply(200, json.dumps({'results': results}).encode())
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded server so kept-alive connections do not block shutdown."""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    """Local Artifactory holding a small repository."""
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.items = {
+        'repo/a.rpm': (b'a' * 100, '2024-01-01T00:00:00.000Z'),
+        'repo/dir/b.rpm': (b'b' * 200, '2024-01-02T00:00:00.000Z'),
+        'repo/dir/sub/c.rpm': (b'c' * 300, '2024-01-03T00:00:00.000Z'),
+    }
+    httpd.downloads = []
+    httpd.statements = []
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def artifact(server):
+    """Client of the local server."""
+    client = Party(config={
+        'artifactory_url': 'http://%s:%d/artifactory/api' % server.server_address,
+        'max_workers': 4,
+    })
+    client.password = base64.b64encode(b'pass').decode()
+    return client
+
+
+def test_sync_incremental(server, artifact, tmpdir):
+    """Only new and changed files are listed and downloaded again."""
+    mirror = str(tmpdir.join('mirror'))
+    result = artifact.sync('repo', mirror)
+
+    assert sorted(result.downloaded) == ['a.rpm', 'dir/b.rpm', 'dir/sub/c.rpm']
+    assert result.high_water == '2024-01-03T00:00:00.000Z'
+    with open(os.path.join(mirror, 'dir', 'sub', 'c.rpm'), 'rb') as handle:
+        assert handle.read() == b'c' * 300
+    assert os.path.exists(manifest_path(mirror))
+
+    server.items['repo/dir/b.rpm'] = (b'B' * 50, '2024-01-04T00:00:00.000Z')
+    server.items['repo/d.rpm'] = (b'd', '2024-01-05T00:00:00.000Z')
+    del server.downloads[:]
+    result = artifact.sync('repo', mirror)
+
+    assert '"$gte": "2024-01-03T00:00:00.000Z"' in server.statements[-1]
+    assert sorted(server.downloads) == ['repo/d.rpm', 'repo/dir/b.rpm']
+    assert result.unchanged == 1
+    assert result.high_water == '2024-01-05T00:00:00.000Z'
+    with open(os.path.join(mirror, 'dir', 'b.rpm'), 'rb') as handle:
+        assert handle.read() == b'B' * 50
+
+
+def test_sync_delete(server, artifact, tmpdir):
+    """Stale files of the manifest are removed, other local files stay."""
+    mirror = str(tmpdir.join('mirror'))
+    artifact.sync('repo', mirror)
+    tmpdir.join('mirror', 'local.txt').write('keep')
+
+    del server.items['repo/a.rpm']
+    result = artifact.sync('repo', mirror, delete=True)
+
+    assert result.deleted == ['a.rpm']
+    assert result.downloaded == []
+    assert '$gte' not in server.statements[-1]
+    assert not os.path.exists(os.path.join(mirror, 'a.rpm'))
+    assert os.path.exists(os.path.join(mirror, 'local.txt'))
+
+
+def test_sync_failure_keeps_high_water(server, artifact, tmpdir):
+    """Failed downloads are retried by the next run."""
+    mirror = str(tmpdir.join('mirror'))
+    artifact.sync('repo', mirror)
+    server.items['repo/e.rpm'] = (b'e', '2024-02-01T00:00:00.000Z')
+    server.items['repo/dir/b.rpm'] = (b'x', '2024-02-01T00:00:00.000Z')
+
+    handler_get = Handler.do_GET
+
+    def corrupt(handler):
+        if handler.path.endswith('/e.rpm'):
+            return handler.reply(200, b'other content')
+        return handler_get(handler)
+
+    Handler.do_GET = corrupt
+    try:
+        result = artifact.sync('repo', mirror)
+    finally:
+        Handler.do_GET = handler_get
+
+    assert result.failed == ['e.rpm']
+    assert result.downloaded == ['dir/b.rpm']
+    assert result.high_water == '2024-01-03T00:00:00.000Z'
+
+    result = artifact.sync('repo', mirror)
+    assert result.downloaded == ['e.rpm']
+    assert result.high_water == '2024-02-01T00:00:00.000Z'
+
+
+def test_sync_checks_paths(server, artifact, tmpdir):
+    """Manifests of other repositories and escaping paths are refused."""
+    mirror = str(tmpdir.join('mirror'))
+    artifact.sync('repo', mirror)
+    with pytest.raises(PartyError):
+        artifact.sync('other', mirror)
+
+    server.items['evil/../../x.rpm'] = (b'x', '2024-01-01T00:00:00.000Z')
+    with pytest.raises(PartyError):
+        artifact.sync('evil', str(tmpdir.join('evil')))
+
+
+def test_sync_time_zones_and_manifest_name(server, artifact, tmpdir):
+    """High-water marks compare in UTC, a remote manifest name is a file."""
+    server.items = {
+        'repo/.party-sync.json': (b'remote file', '2024-01-03T05:00:00.000+05:00'),
+        'repo/late.rpm': (b'late', '2024-01-02T23:00:00.000-03:00'),
+    }
+    mirror = str(tmpdir.join('mirror'))
+    result = artifact.sync('repo', mirror)
+
+    assert sorted(result.downloaded) == ['.party-sync.json', 'late.rpm']
+    assert result.high_water == '2024-01-03T02:00:00.000Z'
+    with open(os.path.join(mirror, '.party-sync.json'), 'rb') as handle:
+        assert handle.read() == b'remote file'
+    assert artifact.sync('repo', mirror, full=True).unchanged == 2
+
+    assert utc_timestamp('2024-01-01T00:30:00.123456+0130') == \
+        '2023-12-31T23:00:00.123Z'
+    assert utc_timestamp('2024-01-01T00:00:00') == '2024-01-01T00:00:00.000Z'
+    assert utc_timestamp('yesterday') is None
@@ -0,0 +1,281 @@
+"""Test artifact downloads and uploads."""
+import base64
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import pytest
+
+from party import Party
+from party.exceptions import ChecksumMismatch, RequestFailed
+
+CONTENT = os.urandom(300000)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serve artifacts from ``server.items``, honouring ``Range``."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.server.requests.append((self.path, self.headers.get('Range')))
+        path = self.path.split('/artifactory/', 1)[1]
+        if path.startswith('api/storage/'):
+            content = self.server.items.get(path[len('api/storage/'):])
+            if content is None:
+                return self.reply(404, b'')
+            info = {'size': str(len(content)), 'checksums': {
+                'sha1': hashlib.sha1(content).hexdigest(),
+                'sha256': self.server.sha256 or
+                          hashlib.sha256(content).hexdigest()}}
+            return self.reply(200, json.dumps(info).encode())
+
+        content = self.server.items[path]
+        byte_range = self.headers.get('Range')
+        if not byte_range or self.server.ignore_range:
+            return self.reply(200, content)
+
+        start, _, end = byte_range.split('=')[1].partition('-')
+        start, end = int(start), int(end or len(content) - 1)
+        if start >= len(content):
+            return self.reply(416, b'')
+        if start in self.server.unavailable:
+            return self.reply(503, b'')
+        body = content[start:end + 1]
+        headers = [('Content-Range', 'bytes %d-%d/%d' % (
+            start, end, len(content)))]
+        if start in self.server.truncate:
+            # Drop the connection halfway through the range once.
+            self.server.truncate.discard(start)
+            self.send_response(206)
+            self.send_header(*headers[0])
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return None
+        return self.reply(206, body, headers)
+
+    def do_PUT(self):  # pylint: disable=C0103
+        self.server.requests.append((self.path, self.headers.get('Range')))
+        content = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        path = self.path.split('/artifactory/', 1)[1]
+        if self.headers.get('X-Checksum-Deploy') == 'true':
+            known = [item for item in self.server.items.values()
+                     if hashlib.sha1(item).hexdigest() ==
+                     self.headers['X-Checksum-Sha1']]
+            if not known:
+                return self.reply(404, b'')
+            content = known[0]
+        self.server.items[path] = content
+        self.server.uploads.append(dict(self.headers))
+        body = {'checksums': {'sha256': hashlib.sha256(content).hexdigest()}}
+        self.reply(201, json.dumps(body).encode())
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded server so kept-alive connections do not block shutdown."""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    """Local artifact server holding ``repo/dir/big.bin``."""
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.items = {'repo/dir/big.bin': CONTENT}
+    httpd.requests = []
+    httpd.uploads = []
+    httpd.sha256 = None
+    httpd.truncate = set()
+    httpd.ignore_range = False
+    httpd.unavailable = set()
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    httpd.api = 'http://%s:%d/artifactory/api' % httpd.server_address
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def client(server):
+    """Party pointing at ``server``."""
+    artifact = Party(config={'artifactory_url': server.api})
+    artifact.password = base64.b64encode(b'pass').decode()
+    return artifact
+
+
+def test_download(server, tmp_path):
+    """Artifacts are streamed to disk and verified."""
+    result = client(server).download('repo/dir/big.bin', str(tmp_path),
+                                     chunk_size=4096)
+
+    assert (tmp_path / 'big.bin').read_bytes() == CONTENT
+    assert not (tmp_path / 'big.bin.part').exists()
+    assert result.bytes == len(CONTENT)
+    assert result.checksum == 'sha256'
+    assert result.throughput > 0
+
+
+def test_download_resume(server, tmp_path):
+    """A partial file is continued with a Range request."""
+    dest = tmp_path / 'big.bin'
+    (tmp_path / 'big.bin.part').write_bytes(CONTENT[:100000])
+
+    result = client(server).download(server.api + '/storage/repo/dir/big.bin',
+                                     str(dest))
+
+    assert dest.read_bytes() == CONTENT
+    assert result.resumed == 100000
+    assert result.bytes == len(CONTENT) - 100000
+    assert server.requests[-1] == ('/artifactory/repo/dir/big.bin',
+                                   'bytes=100000-')
+
+    (tmp_path / 'done.part').write_bytes(CONTENT)
+    assert client(server).download('repo/dir/big.bin',
+                                   str(tmp_path / 'done')).bytes == 0
+
+
+def test_download_checksum_mismatch(server, tmp_path):
+    """Corrupt content is removed and reported."""
+    server.sha256 = '0' * 64
+    with pytest.raises(ChecksumMismatch):
+        client(server).download('repo/dir/big.bin', str(tmp_path))
+    assert os.listdir(str(tmp_path)) == []
+
+    with pytest.raises(RequestFailed):
+        client(server).download('repo/missing.bin', str(tmp_path))
+
+
+def test_download_parallel(server, tmp_path):
+    """Ranges are fetched concurrently and failed ones are retried."""
+    server.truncate.update([65536, 196608])
+    artifact = client(server)
+    artifact.retry_policy.backoff = 0
+
+    result = artifact.download_parallel('repo/dir/big.bin', str(tmp_path),
+                                        max_workers=4, part_size=65536)
+
+    assert (tmp_path / 'big.bin').read_bytes() == CONTENT
+    assert result.bytes == len(CONTENT)
+    assert result.checksum == 'sha256'
+    ranges = [byte_range for _, byte_range in server.requests if byte_range]
+    assert len(ranges) == 5 + 2
+    assert 'bytes=262144-299999' in ranges
+    assert not server.truncate
+
+
+def test_download_parallel_failure(server, tmp_path):
+    """A corrupt result is removed, small files use a single request."""
+    server.sha256 = '0' * 64
+    with pytest.raises(ChecksumMismatch):
+        client(server).download_parallel('repo/dir/big.bin', str(tmp_path),
+                                         part_size=65536)
+    assert os.listdir(str(tmp_path)) == []
+
+    server.sha256 = None
+    del server.requests[:]
+    client(server).download_parallel('repo/dir/big.bin', str(tmp_path))
+    assert (tmp_path / 'big.bin').read_bytes() == CONTENT
+    assert not any(byte_range for _, byte_range in server.requests)
+
+
+def test_download_parallel_range_ignored(server, tmp_path):
+    """A server answering ranges with the whole file gets one download."""
+    server.ignore_range = True
+    artifact = client(server)
+    result = artifact.download_parallel('repo/dir/big.bin', str(tmp_path),
+                                        max_workers=4, part_size=65536)
+
+    assert (tmp_path / 'big.bin').read_bytes() == CONTENT
+    assert result.bytes == len(CONTENT)
+    assert result.checksum == 'sha256'
+    downloads = [byte_range for path, byte_range in server.requests
+                 if '/api/' not in path]
+    assert downloads == ['bytes=0-65535', None]
+
+
+def test_download_parallel_no_nested_retries(server, tmp_path):
+    """A failing range is retried by the retry policy alone."""
+    server.unavailable.add(65536)
+    artifact = client(server)
+    artifact.retry_policy.backoff = 0
+    with pytest.raises(RequestFailed):
+        artifact.download_parallel('repo/dir/big.bin', str(tmp_path),
+                                   max_workers=4, part_size=65536)
+
+    failed = [byte_range for _, byte_range in server.requests
+              if byte_range == 'bytes=65536-131071']
+    assert len(failed) == artifact.retry_policy.attempts
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_upload(server, tmp_path):
+    """Files are uploaded with their checksums and verified."""
+    src = tmp_path / 'up.bin'
+    src.write_bytes(CONTENT)
+
+    result = client(server).upload(str(src), 'repo/new/')
+
+    assert server.items['repo/new/up.bin'] == CONTENT
+    assert server.uploads[0]['X-Checksum-Sha256'] == \
+        hashlib.sha256(CONTENT).hexdigest()
+    assert result.path == 'repo/new/up.bin'
+    assert result.bytes == len(CONTENT)
+    assert result.checksum == 'sha256'
+
+    empty = tmp_path / 'empty.bin'
+    empty.write_bytes(b'')
+    client(server).upload(str(empty), 'repo/empty.bin')
+    assert server.items['repo/empty.bin'] == b''
+
+
+def test_checksum_deploy(server, tmp_path):
+    """Known content is linked, new content is uploaded in full."""
+    known = tmp_path / 'known.bin'
+    known.write_bytes(CONTENT)
+    new = tmp_path / 'new.bin'
+    new.write_bytes(b'new content')
+    artifact = client(server)
+
+    results = artifact.upload_many([(str(known), 'repo/a/'),
+                                    (str(new), 'repo/b/')], max_workers=2)
+
+    assert [result.bytes for result in results] == [0, len(b'new content')]
+    assert results[0].saved == len(CONTENT)
+    assert server.items['repo/a/known.bin'] == CONTENT
+    assert server.items['repo/b/new.bin'] == b'new content'
+    assert artifact.counters.as_dict()['bytes_saved'] == len(CONTENT)
+    assert artifact.counters.as_dict()['bytes_uploaded'] == len(b'new content')
+
+
+def test_upload_many_process_pool(server, tmp_path):
+    """Checksums can be computed in worker processes."""
+    src = tmp_path / 'known.bin'
+    src.write_bytes(CONTENT)
+
+    (result,) = client(server).upload_many([(str(src), 'repo/c/known.bin')],
+                                           processes=2)
+    assert result.saved == len(CONTENT)
+    assert result.checksum == 'sha256'